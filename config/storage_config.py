@@ -0,0 +1,20 @@
+# config/storage_config.py
+import os
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+def get_data_dir():
+    """
+    Retorna el directorio local donde la aplicación guarda sus datos
+    (respaldo de auditoría, réplica local, etc.), creándolo si no existe.
+    Se puede cambiar con la variable de entorno APP_DATA_DIR.
+    """
+    data_dir = os.getenv("APP_DATA_DIR") or os.path.join(os.path.expanduser("~"), ".campo_app")
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+def get_data_path(filename):
+    """Retorna la ruta de un archivo dentro del directorio de datos local"""
+    return os.path.join(get_data_dir(), filename)
\ No newline at end of file
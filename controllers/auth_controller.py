@@ -1,5 +1,7 @@
 # controllers/auth_controller.py
 from config.firebase_config import get_firestore_db
+from utils.cache_manager import get_cache_manager
+from utils.single_flight import get_single_flight
 import datetime
 import hashlib
 import uuid
@@ -7,6 +9,8 @@ import uuid
 class AuthController:
     def __init__(self):
         self.db = get_firestore_db()
+        self.cache = get_cache_manager()
+        self.flights = get_single_flight()
         self.current_user = None
         
         # Crear usuario administrador si no existe
@@ -61,6 +65,8 @@ class AuthController:
             # Actualizar último login
             user_ref = users_ref.document(user_doc.id)
             user_ref.update({"last_login": datetime.datetime.now()})
+            self.cache.invalidate('users', user_doc.id)
+            self.flights.forget('users')
             
             # Establecer usuario actual
             self.current_user = {
@@ -184,6 +190,8 @@ class AuthController:
             if permission not in permissions:
                 permissions.append(permission)
                 user_ref.update({"permissions": permissions})
+                self.cache.invalidate('users', user_id)
+                self.flights.forget('users')
             
             return {"success": True}
         except Exception as e:
@@ -207,6 +215,8 @@ class AuthController:
             if permission in permissions:
                 permissions.remove(permission)
                 user_ref.update({"permissions": permissions})
+                self.cache.invalidate('users', user_id)
+                self.flights.forget('users')
             
             return {"success": True}
         except Exception as e:
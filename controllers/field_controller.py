@@ -1,29 +1,70 @@
 # controllers/field_controller.py
 from models.field import Field
 from config.firebase_config import get_firestore_db
+from utils.audit_logger import log_action
+from utils.projection import project_data as _project_data
+from utils.pagination import fetch_page, slice_page, DEFAULT_PAGE_SIZE
+from utils.replica_store import get_replica_store
+from utils.cache_manager import get_cache_manager
+from utils.single_flight import get_single_flight, stream_rows
 import datetime
 
 class FieldController:
     def __init__(self):
         self.db = get_firestore_db()
         self.collection = 'fields'
+        self.replica = get_replica_store()
+        self.cache = get_cache_manager()
+        self.flights = get_single_flight()
     
     def get_all(self):
         """Obtiene todos los campos"""
-        fields = []
-        docs = self.db.collection(self.collection).stream()
+        # Si la réplica local está sincronizada, leer de memoria sin ir a la red
+        rows = self.replica.query(self.collection)
+        if rows is not None:
+            return [Field.from_dict(doc_id, data) for doc_id, data in rows]
         
-        for doc in docs:
-            field = Field.from_dict(doc.id, doc.to_dict())
-            fields.append(field)
+        # Las consultas idénticas simultáneas comparten una sola lectura
+        query = self.db.collection(self.collection)
+        rows = self.flights.do((self.collection, "all"), lambda: stream_rows(query))
         
-        return fields
+        return [Field.from_dict(doc_id, data) for doc_id, data in rows]
+    
+    def get_all_projected(self, fields):
+        """
+        Obtiene solo los campos indicados de cada campo agrícola (proyección en el servidor).
+        Retorna diccionarios livianos con "id" y los campos pedidos, por ejemplo para
+        armar mapas id -> nombre sin descargar plagas, trabajadores ni fechas.
+        """
+        rows = self.replica.query(self.collection)
+        if rows is not None:
+            return [_project_data(doc_id, data, fields) for doc_id, data in rows]
+        
+        query = self.db.collection(self.collection).select(list(fields))
+        rows = self.flights.do((self.collection, "projected", tuple(fields)), lambda: stream_rows(query))
+        
+        return [_project_data(doc_id, data, fields) for doc_id, data in rows]
+    
+    def get_page(self, page_size=DEFAULT_PAGE_SIZE, cursor=None, order_by="name", descending=False):
+        """
+        Obtiene una página de campos ordenada por order_by.
+        Retorna {"items": [Field], "next_cursor": cursor para la siguiente página, "has_more": bool}
+        """
+        rows = self.replica.query(self.collection, order_by=order_by, descending=descending)
+        if rows is not None:
+            return slice_page(rows, Field.from_dict, page_size=page_size, cursor=cursor,
+                              order_by=order_by, descending=descending)
+        
+        query = self.db.collection(self.collection)
+        
+        return fetch_page(query, order_by, lambda doc: Field.from_dict(doc.id, doc.to_dict()),
+                          page_size=page_size, cursor=cursor, descending=descending)
     
     def get_by_id(self, field_id):
-        """Obtiene un campo por su ID"""
-        doc = self.db.collection(self.collection).document(field_id).get()
-        if doc.exists:
-            return Field.from_dict(doc.id, doc.to_dict())
+        """Obtiene un campo por su ID (desde el caché si está disponible)"""
+        data = self.cache.get_document(self.db, self.collection, field_id)
+        if data is not None:
+            return Field.from_dict(field_id, data)
         return None
     
     def create(self, field):
@@ -35,9 +76,11 @@ class FieldController:
             doc_ref = self.db.collection(self.collection).document()
             field.id = doc_ref.id
             doc_ref.set(field.to_dict())
+            self.cache.set(self.collection, field.id, field.to_dict())
+            self.flights.forget(self.collection)
             
             # Registrar en log de auditoría
-            self._log_action("create", field.id, field.to_dict())
+            log_action(self.collection, field.id, "create", field.to_dict())
             
             return {"success": True, "id": field.id}
         except Exception as e:
@@ -74,9 +117,11 @@ class FieldController:
             update_data["updated_at"] = datetime.datetime.now()
             
             doc_ref.update(update_data)
+            self.cache.invalidate(self.collection, field_id)
+            self.flights.forget(self.collection)
             
             # Registrar en log de auditoría
-            self._log_action("update", field_id, update_data)
+            log_action(self.collection, field_id, "update", update_data)
             
             return {"success": True}
         except Exception as e:
@@ -102,23 +147,12 @@ class FieldController:
             
             # Eliminar documento
             doc_ref.delete()
+            self.cache.invalidate(self.collection, field_id)
+            self.flights.forget(self.collection)
             
             # Registrar en log de auditoría
-            self._log_action("delete", field_id, old_data)
+            log_action(self.collection, field_id, "delete", old_data)
             
             return {"success": True}
         except Exception as e:
-            return {"success": False, "error": str(e)}
-    
-    def _log_action(self, action, field_id, data):
-        """Registra acciones en el log de auditoría"""
-        log_data = {
-            "collection": self.collection,
-            "document_id": field_id,
-            "action": action,
-            "data": data,
-            "timestamp": datetime.datetime.now(),
-            "user_id": "current_user_id"  # Esto debe ser reemplazado con el ID del usuario actual
-        }
-        
-        self.db.collection('audit_logs').add(log_data)
\ No newline at end of file
+            return {"success": False, "error": str(e)}
\ No newline at end of file
@@ -1,16 +1,41 @@
 # controllers/fumigation_controller.py
 from models.fumigation import Fumigation
+from models.audit_log import AuditLog
 from config.firebase_config import get_firestore_db
+from utils.audit_logger import log_action
+from utils.reference_resolver import ReferenceResolver
+from utils.pagination import fetch_page, slice_page, DEFAULT_PAGE_SIZE
+from utils.replica_store import get_replica_store
+from utils.cache_manager import get_cache_manager
+from utils.single_flight import get_single_flight, stream_rows
+from utils.fumigation_stats import FumigationStatsDelta, read_months, build_statistics, month_range
+from utils.stock_ledger import consume_lots
+from firebase_admin import firestore
 import datetime
 
+# Máximo de fumigaciones retornadas por las consultas de programadas y atrasadas
+SCHEDULED_QUERY_LIMIT = 100
+
+# Máximo de productos dosificados que se descuentan al completar una fumigación
+# (cada uno genera hasta cinco escrituras: lote, agregado, movimiento y dos
+# checkpoints, y una transacción de Firestore admite 500)
+MAX_DOSAGE_PRODUCTS = 90
+
 class FumigationController:
     def __init__(self):
         self.db = get_firestore_db()
         self.collection = 'fumigations'
+        self.replica = get_replica_store()
+        self.cache = get_cache_manager()
+        self.flights = get_single_flight()
     
     def get_all(self, field_id=None, applicator_id=None, status=None):
         """Obtiene todas las fumigaciones, opcionalmente filtradas por campo, aplicador y/o estado"""
-        fumigations = []
+        # Si la réplica local está sincronizada, leer de memoria sin ir a la red
+        rows = self.replica.query(self.collection, field_id=field_id, applicator_id=applicator_id, status=status)
+        if rows is not None:
+            return [Fumigation.from_dict(doc_id, data) for doc_id, data in rows]
+        
         query = self.db.collection(self.collection)
         
         # Aplicar filtros si se proporcionan
@@ -20,20 +45,48 @@ class FumigationController:
             query = query.where("applicator_id", "==", applicator_id)
         if status:
             query = query.where("status", "==", status)
-            
-        docs = query.stream()
         
-        for doc in docs:
-            fumigation = Fumigation.from_dict(doc.id, doc.to_dict())
-            fumigations.append(fumigation)
+        # Las consultas idénticas simultáneas comparten una sola lectura
+        rows = self.flights.do((self.collection, "all", field_id, applicator_id, status), lambda: stream_rows(query))
+        
+        return [Fumigation.from_dict(doc_id, data) for doc_id, data in rows]
+    
+    def get_page(self, page_size=DEFAULT_PAGE_SIZE, cursor=None, field_id=None, applicator_id=None,
+                 status=None, month=None, order_by="date", descending=True):
+        """
+        Obtiene una página de fumigaciones (por defecto la más reciente primero),
+        opcionalmente filtrada por campo, aplicador, estado y/o mes (YYYY-MM).
+        Retorna {"items": [Fumigation], "next_cursor": cursor para la siguiente página, "has_more": bool}
+        """
+        rows = self.replica.query(self.collection, order_by=order_by, descending=descending,
+                                  field_id=field_id, applicator_id=applicator_id, status=status,
+                                  date_month=month)
+        if rows is not None:
+            return slice_page(rows, Fumigation.from_dict, page_size=page_size, cursor=cursor,
+                              order_by=order_by, descending=descending)
+        
+        query = self.db.collection(self.collection)
+        
+        # Aplicar filtros si se proporcionan
+        if field_id:
+            query = query.where("field_id", "==", field_id)
+        if applicator_id:
+            query = query.where("applicator_id", "==", applicator_id)
+        if status:
+            query = query.where("status", "==", status)
+        if month:
+            # Rango de fechas del mes (en UTC, igual que month_key)
+            start, end = month_range(month)
+            query = query.where("date", ">=", start).where("date", "<", end)
         
-        return fumigations
+        return fetch_page(query, order_by, lambda doc: Fumigation.from_dict(doc.id, doc.to_dict()),
+                          page_size=page_size, cursor=cursor, descending=descending)
     
     def get_by_id(self, fumigation_id):
-        """Obtiene una fumigación por su ID"""
-        doc = self.db.collection(self.collection).document(fumigation_id).get()
-        if doc.exists:
-            return Fumigation.from_dict(doc.id, doc.to_dict())
+        """Obtiene una fumigación por su ID (desde el caché si está disponible)"""
+        data = self.cache.get_document(self.db, self.collection, fumigation_id)
+        if data is not None:
+            return Fumigation.from_dict(fumigation_id, data)
         return None
     
     def create(self, fumigation):
@@ -48,39 +101,30 @@ class FumigationController:
             return {"success": False, "error": "Se requiere al menos un producto para la fumigación"}
         
         try:
-            # Verificar que el campo exista
-            field_doc = self.db.collection('fields').document(fumigation.field_id).get()
-            if not field_doc.exists:
-                return {"success": False, "error": "El campo especificado no existe"}
+            # Verificar campo, aplicador y productos en una sola lectura (sin releer los que están en caché)
+            resolver = ReferenceResolver(self.db)
+            self._add_references(resolver, fumigation.field_id, fumigation.applicator_id, fumigation.products)
+            resolver.resolve(cache=self.cache)
             
-            # Verificar que el aplicador exista
-            applicator_doc = self.db.collection('users').document(fumigation.applicator_id).get()
-            if not applicator_doc.exists:
-                return {"success": False, "error": "El aplicador especificado no existe"}
+            errors = self._reference_errors(resolver, fumigation.field_id, fumigation.applicator_id, fumigation.products)
+            if errors:
+                return {"success": False, "error": "\n".join(errors), "errors": errors}
             
-            # Verificar que los productos existan en stock
-            for product_id in fumigation.products:
-                product_doc = self.db.collection('stock').document(product_id).get()
-                if not product_doc.exists:
-                    return {"success": False, "error": f"El producto con ID {product_id} no existe en stock"}
-                
-                # Verificar que el producto esté recibido
-                product_data = product_doc.to_dict()
-                if product_data.get("status") != "received":
-                    return {"success": False, "error": f"El producto con ID {product_id} no está disponible para uso"}
-                
-                # Verificar que haya cantidad suficiente
-                quantity = product_data.get("quantity", 0)
-                if quantity <= 0:
-                    return {"success": False, "error": f"El producto con ID {product_id} no tiene cantidad suficiente"}
-            
-            # Crear el documento en Firestore
+            # Crear el documento en Firestore junto con sus contadores de estadísticas
             doc_ref = self.db.collection(self.collection).document()
             fumigation.id = doc_ref.id
-            doc_ref.set(fumigation.to_dict())
+            
+            batch = self.db.batch()
+            batch.set(doc_ref, fumigation.to_dict())
+            delta = FumigationStatsDelta()
+            delta.add(fumigation.to_dict())
+            delta.write(self.db, batch)
+            batch.commit()
+            self.cache.set(self.collection, fumigation.id, fumigation.to_dict())
+            self.flights.forget(self.collection)
             
             # Registrar en log de auditoría
-            self._log_action("create", fumigation.id, fumigation.to_dict())
+            log_action(self.collection, fumigation.id, "create", fumigation.to_dict())
             
             return {"success": True, "id": fumigation.id}
         except Exception as e:
@@ -89,109 +133,125 @@ class FumigationController:
     def update(self, fumigation_id, data):
         """Actualiza una fumigación existente"""
         try:
-            doc_ref = self.db.collection(self.collection).document(fumigation_id)
-            doc = doc_ref.get()
-            
-            if not doc.exists:
-                return {"success": False, "error": "Fumigación no encontrada"}
-            
-            # Obtener datos actuales
-            current_data = doc.to_dict()
-            
-            # Verificar si se puede actualizar según el estado
-            current_status = current_data.get("status")
-            new_status = data.get("status", current_status)
-            
-            # Si la fumigación está completada o cancelada, solo se puede actualizar si se está cambiando a un estado previo
-            if current_status in ["completed", "cancelled"] and new_status in ["completed", "cancelled"] and current_status != new_status:
-                return {"success": False, "error": f"No se puede cambiar el estado de '{current_status}' a '{new_status}'"}
-            
-            # Verificar que el campo exista si se está actualizando
-            if "field_id" in data and data["field_id"]:
-                field_doc = self.db.collection('fields').document(data["field_id"]).get()
-                if not field_doc.exists:
-                    return {"success": False, "error": "El campo especificado no existe"}
-            
-            # Verificar que el aplicador exista si se está actualizando
-            if "applicator_id" in data and data["applicator_id"]:
-                applicator_doc = self.db.collection('users').document(data["applicator_id"]).get()
-                if not applicator_doc.exists:
-                    return {"success": False, "error": "El aplicador especificado no existe"}
+            @firestore.transactional
+            def run_update(transaction):
+                return self._update_in_transaction(transaction, fumigation_id, data)
             
-            # Verificar productos si se están actualizando
-            if "products" in data and data["products"]:
-                for product_id in data["products"]:
-                    product_doc = self.db.collection('stock').document(product_id).get()
-                    if not product_doc.exists:
-                        return {"success": False, "error": f"El producto con ID {product_id} no existe en stock"}
-                    
-                    # Verificar que el producto esté recibido
-                    product_data = product_doc.to_dict()
-                    if product_data.get("status") != "received":
-                        return {"success": False, "error": f"El producto con ID {product_id} no está disponible para uso"}
-                    
-                    # Verificar que haya cantidad suficiente
-                    quantity = product_data.get("quantity", 0)
-                    if quantity <= 0:
-                        return {"success": False, "error": f"El producto con ID {product_id} no tiene cantidad suficiente"}
+            result = run_update(self.db.transaction())
             
-            # Actualizar solo los campos proporcionados
-            update_data = {}
-            if "field_id" in data:
-                update_data["field_id"] = data["field_id"]
-            if "applicator_id" in data:
-                update_data["applicator_id"] = data["applicator_id"]
-            if "products" in data:
-                update_data["products"] = data["products"]
-            if "date" in data:
-                update_data["date"] = data["date"]
-            if "status" in data:
-                update_data["status"] = data["status"]
-            if "notes" in data:
-                update_data["notes"] = data["notes"]
-            if "dosage" in data:
-                update_data["dosage"] = data["dosage"]
-            
-            update_data["updated_at"] = datetime.datetime.now()
-            
-            # Si se está completando la fumigación, registrar la fecha de finalización
-            if new_status == "completed" and current_status != "completed":
-                update_data["completed_at"] = datetime.datetime.now()
-            
-            # Actualizar en Firestore
-            doc_ref.update(update_data)
-            
-            # Registrar en log de auditoría
-            self._log_action("update", fumigation_id, update_data)
+            if result["success"]:
+                self.cache.invalidate(self.collection, fumigation_id)
+                self.flights.forget(self.collection)
+                
+                # Registrar en log de auditoría
+                log_action(self.collection, fumigation_id, "update", result.pop("update_data"))
             
-            return {"success": True}
+            return result
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def _update_in_transaction(self, transaction, fumigation_id, data):
+        """Valida y actualiza la fumigación ajustando sus contadores en la misma transacción"""
+        doc_ref = self.db.collection(self.collection).document(fumigation_id)
+        
+        # Resolver la fumigación y las referencias modificadas en una sola lectura
+        field_id = data.get("field_id")
+        applicator_id = data.get("applicator_id")
+        products = data.get("products")
+        
+        resolver = ReferenceResolver(self.db)
+        resolver.add(self.collection, fumigation_id)
+        self._add_references(resolver, field_id, applicator_id, products)
+        resolver.resolve(transaction=transaction)
+        
+        # Obtener datos actuales
+        current_data = resolver.get(self.collection, fumigation_id)
+        if current_data is None:
+            return {"success": False, "error": "Fumigación no encontrada"}
+        
+        # Verificar si se puede actualizar según el estado
+        current_status = current_data.get("status")
+        new_status = data.get("status", current_status)
+        
+        # Si la fumigación está completada o cancelada, solo se puede actualizar si se está cambiando a un estado previo
+        if current_status in ["completed", "cancelled"] and new_status in ["completed", "cancelled"] and current_status != new_status:
+            return {"success": False, "error": f"No se puede cambiar el estado de '{current_status}' a '{new_status}'"}
+        
+        # Completar descuenta el stock dosificado, así que solo se hace con change_status
+        if new_status == "completed" and current_status != "completed":
+            return {"success": False, "error": "Para completar la fumigación use el cambio de estado, que descuenta el stock dosificado"}
+        
+        # Verificar campo, aplicador y productos si se están actualizando
+        errors = self._reference_errors(resolver, field_id, applicator_id, products)
+        if errors:
+            return {"success": False, "error": "\n".join(errors), "errors": errors}
+        
+        # Actualizar solo los campos proporcionados
+        update_data = {}
+        if "field_id" in data:
+            update_data["field_id"] = data["field_id"]
+        if "applicator_id" in data:
+            update_data["applicator_id"] = data["applicator_id"]
+        if "products" in data:
+            update_data["products"] = data["products"]
+        if "date" in data:
+            update_data["date"] = data["date"]
+        if "status" in data:
+            update_data["status"] = data["status"]
+        if "notes" in data:
+            update_data["notes"] = data["notes"]
+        if "dosage" in data:
+            update_data["dosage"] = data["dosage"]
+        
+        update_data["updated_at"] = datetime.datetime.now()
+        
+        # Reemplazar el aporte anterior a las estadísticas por el nuevo
+        delta = FumigationStatsDelta()
+        delta.remove(current_data)
+        delta.add({**current_data, **update_data})
+        
+        # Actualizar en Firestore
+        transaction.update(doc_ref, update_data)
+        delta.write(self.db, transaction)
+        
+        return {"success": True, "update_data": update_data}
+    
     def delete(self, fumigation_id):
         """Elimina una fumigación"""
         try:
-            doc_ref = self.db.collection(self.collection).document(fumigation_id)
-            doc = doc_ref.get()
-            
-            if not doc.exists:
-                return {"success": False, "error": "Fumigación no encontrada"}
-            
-            # Verificar si la fumigación está en curso o programada
-            fumigation_data = doc.to_dict()
-            status = fumigation_data.get("status")
-            
-            if status == "in_progress":
-                return {"success": False, "error": "No se puede eliminar una fumigación en curso"}
+            @firestore.transactional
+            def run_delete(transaction):
+                doc_ref = self.db.collection(self.collection).document(fumigation_id)
+                doc = doc_ref.get(transaction=transaction)
+                
+                if not doc.exists:
+                    return {"success": False, "error": "Fumigación no encontrada"}
+                
+                # Verificar si la fumigación está en curso o programada
+                fumigation_data = doc.to_dict()
+                status = fumigation_data.get("status")
+                
+                if status == "in_progress":
+                    return {"success": False, "error": "No se puede eliminar una fumigación en curso"}
+                
+                # Eliminar documento y su aporte a las estadísticas
+                delta = FumigationStatsDelta()
+                delta.remove(fumigation_data)
+                transaction.delete(doc_ref)
+                delta.write(self.db, transaction)
+                
+                # Retornar los datos eliminados para el log
+                return {"success": True, "old_data": fumigation_data}
             
-            # Guardar datos para log antes de eliminar
-            old_data = doc.to_dict()
+            result = run_delete(self.db.transaction())
+            if not result["success"]:
+                return result
             
-            # Eliminar documento
-            doc_ref.delete()
+            self.cache.invalidate(self.collection, fumigation_id)
+            self.flights.forget(self.collection)
             
             # Registrar en log de auditoría
-            self._log_action("delete", fumigation_id, old_data)
+            log_action(self.collection, fumigation_id, "delete", result["old_data"])
             
             return {"success": True}
         except Exception as e:
@@ -205,132 +265,193 @@ class FumigationController:
             return {"success": False, "error": f"Estado no válido. Debe ser uno de: {', '.join(valid_statuses)}"}
         
         try:
-            doc_ref = self.db.collection(self.collection).document(fumigation_id)
-            doc = doc_ref.get()
-            
-            if not doc.exists:
-                return {"success": False, "error": "Fumigación no encontrada"}
-            
-            fumigation_data = doc.to_dict()
-            current_status = fumigation_data.get("status")
-            
-            # Validar transiciones de estado
-            valid_transitions = {
-                "scheduled": ["in_progress", "cancelled"],
-                "in_progress": ["completed", "cancelled"],
-                "completed": [],  # No se puede cambiar desde completado
-                "cancelled": ["scheduled"]  # Solo se puede reactivar
-            }
-            
-            if new_status not in valid_transitions.get(current_status, []):
-                return {"success": False, "error": f"No se puede cambiar el estado de '{current_status}' a '{new_status}'"}
-            
-            # Preparar datos de actualización
-            update_data = {
-                "status": new_status,
-                "updated_at": datetime.datetime.now()
-            }
+            @firestore.transactional
+            def run_change(transaction):
+                return self._change_status_in_transaction(transaction, fumigation_id, new_status)
             
-            # Si se está completando, registrar la fecha de finalización
-            if new_status == "completed":
-                update_data["completed_at"] = datetime.datetime.now()
+            result = run_change(self.db.transaction())
             
-            # Si se está iniciando, registrar la fecha de inicio
-            if new_status == "in_progress" and current_status == "scheduled":
-                update_data["started_at"] = datetime.datetime.now()
-            
-            # Actualizar en Firestore
-            doc_ref.update(update_data)
-            
-            # Registrar en log de auditoría
-            self._log_action("change_status", fumigation_id, {"from": current_status, "to": new_status})
+            if result["success"]:
+                self.cache.invalidate(self.collection, fumigation_id)
+                self.flights.forget(self.collection)
+                
+                # Al completar se descuenta el stock dosificado
+                consumed = result.get("consumed")
+                if consumed:
+                    self.cache.invalidate('stock', *consumed)
+                    self.flights.forget('stock')
             
-            return {"success": True}
+            return result
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def get_scheduled_fumigations(self, days=7):
-        """Obtiene las fumigaciones programadas para los próximos días"""
-        try:
-            # Calcular fecha límite
-            today = datetime.datetime.now()
-            end_date = today + datetime.timedelta(days=days)
-            
-            # Obtener fumigaciones programadas
-            fumigations = []
-            query = self.db.collection(self.collection).where("status", "==", "scheduled")
-            docs = query.stream()
-            
-            for doc in docs:
-                fumigation = Fumigation.from_dict(doc.id, doc.to_dict())
+    def _change_status_in_transaction(self, transaction, fumigation_id, new_status):
+        """Valida la transición y cambia el estado ajustando los contadores en la misma transacción"""
+        doc_ref = self.db.collection(self.collection).document(fumigation_id)
+        doc = doc_ref.get(transaction=transaction)
+        
+        if not doc.exists:
+            return {"success": False, "error": "Fumigación no encontrada"}
+        
+        fumigation_data = doc.to_dict()
+        current_status = fumigation_data.get("status")
+        
+        # Completar una fumigación ya completada (un reintento) no vuelve a descontar stock
+        if current_status == "completed" and new_status == "completed":
+            return {"success": True, "consumed": {}}
+        
+        # Validar transiciones de estado
+        valid_transitions = {
+            "scheduled": ["in_progress", "cancelled"],
+            "in_progress": ["completed", "cancelled"],
+            "completed": [],  # No se puede cambiar desde completado
+            "cancelled": ["scheduled"]  # Solo se puede reactivar
+        }
+        
+        if new_status not in valid_transitions.get(current_status, []):
+            return {"success": False, "error": f"No se puede cambiar el estado de '{current_status}' a '{new_status}'"}
+        
+        # Preparar datos de actualización
+        update_data = {
+            "status": new_status,
+            "updated_at": datetime.datetime.now()
+        }
+        
+        # Si se está completando, registrar la fecha de finalización
+        if new_status == "completed":
+            update_data["completed_at"] = datetime.datetime.now()
+        
+        # Si se está iniciando, registrar la fecha de inicio
+        if new_status == "in_progress" and current_status == "scheduled":
+            update_data["started_at"] = datetime.datetime.now()
+        
+        # Al completar, descontar del stock cada producto dosificado en la misma transacción
+        consumed = {}
+        if new_status == "completed" and not fumigation_data.get("stock_consumed"):
+            consumed = {stock_id: quantity for stock_id, quantity in (fumigation_data.get("dosage") or {}).items()
+                        if quantity}
+            
+            if len(consumed) > MAX_DOSAGE_PRODUCTS:
+                return {"success": False, "error": f"No se pueden descontar más de {MAX_DOSAGE_PRODUCTS} productos a la vez"}
+            
+            if consumed:
+                # Leer todos los lotes en una sola llamada antes de escribir
+                resolver = ReferenceResolver(self.db)
+                resolver.add_many('stock', list(consumed))
+                resolver.resolve(transaction=transaction)
+                lots = {stock_id: resolver.get('stock', stock_id) for stock_id in consumed}
                 
-                # Filtrar por fecha si está dentro del rango
-                if fumigation.date and fumigation.date <= end_date:
-                    fumigations.append(fumigation)
-            
-            return fumigations
+                result = consume_lots(self.db, transaction, lots, consumed, reference=fumigation_id,
+                                      timestamp=update_data["updated_at"])
+                if not result["success"]:
+                    return result
+                
+                update_data["stock_consumed"] = True
+        
+        # Mover la fumigación al contador del nuevo estado
+        delta = FumigationStatsDelta()
+        delta.remove(fumigation_data)
+        delta.add({**fumigation_data, **update_data})
+        
+        # Actualizar en Firestore
+        transaction.update(doc_ref, update_data)
+        delta.write(self.db, transaction)
+        
+        # La auditoría se escribe en la misma transacción para que sea atómica con el consumo
+        log_data = {"from": current_status, "to": new_status}
+        if consumed:
+            log_data["consumed"] = consumed
+        log_entry = AuditLog(collection=self.collection, document_id=fumigation_id, action="change_status", data=log_data)
+        transaction.set(self.db.collection('audit_logs').document(log_entry.id), log_entry.to_dict())
+        
+        return {"success": True, "consumed": consumed}
+    
+    def get_scheduled_fumigations(self, days=7, limit=SCHEDULED_QUERY_LIMIT):
+        """
+        Obtiene las fumigaciones programadas desde hoy hasta los próximos días,
+        ordenadas por fecha. Las atrasadas se obtienen con get_overdue_fumigations.
+        """
+        try:
+            # Calcular ventana de fechas (desde el inicio de hoy)
+            today = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            end_date = datetime.datetime.now() + datetime.timedelta(days=days)
+            
+            # El rango de fechas, el orden y el límite se aplican en la consulta
+            query = (self.db.collection(self.collection)
+                     .where("status", "==", "scheduled")
+                     .where("date", ">=", today)
+                     .where("date", "<=", end_date)
+                     .order_by("date")
+                     .limit(limit))
+            
+            return [Fumigation.from_dict(doc.id, doc.to_dict()) for doc in query.stream()]
         except Exception as e:
             print(f"Error al obtener fumigaciones programadas: {str(e)}")
             return []
     
-    def get_fumigation_statistics(self):
-        """Obtiene estadísticas de fumigaciones"""
+    def get_overdue_fumigations(self, limit=SCHEDULED_QUERY_LIMIT):
+        """Obtiene las fumigaciones programadas cuya fecha ya pasó, la más atrasada primero"""
         try:
-            # Obtener todas las fumigaciones
-            fumigations = self.get_all()
+            today = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
             
-            if not fumigations:
-                return {"success": True, "data": {}}
+            query = (self.db.collection(self.collection)
+                     .where("status", "==", "scheduled")
+                     .where("date", "<", today)
+                     .order_by("date")
+                     .limit(limit))
             
-            # Preparar datos de estadísticas
-            stats = {
-                "total": len(fumigations),
-                "by_status": {
-                    "scheduled": 0,
-                    "in_progress": 0,
-                    "completed": 0,
-                    "cancelled": 0
-                },
-                "by_field": {},
-                "by_applicator": {},
-                "by_month": {}
-            }
+            return [Fumigation.from_dict(doc.id, doc.to_dict()) for doc in query.stream()]
+        except Exception as e:
+            print(f"Error al obtener fumigaciones atrasadas: {str(e)}")
+            return []
+    
+    def get_fumigation_statistics(self, start_date=None, end_date=None, field_id=None):
+        """
+        Obtiene estadísticas de fumigaciones, opcionalmente filtradas por rango de
+        fechas (por meses completos) y/o por campo.
+        
+        Se arman desde los contadores mensuales (utils/fumigation_stats.py), que se
+        actualizan en cada escritura de fumigaciones, sin leer el historial completo.
+        """
+        try:
+            stats = build_statistics(read_months(self.db, start_date, end_date), field_id)
             
-            # Procesar cada fumigación
-            for fumigation in fumigations:
-                # Contar por estado
-                status = fumigation.status or "scheduled"
-                stats["by_status"][status] = stats["by_status"].get(status, 0) + 1
-                
-                # Contar por campo
-                if fumigation.field_id:
-                    stats["by_field"][fumigation.field_id] = stats["by_field"].get(fumigation.field_id, 0) + 1
-                
-                # Contar por aplicador
-                if fumigation.applicator_id:
-                    stats["by_applicator"][fumigation.applicator_id] = stats["by_applicator"].get(fumigation.applicator_id, 0) + 1
-                
-                # Contar por mes
-                if fumigation.date:
-                    month_key = fumigation.date.strftime("%Y-%m")
-                    stats["by_month"][month_key] = stats["by_month"].get(month_key, 0) + 1
+            if not stats["total"]:
+                return {"success": True, "data": {}}
             
             return {"success": True, "data": stats}
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def _log_action(self, action, fumigation_id, data):
-        """Registra acciones en el log de auditoría"""
-        try:
-            log_data = {
-                "collection": self.collection,
-                "document_id": fumigation_id,
-                "action": action,
-                "data": data,
-                "timestamp": datetime.datetime.now(),
-                "user_id": "current_user_id"  # Esto debe ser reemplazado con el ID del usuario actual
-            }
-            
-            self.db.collection('audit_logs').add(log_data)
-        except Exception as e:
-            print(f"Error al registrar en log de auditoría: {str(e)}")
\ No newline at end of file
+    def _add_references(self, resolver, field_id=None, applicator_id=None, products=None):
+        """Registra en el resolvedor las referencias de campo, aplicador y productos"""
+        if field_id:
+            resolver.add('fields', field_id)
+        if applicator_id:
+            resolver.add('users', applicator_id)
+        if products:
+            resolver.add_many('stock', products)
+    
+    def _reference_errors(self, resolver, field_id=None, applicator_id=None, products=None):
+        """Valida las referencias ya resueltas y retorna un error por cada referencia inválida"""
+        errors = []
+        
+        # Verificar que el campo exista
+        if field_id and not resolver.exists('fields', field_id):
+            errors.append("El campo especificado no existe")
+        
+        # Verificar que el aplicador exista
+        if applicator_id and not resolver.exists('users', applicator_id):
+            errors.append("El aplicador especificado no existe")
+        
+        # Verificar que los productos existan en stock, estén recibidos y tengan cantidad
+        for product_id in products or []:
+            product_data = resolver.get('stock', product_id)
+            if product_data is None:
+                errors.append(f"El producto con ID {product_id} no existe en stock")
+            elif product_data.get("status") != "received":
+                errors.append(f"El producto con ID {product_id} no está disponible para uso")
+            elif product_data.get("quantity", 0) <= 0:
+                errors.append(f"El producto con ID {product_id} no tiene cantidad suficiente")
+        
+        return errors
\ No newline at end of file
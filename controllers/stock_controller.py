@@ -1,16 +1,43 @@
 # controllers/stock_controller.py
 from models.stock import Stock
+from models.audit_log import AuditLog
 from config.firebase_config import get_firestore_db
+from utils.audit_logger import log_action
+from utils.projection import project_data as _project_data
+from utils.pagination import fetch_page, slice_page, DEFAULT_PAGE_SIZE
+from utils.replica_store import get_replica_store
+from utils.cache_manager import get_cache_manager
+from utils.single_flight import get_single_flight, stream_rows
+from utils.lot_allocator import get_lot_allocator
+from utils.units import normalized_fields
+from firebase_admin import firestore
+from utils.reference_resolver import ReferenceResolver
+from utils.stock_aggregates import StockAggregateDelta, read_cells, build_summary
+from utils.stock_ledger import (StockLedgerEntries, read_movements, balance_as_of, consume_lots,
+                                RECEIPT, TRANSFER_OUT, TRANSFER_IN, ADJUSTMENT)
 import datetime
 
+# Máximo de movimientos por transferencia (cada uno genera hasta dos escrituras de
+# lotes, dos de agregados, dos movimientos del libro y dos checkpoints, y una
+# transacción de Firestore admite 500)
+MAX_TRANSFER_MOVES = 60
+
 class StockController:
     def __init__(self):
         self.db = get_firestore_db()
         self.collection = 'stock'
+        self.replica = get_replica_store()
+        self.cache = get_cache_manager()
+        self.flights = get_single_flight()
+        self.allocator = get_lot_allocator()
     
     def get_all(self, warehouse_id=None, status=None):
         """Obtiene todos los productos en stock, opcionalmente filtrados por almacén y/o estado"""
-        stock_items = []
+        # Si la réplica local está sincronizada, leer de memoria sin ir a la red
+        rows = self.replica.query(self.collection, warehouse_id=warehouse_id, status=status)
+        if rows is not None:
+            return [Stock.from_dict(doc_id, data) for doc_id, data in rows]
+        
         query = self.db.collection(self.collection)
         
         # Aplicar filtros si se proporcionan
@@ -18,20 +45,66 @@ class StockController:
             query = query.where("warehouse_id", "==", warehouse_id)
         if status:
             query = query.where("status", "==", status)
-            
-        docs = query.stream()
         
-        for doc in docs:
-            stock_item = Stock.from_dict(doc.id, doc.to_dict())
-            stock_items.append(stock_item)
+        # Las consultas idénticas simultáneas comparten una sola lectura
+        rows = self.flights.do((self.collection, "all", warehouse_id, status), lambda: stream_rows(query))
+        
+        return [Stock.from_dict(doc_id, data) for doc_id, data in rows]
+    
+    def get_all_projected(self, fields, warehouse_id=None, status=None):
+        """
+        Obtiene solo los campos indicados de cada producto (proyección en el servidor),
+        opcionalmente filtrados por almacén y/o estado
+        """
+        rows = self.replica.query(self.collection, warehouse_id=warehouse_id, status=status)
+        if rows is not None:
+            return [_project_data(doc_id, data, fields) for doc_id, data in rows]
+        
+        query = self.db.collection(self.collection)
+        
+        # Aplicar filtros si se proporcionan
+        if warehouse_id:
+            query = query.where("warehouse_id", "==", warehouse_id)
+        if status:
+            query = query.where("status", "==", status)
+        
+        query = query.select(list(fields))
+        rows = self.flights.do((self.collection, "projected", tuple(fields), warehouse_id, status),
+                               lambda: stream_rows(query))
+        
+        return [_project_data(doc_id, data, fields) for doc_id, data in rows]
+    
+    def get_page(self, page_size=DEFAULT_PAGE_SIZE, cursor=None, warehouse_id=None, status=None,
+                 category=None, order_by="product_name", descending=False):
+        """
+        Obtiene una página de productos ordenada por order_by, opcionalmente
+        filtrada por almacén, estado y/o categoría.
+        Retorna {"items": [Stock], "next_cursor": cursor para la siguiente página, "has_more": bool}
+        """
+        rows = self.replica.query(self.collection, order_by=order_by, descending=descending,
+                                  warehouse_id=warehouse_id, status=status, category=category)
+        if rows is not None:
+            return slice_page(rows, Stock.from_dict, page_size=page_size, cursor=cursor,
+                              order_by=order_by, descending=descending)
+        
+        query = self.db.collection(self.collection)
         
-        return stock_items
+        # Aplicar filtros si se proporcionan
+        if warehouse_id:
+            query = query.where("warehouse_id", "==", warehouse_id)
+        if status:
+            query = query.where("status", "==", status)
+        if category:
+            query = query.where("category", "==", category)
+        
+        return fetch_page(query, order_by, lambda doc: Stock.from_dict(doc.id, doc.to_dict()),
+                          page_size=page_size, cursor=cursor, descending=descending)
     
     def get_by_id(self, stock_id):
-        """Obtiene un elemento de stock por su ID"""
-        doc = self.db.collection(self.collection).document(stock_id).get()
-        if doc.exists:
-            return Stock.from_dict(doc.id, doc.to_dict())
+        """Obtiene un elemento de stock por su ID (desde el caché si está disponible)"""
+        data = self.cache.get_document(self.db, self.collection, stock_id)
+        if data is not None:
+            return Stock.from_dict(stock_id, data)
         return None
     
     def create(self, stock):
@@ -51,17 +124,30 @@ class StockController:
         try:
             # Si tiene warehouse_id, verificar que exista
             if stock.warehouse_id:
-                warehouse_doc = self.db.collection('warehouses').document(stock.warehouse_id).get()
-                if not warehouse_doc.exists:
+                if self.cache.get_document(self.db, 'warehouses', stock.warehouse_id) is None:
                     return {"success": False, "error": "El almacén especificado no existe"}
             
-            # Crear el documento en Firestore
+            # Crear el documento en Firestore junto con su aporte a los agregados
+            # y el movimiento de ingreso en el libro
             doc_ref = self.db.collection(self.collection).document()
             stock.id = doc_ref.id
-            doc_ref.set(stock.to_dict())
+            
+            ledger = StockLedgerEntries()
+            stock_data = {**stock.to_dict(), **ledger.record(stock.id, None, RECEIPT, stock.quantity,
+                                                             warehouse_id=stock.warehouse_id)}
+            
+            batch = self.db.batch()
+            batch.set(doc_ref, stock_data)
+            delta = StockAggregateDelta()
+            delta.add(stock_data)
+            delta.write(self.db, batch)
+            ledger.write(self.db, batch)
+            batch.commit()
+            self.cache.set(self.collection, stock.id, stock_data)
+            self.flights.forget(self.collection)
             
             # Registrar en log de auditoría
-            self._log_action("create", stock.id, stock.to_dict())
+            log_action(self.collection, stock.id, "create", stock.to_dict())
             
             return {"success": True, "id": stock.id}
         except Exception as e:
@@ -69,67 +155,122 @@ class StockController:
     
     def update(self, stock_id, data):
         """Actualiza un elemento de stock existente"""
+        # Verificar datos
+        if "quantity" in data and (not isinstance(data["quantity"], (int, float)) or data["quantity"] <= 0):
+            return {"success": False, "error": "La cantidad debe ser un número mayor que cero"}
+        
         try:
-            doc_ref = self.db.collection(self.collection).document(stock_id)
-            doc = doc_ref.get()
-            
-            if not doc.exists:
-                return {"success": False, "error": "Elemento de stock no encontrado"}
+            @firestore.transactional
+            def run_update(transaction):
+                return self._update_in_transaction(transaction, stock_id, data)
             
-            # Verificar datos
-            if "quantity" in data and (not isinstance(data["quantity"], (int, float)) or data["quantity"] <= 0):
-                return {"success": False, "error": "La cantidad debe ser un número mayor que cero"}
+            result = run_update(self.db.transaction())
             
-            # Si cambia de estado a recibido, verificar que tenga almacén
-            if "status" in data and data["status"] == "received":
-                stock_data = doc.to_dict()
-                warehouse_id = data.get("warehouse_id") or stock_data.get("warehouse_id")
-                if not warehouse_id:
-                    return {"success": False, "error": "Se requiere un almacén para productos recibidos"}
+            if result["success"]:
+                self.cache.invalidate(self.collection, stock_id)
+                self.flights.forget(self.collection)
                 
-                # Verificar que el almacén exista
-                warehouse_doc = self.db.collection('warehouses').document(warehouse_id).get()
-                if not warehouse_doc.exists:
-                    return {"success": False, "error": "El almacén especificado no existe"}
-            
-            # Actualizar solo los campos proporcionados
-            update_data = {}
-            fields = ["product_name", "quantity", "unit", "warehouse_id", "status", 
-                      "category", "purchase_date", "expiry_date"]
-            
-            for field in fields:
-                if field in data:
-                    update_data[field] = data[field]
-            
-            update_data["updated_at"] = datetime.datetime.now()
-            
-            # Actualizar en Firestore
-            doc_ref.update(update_data)
+                # Registrar en log de auditoría
+                log_action(self.collection, stock_id, "update", result.pop("update_data"))
             
-            # Registrar en log de auditoría
-            self._log_action("update", stock_id, update_data)
-            
-            return {"success": True}
+            return result
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def _update_in_transaction(self, transaction, stock_id, data):
+        """Lee el lote, lo actualiza y ajusta los agregados en la misma transacción"""
+        doc_ref = self.db.collection(self.collection).document(stock_id)
+        doc = doc_ref.get(transaction=transaction)
+        
+        if not doc.exists:
+            return {"success": False, "error": "Elemento de stock no encontrado"}
+        
+        stock_data = doc.to_dict()
+        
+        # Si cambia de estado a recibido, verificar que tenga almacén
+        if "status" in data and data["status"] == "received":
+            warehouse_id = data.get("warehouse_id") or stock_data.get("warehouse_id")
+            if not warehouse_id:
+                return {"success": False, "error": "Se requiere un almacén para productos recibidos"}
+            
+            # Verificar que el almacén exista
+            warehouse_doc = self.db.collection('warehouses').document(warehouse_id).get(transaction=transaction)
+            if not warehouse_doc.exists:
+                return {"success": False, "error": "El almacén especificado no existe"}
+        
+        # Actualizar solo los campos proporcionados
+        update_data = {}
+        fields = ["product_name", "quantity", "unit", "warehouse_id", "status", 
+                  "category", "purchase_date", "expiry_date"]
+        
+        for field in fields:
+            if field in data:
+                update_data[field] = data[field]
+        
+        update_data["updated_at"] = datetime.datetime.now()
+        
+        # Mantener la cantidad normalizada si cambia la cantidad o la unidad
+        if "quantity" in update_data or "unit" in update_data:
+            merged = {**stock_data, **update_data}
+            update_data.update(normalized_fields(merged.get("quantity"), merged.get("unit")))
+        
+        # Un cambio de cantidad queda en el libro como ajuste
+        ledger = StockLedgerEntries()
+        old_quantity = stock_data.get("quantity") or 0
+        if "quantity" in update_data and update_data["quantity"] != old_quantity:
+            update_data.update(ledger.record(stock_id, stock_data, ADJUSTMENT, update_data["quantity"] - old_quantity,
+                                             warehouse_id=update_data.get("warehouse_id", stock_data.get("warehouse_id")),
+                                             timestamp=update_data["updated_at"]))
+        
+        # Reemplazar el aporte anterior del lote a los agregados por el nuevo
+        delta = StockAggregateDelta()
+        delta.remove(stock_data)
+        delta.add({**stock_data, **update_data})
+        
+        # Actualizar en Firestore
+        transaction.update(doc_ref, update_data)
+        delta.write(self.db, transaction)
+        ledger.write(self.db, transaction)
+        
+        return {"success": True, "update_data": update_data}
+    
     def delete(self, stock_id):
         """Elimina un elemento de stock"""
         try:
-            doc_ref = self.db.collection(self.collection).document(stock_id)
-            doc = doc_ref.get()
+            @firestore.transactional
+            def run_delete(transaction):
+                doc_ref = self.db.collection(self.collection).document(stock_id)
+                doc = doc_ref.get(transaction=transaction)
+                
+                if not doc.exists:
+                    return None
+                
+                # Guardar datos para log antes de eliminar
+                old_data = doc.to_dict()
+                
+                # Eliminar documento y su aporte a los agregados; el libro cierra el lote en cero
+                delta = StockAggregateDelta()
+                delta.remove(old_data)
+                transaction.delete(doc_ref)
+                delta.write(self.db, transaction)
+                
+                ledger = StockLedgerEntries()
+                if old_data.get("quantity"):
+                    ledger.record(stock_id, old_data, ADJUSTMENT, -old_data["quantity"], reference="delete")
+                ledger.write(self.db, transaction)
+                
+                return old_data
             
-            if not doc.exists:
-                return {"success": False, "error": "Elemento de stock no encontrado"}
+            old_data = run_delete(self.db.transaction())
             
-            # Guardar datos para log antes de eliminar
-            old_data = doc.to_dict()
+            if old_data is None:
+                return {"success": False, "error": "Elemento de stock no encontrado"}
             
-            # Eliminar documento
-            doc_ref.delete()
+            self.cache.invalidate(self.collection, stock_id)
+            self.flights.forget(self.collection)
             
             # Registrar en log de auditoría
-            self._log_action("delete", stock_id, old_data)
+            log_action(self.collection, stock_id, "delete", old_data)
             
             return {"success": True}
         except Exception as e:
@@ -137,170 +278,284 @@ class StockController:
     
     def transfer(self, stock_id, target_warehouse_id, quantity=None):
         """Transfiere stock de un almacén a otro"""
+        result = self.transfer_many([(stock_id, target_warehouse_id, quantity)])
+        
+        # Mantener la respuesta anterior: el ID del nuevo lote en transferencias parciales
+        if result["success"] and result["new_stock_ids"]:
+            result["id"] = result["new_stock_ids"][0]
+        
+        return result
+    
+    def transfer_many(self, moves):
+        """
+        Transfiere uno o varios lotes entre almacenes en una sola transacción.
+        moves es una lista de tuplas (stock_id, almacén_destino, cantidad); si la
+        cantidad es None se transfiere el lote completo.
+        """
+        moves = list(moves or [])
+        
+        if not moves:
+            return {"success": False, "error": "No se especificaron transferencias"}
+        
+        if len(moves) > MAX_TRANSFER_MOVES:
+            return {"success": False, "error": f"No se pueden realizar más de {MAX_TRANSFER_MOVES} transferencias a la vez"}
+        
         try:
+            @firestore.transactional
+            def run_transfer(transaction):
+                return self._transfer_in_transaction(transaction, moves)
+            
+            result = run_transfer(self.db.transaction())
+            
+            if result["success"]:
+                self.cache.invalidate(self.collection, *[stock_id for stock_id, _, _ in moves])
+                self.flights.forget(self.collection)
+            
+            return result
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def _transfer_in_transaction(self, transaction, moves):
+        """Lee los lotes y almacenes una sola vez y escribe todos los movimientos en la transacción"""
+        # 1. Leer todos los lotes de origen y almacenes de destino en una sola llamada
+        resolver = ReferenceResolver(self.db)
+        for stock_id, target_warehouse_id, _ in moves:
+            resolver.add(self.collection, stock_id)
+            resolver.add('warehouses', target_warehouse_id)
+        resolver.resolve(transaction=transaction)
+        
+        # 2. Validar y aplicar los movimientos sobre una copia en memoria de cada lote
+        lots = {}
+        new_lots = []
+        logged_moves = []
+        ledger = StockLedgerEntries()
+        now = datetime.datetime.now()
+        
+        for index, (stock_id, target_warehouse_id, quantity) in enumerate(moves):
+            prefix = f"Transferencia {index + 1}: " if len(moves) > 1 else ""
+            
             # Verificar que el stock exista
-            stock_item = self.get_by_id(stock_id)
-            if not stock_item:
-                return {"success": False, "error": "Elemento de stock no encontrado"}
+            if stock_id not in lots:
+                stock_data = resolver.get(self.collection, stock_id)
+                if stock_data is None:
+                    return {"success": False, "error": prefix + "Elemento de stock no encontrado"}
+                lots[stock_id] = dict(stock_data)
+            lot = lots[stock_id]
             
             # Verificar que el stock esté recibido
-            if stock_item.status != "received":
-                return {"success": False, "error": "Solo se pueden transferir productos recibidos"}
+            if lot.get("status") != "received":
+                return {"success": False, "error": prefix + "Solo se pueden transferir productos recibidos"}
             
             # Verificar que tenga almacén origen
-            if not stock_item.warehouse_id:
-                return {"success": False, "error": "El producto no está asignado a ningún almacén"}
+            source_warehouse_id = lot.get("warehouse_id")
+            if not source_warehouse_id:
+                return {"success": False, "error": prefix + "El producto no está asignado a ningún almacén"}
             
             # Verificar que el almacén destino exista
-            target_warehouse = self.db.collection('warehouses').document(target_warehouse_id).get()
-            if not target_warehouse.exists:
-                return {"success": False, "error": "El almacén de destino no existe"}
+            if not resolver.exists('warehouses', target_warehouse_id):
+                return {"success": False, "error": prefix + "El almacén de destino no existe"}
             
             # Si no se especifica cantidad, transferir todo
-            transfer_quantity = quantity if quantity is not None else stock_item.quantity
+            available = lot.get("quantity") or 0
+            transfer_quantity = quantity if quantity is not None else available
             
             # Verificar que la cantidad a transferir sea válida
             if not isinstance(transfer_quantity, (int, float)) or transfer_quantity <= 0:
-                return {"success": False, "error": "La cantidad debe ser un número mayor que cero"}
-            
-            if transfer_quantity > stock_item.quantity:
-                return {"success": False, "error": "No hay suficiente stock para transferir"}
-            
-            # Si se transfiere todo, actualizar el almacén
-            if transfer_quantity == stock_item.quantity:
-                return self.update(stock_id, {"warehouse_id": target_warehouse_id})
-            
-            # Si se transfiere parte, crear nuevo stock y reducir el original
-            # 1. Reducir cantidad del original
-            original_update = self.update(stock_id, {"quantity": stock_item.quantity - transfer_quantity})
-            if not original_update["success"]:
-                return original_update
-            
-            # 2. Crear nuevo stock en el almacén destino
-            new_stock = Stock(
-                product_name=stock_item.product_name,
-                quantity=transfer_quantity,
-                unit=stock_item.unit,
-                warehouse_id=target_warehouse_id,
-                status="received",
-                category=stock_item.category,
-                purchase_date=stock_item.purchase_date,
-                expiry_date=stock_item.expiry_date
-            )
-            
-            create_result = self.create(new_stock)
-            
-            # Registrar la transferencia en el log
-            transfer_data = {
-                "from_warehouse": stock_item.warehouse_id,
+                return {"success": False, "error": prefix + "La cantidad debe ser un número mayor que cero"}
+            
+            if transfer_quantity > available:
+                return {"success": False, "error": prefix + "No hay suficiente stock para transferir"}
+            
+            # La salida queda en el libro del lote de origen
+            original_data = resolver.get(self.collection, stock_id)
+            lot.update(ledger.record(stock_id, original_data, TRANSFER_OUT, -transfer_quantity,
+                                     warehouse_id=source_warehouse_id, reference=target_warehouse_id, timestamp=now))
+            
+            new_stock_id = None
+            if transfer_quantity == available:
+                # Si se transfiere todo, solo cambia el almacén del lote (sale y entra el mismo lote)
+                lot["warehouse_id"] = target_warehouse_id
+                lot.update(ledger.record(stock_id, original_data, TRANSFER_IN, transfer_quantity,
+                                         warehouse_id=target_warehouse_id, reference=source_warehouse_id,
+                                         timestamp=now))
+            else:
+                # Si se transfiere parte, se reduce el original y se crea un lote en destino
+                new_ref = self.db.collection(self.collection).document()
+                new_stock = Stock(
+                    id=new_ref.id,
+                    product_name=lot.get("product_name"),
+                    quantity=transfer_quantity,
+                    unit=lot.get("unit"),
+                    warehouse_id=target_warehouse_id,
+                    status="received",
+                    category=lot.get("category"),
+                    purchase_date=lot.get("purchase_date"),
+                    expiry_date=lot.get("expiry_date")
+                )
+                new_data = {**new_stock.to_dict(), **ledger.record(new_ref.id, None, TRANSFER_IN, transfer_quantity,
+                                                                   warehouse_id=target_warehouse_id,
+                                                                   reference=stock_id, timestamp=now)}
+                new_lots.append((new_ref, new_data))
+                new_stock_id = new_ref.id
+            
+            logged_moves.append({
+                "from_warehouse": source_warehouse_id,
                 "to_warehouse": target_warehouse_id,
                 "quantity": transfer_quantity,
                 "original_stock_id": stock_id,
-                "new_stock_id": create_result.get("id") if create_result["success"] else None
-            }
-            self._log_action("transfer", stock_id, transfer_data)
-            
-            return create_result
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+                "new_stock_id": new_stock_id
+            })
+        
+        # 3. Escribir los lotes modificados, los lotes nuevos, los agregados, el libro y una sola entrada de auditoría
+        delta = StockAggregateDelta()
+        for stock_id, lot in lots.items():
+            lot.update(normalized_fields(lot.get("quantity"), lot.get("unit")))
+            delta.remove(resolver.get(self.collection, stock_id))
+            delta.add(lot)
+            transaction.update(self.db.collection(self.collection).document(stock_id), {
+                "quantity": lot.get("quantity"),
+                "ledger_sequence": lot.get("ledger_sequence"),
+                "warehouse_id": lot.get("warehouse_id"),
+                "updated_at": now,
+                "base_quantity": lot["base_quantity"],
+                "base_unit": lot["base_unit"]
+            })
+        
+        for new_ref, new_data in new_lots:
+            transaction.set(new_ref, new_data)
+            delta.add(new_data)
+        
+        delta.write(self.db, transaction)
+        ledger.write(self.db, transaction)
+        
+        # La auditoría de la transferencia se escribe en la misma transacción para que sea atómica
+        if len(logged_moves) == 1:
+            log_entry = AuditLog(collection=self.collection, document_id=logged_moves[0]["original_stock_id"],
+                                 action="transfer", data=logged_moves[0])
+        else:
+            log_entry = AuditLog(collection=self.collection, action="transfer", data={"moves": logged_moves})
+        transaction.set(self.db.collection('audit_logs').document(log_entry.id), log_entry.to_dict())
+        
+        return {"success": True, "new_stock_ids": [new_ref.id for new_ref, _ in new_lots]}
     
-    def get_stock_summary(self, groupby="warehouse"):
+    def consume(self, stock_id, quantity, reference=None):
         """
-        Obtiene un resumen del stock.
-        groupby puede ser "warehouse", "product", "category"
+        Descuenta quantity del lote como consumo (por ejemplo, en una fumigación).
+        reference identifica el origen del consumo en el libro de movimientos.
         """
+        if not isinstance(quantity, (int, float)) or quantity <= 0:
+            return {"success": False, "error": "La cantidad debe ser un número mayor que cero"}
+        
         try:
-            # Obtener todo el stock recibido
-            stock_items = self.get_all(status="received")
-            
-            if not stock_items:
-                return {"success": True, "data": {}}
-            
-            summary = {}
-            
-            if groupby == "warehouse":
-                # Agrupar por almacén
-                for item in stock_items:
-                    warehouse_id = item.warehouse_id or "sin_almacen"
-                    if warehouse_id not in summary:
-                        summary[warehouse_id] = {
-                            "total_items": 0,
-                            "products": {}
-                        }
-                    
-                    # Incrementar contador de items
-                    summary[warehouse_id]["total_items"] += 1
-                    
-                    # Agregar producto
-                    if item.product_name not in summary[warehouse_id]["products"]:
-                        summary[warehouse_id]["products"][item.product_name] = {
-                            "quantity": 0,
-                            "unit": item.unit
-                        }
-                    
-                    # Sumar cantidad
-                    summary[warehouse_id]["products"][item.product_name]["quantity"] += item.quantity
+            @firestore.transactional
+            def run_consume(transaction):
+                doc = self.db.collection(self.collection).document(stock_id).get(transaction=transaction)
+                
+                if not doc.exists:
+                    return {"success": False, "error": "Elemento de stock no encontrado"}
+                
+                # Registrar el consumo y el nuevo saldo del lote en la misma transacción
+                result = consume_lots(self.db, transaction, {stock_id: doc.to_dict()}, {stock_id: quantity},
+                                      reference=reference, collection=self.collection)
+                if not result["success"]:
+                    return result
+                
+                return {"success": True, "quantity": result["balances"][stock_id]}
             
-            elif groupby == "product":
-                # Agrupar por producto
-                for item in stock_items:
-                    if item.product_name not in summary:
-                        summary[item.product_name] = {
-                            "total_quantity": 0,
-                            "unit": item.unit,
-                            "warehouses": {}
-                        }
-                    
-                    # Incrementar cantidad total
-                    summary[item.product_name]["total_quantity"] += item.quantity
-                    
-                    # Agregar almacén
-                    warehouse_id = item.warehouse_id or "sin_almacen"
-                    if warehouse_id not in summary[item.product_name]["warehouses"]:
-                        summary[item.product_name]["warehouses"][warehouse_id] = 0
-                    
-                    # Sumar cantidad en el almacén
-                    summary[item.product_name]["warehouses"][warehouse_id] += item.quantity
+            result = run_consume(self.db.transaction())
             
-            elif groupby == "category":
-                # Agrupar por categoría
-                for item in stock_items:
-                    category = item.category or "sin_categoria"
-                    if category not in summary:
-                        summary[category] = {
-                            "total_items": 0,
-                            "products": {}
-                        }
-                    
-                    # Incrementar contador de items
-                    summary[category]["total_items"] += 1
-                    
-                    # Agregar producto
-                    if item.product_name not in summary[category]["products"]:
-                        summary[category]["products"][item.product_name] = {
-                            "quantity": 0,
-                            "unit": item.unit
-                        }
-                    
-                    # Sumar cantidad
-                    summary[category]["products"][item.product_name]["quantity"] += item.quantity
+            if result["success"]:
+                self.cache.invalidate(self.collection, stock_id)
+                self.flights.forget(self.collection)
+                
+                # Registrar en log de auditoría
+                log_action(self.collection, stock_id, "consume", {"quantity": quantity, "reference": reference})
             
-            return {"success": True, "data": summary}
+            return result
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def _log_action(self, action, stock_id, data):
-        """Registra acciones en el log de auditoría"""
+    def allocate_lots(self, product_name, quantity, warehouse_id=None, as_of=None, unit=None):
+        """
+        Elige los lotes recibidos del producto que cubren la cantidad (en unit o,
+        sin unit, en la unidad base del producto, que debe ser una sola),
+        primero los que vencen antes (FEFO) y, si se indica, primero los del
+        almacén. No descuenta stock; retorna el plan en "lots" como
+        [(ID del lote, cantidad en su unidad)].
+        """
+        if not product_name:
+            return {"success": False, "error": "El nombre del producto es obligatorio"}
+        
+        if not isinstance(quantity, (int, float)) or quantity <= 0:
+            return {"success": False, "error": "La cantidad debe ser un número mayor que cero"}
+        
         try:
-            log_data = {
-                "collection": self.collection,
-                "document_id": stock_id,
-                "action": action,
-                "data": data,
-                "timestamp": datetime.datetime.now(),
-                "user_id": "current_user_id"  # Esto debe ser reemplazado con el ID del usuario actual
-            }
-            
-            self.db.collection('audit_logs').add(log_data)
+            allocation = self.allocator.allocate(product_name, quantity, warehouse_id, as_of, unit)
+            if allocation["shortfall"] > 0:
+                shown_unit = allocation["unit"]
+                missing = f"{allocation['shortfall']:g} {shown_unit}" if shown_unit else f"{allocation['shortfall']:g}"
+                return {"success": False, "error": f"No hay suficiente stock de {product_name} sin vencer (faltan {missing})"}
+            return {"success": True, "lots": allocation["lots"]}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def allocate_dosage(self, dosage, warehouse_id=None, as_of=None):
+        """
+        Reparte una dosis {ID de lote: cantidad} (como Fumigation.dosage) entre los
+        lotes del mismo producto por orden de vencimiento. Retorna en "dosage" el
+        plan con la misma forma, {ID de lote: cantidad}.
+        """
+        # Sumar las cantidades por producto en su unidad base (cada dosis está en la unidad de su lote)
+        required = {}
+        for stock_id, quantity in (dosage or {}).items():
+            stock = self.get_by_id(stock_id)
+            if stock is None:
+                return {"success": False, "error": f"El producto con ID {stock_id} no existe"}
+            normalized = normalized_fields(quantity, stock.unit)
+            key = (stock.product_name, normalized["base_unit"])
+            required[key] = required.get(key, 0) + normalized["base_quantity"]
+        
+        plan = {}
+        for (product_name, base_unit), quantity in required.items():
+            if quantity <= 0:
+                continue
+            result = self.allocate_lots(product_name, quantity, warehouse_id, as_of, unit=base_unit)
+            if not result["success"]:
+                return result
+            for stock_id, amount in result["lots"]:
+                plan[stock_id] = plan.get(stock_id, 0) + amount
+        
+        return {"success": True, "dosage": plan}
+    
+    def get_movements(self, stock_id, limit=None):
+        """Obtiene los movimientos de un lote, del más reciente al más antiguo"""
+        try:
+            return {"success": True, "data": read_movements(self.db, stock_id, limit)}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def get_balance_as_of(self, stock_id, as_of):
+        """
+        Obtiene el saldo de un lote a una fecha. El saldo actual es la cantidad del
+        lote; el histórico se arma desde el último checkpoint anterior a la fecha
+        más los movimientos siguientes (utils/stock_ledger.py)
+        """
+        try:
+            return {"success": True, "data": balance_as_of(self.db, stock_id, as_of)}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def get_stock_summary(self, groupby="warehouse", unit=None):
+        """
+        Obtiene un resumen del stock.
+        groupby puede ser "warehouse", "product", "category"
+        unit es la unidad en la que se informan las cantidades (por ejemplo "ton");
+        si no se indica, cada producto se informa en su unidad base (kg, l, unidad)
+        
+        Se arma desde los agregados materializados (utils/stock_aggregates.py),
+        que se actualizan en cada escritura de stock, sin leer todos los lotes.
+        """
+        try:
+            return {"success": True, "data": build_summary(read_cells(self.db), groupby, unit)}
         except Exception as e:
-            print(f"Error al registrar en log de auditoría: {str(e)}")
\ No newline at end of file
+            return {"success": False, "error": str(e)}
\ No newline at end of file
@@ -1,5 +1,10 @@
 # controllers/user_controller.py
 from config.firebase_config import get_firestore_db
+from utils.projection import project_data as _project_data
+from utils.pagination import fetch_page, slice_page, DEFAULT_PAGE_SIZE
+from utils.replica_store import get_replica_store
+from utils.cache_manager import get_cache_manager
+from utils.single_flight import get_single_flight, stream_rows
 import datetime
 import hashlib
 import uuid
@@ -9,6 +14,9 @@ class UserController:
         self.db = get_firestore_db()
         self.auth_controller = auth_controller
         self.collection = 'users'
+        self.replica = get_replica_store()
+        self.cache = get_cache_manager()
+        self.flights = get_single_flight()
     
     def get_all(self, include_admins=False):
         """
@@ -19,12 +27,15 @@ class UserController:
         current_user = self.auth_controller.get_current_user()
         is_admin = current_user and current_user.get('role') == 'admin'
         
-        users = []
-        docs = self.db.collection(self.collection).stream()
+        # Si la réplica local está sincronizada, leer de memoria sin ir a la red
+        rows = self.replica.query(self.collection)
+        if rows is None:
+            # Las consultas idénticas simultáneas comparten una sola lectura (el filtro por rol es posterior)
+            query = self.db.collection(self.collection)
+            rows = self.flights.do((self.collection, "all"), lambda: stream_rows(query))
         
-        for doc in docs:
-            user_data = doc.to_dict()
-            
+        users = []
+        for user_id, user_data in rows:
             # Si no es admin y el usuario es admin, saltamos
             if not is_admin and user_data.get('role') == 'admin':
                 continue
@@ -33,19 +44,77 @@ class UserController:
             if not include_admins and user_data.get('role') == 'admin':
                 continue
                 
-            user = {
-                "id": doc.id,
-                "username": user_data.get("username"),
-                "role": user_data.get("role"),
-                "permissions": user_data.get("permissions", []),
-                "created_at": user_data.get("created_at"),
-                "created_by": user_data.get("created_by"),
-                "last_login": user_data.get("last_login")
-            }
-            users.append(user)
+            users.append(self._to_user_dict(user_id, user_data))
+        
+        return users
+    
+    def get_page(self, page_size=DEFAULT_PAGE_SIZE, cursor=None, include_admins=False,
+                 order_by="username", descending=False):
+        """
+        Obtiene una página de usuarios ordenada por order_by, con las mismas reglas
+        de visibilidad de administradores que get_all. Los administradores ocultos se
+        descartan después de leer la página, por lo que puede traer menos de page_size.
+        Retorna {"items": [dict], "next_cursor": cursor para la siguiente página, "has_more": bool}
+        """
+        current_user = self.auth_controller.get_current_user()
+        is_admin = current_user and current_user.get('role') == 'admin'
+        
+        rows = self.replica.query(self.collection, order_by=order_by, descending=descending)
+        if rows is not None:
+            page = slice_page(rows, self._to_user_dict, page_size=page_size, cursor=cursor,
+                              order_by=order_by, descending=descending)
+        else:
+            query = self.db.collection(self.collection)
+            page = fetch_page(query, order_by, lambda doc: self._to_user_dict(doc.id, doc.to_dict()),
+                              page_size=page_size, cursor=cursor, descending=descending)
+        
+        # Mismo criterio que get_all para ocultar administradores
+        page["items"] = [
+            user for user in page["items"]
+            if user.get("role") != "admin" or (is_admin and include_admins)
+        ]
+        
+        return page
+    
+    def get_all_projected(self, fields, include_admins=False):
+        """
+        Obtiene solo los campos indicados de cada usuario (proyección en el servidor),
+        aplicando las mismas reglas de visibilidad de administradores que get_all
+        """
+        current_user = self.auth_controller.get_current_user()
+        is_admin = current_user and current_user.get('role') == 'admin'
+        
+        # Nunca exponer el hash de la contraseña; el rol se necesita para filtrar
+        fields = [field for field in fields if field != "password_hash"]
+        query_fields = fields if "role" in fields else fields + ["role"]
+        
+        rows = self.replica.query(self.collection)
+        if rows is None:
+            query = self.db.collection(self.collection).select(query_fields)
+            rows = self.flights.do((self.collection, "projected", tuple(query_fields)), lambda: stream_rows(query))
+        
+        users = []
+        for user_id, user_data in rows:
+            # Mismo criterio que get_all para ocultar administradores
+            if user_data.get('role') == 'admin' and (not is_admin or not include_admins):
+                continue
+            
+            users.append(_project_data(user_id, user_data, fields))
         
         return users
     
+    def _to_user_dict(self, user_id, user_data):
+        """Convierte los datos de un usuario en el diccionario público (sin contraseña)"""
+        return {
+            "id": user_id,
+            "username": user_data.get("username"),
+            "role": user_data.get("role"),
+            "permissions": user_data.get("permissions", []),
+            "created_at": user_data.get("created_at"),
+            "created_by": user_data.get("created_by"),
+            "last_login": user_data.get("last_login")
+        }
+    
     def get_by_id(self, user_id):
         """Obtiene un usuario por su ID"""
         if not user_id:
@@ -62,8 +131,8 @@ class UserController:
         current_user = self.auth_controller.get_current_user()
         is_admin = current_user and current_user.get('role') == 'admin'
     
-        doc = self.db.collection(self.collection).document(user_id).get()
-        if not doc.exists:
+        user_data = self.cache.get_document(self.db, self.collection, user_id)
+        if user_data is None:
             return {
                 "id": "",
                 "username": "",
@@ -74,8 +143,6 @@ class UserController:
                 "last_login": None
             }
         
-        user_data = doc.to_dict()
-        
         # Si no es admin y el usuario solicitado es admin, no permitir
         if not is_admin and user_data.get('role') == 'admin':
             return {
@@ -89,7 +156,7 @@ class UserController:
             }
         
         return {
-            "id": doc.id,
+            "id": user_id,
             "username": user_data.get("username", ""),
             "role": user_data.get("role", ""),
             "permissions": user_data.get("permissions", []),
@@ -140,6 +207,8 @@ class UserController:
             
             # Guardar en la base de datos
             self.db.collection(self.collection).document(user_id).set(user_data)
+            self.cache.set(self.collection, user_id, user_data)
+            self.flights.forget(self.collection)
             
             return {
                 "success": True,
@@ -198,6 +267,8 @@ class UserController:
             
             # Actualizar en la base de datos
             user_ref.update(update_data)
+            self.cache.invalidate(self.collection, user_id)
+            self.flights.forget(self.collection)
             
             return {"success": True}
         except Exception as e:
@@ -267,6 +338,8 @@ class UserController:
             
             # Eliminar usuario
             user_ref.delete()
+            self.cache.invalidate(self.collection, user_id)
+            self.flights.forget(self.collection)
             
             return {"success": True}
         except Exception as e:
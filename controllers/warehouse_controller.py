@@ -1,29 +1,50 @@
 # controllers/warehouse_controller.py
 from models.warehouse import Warehouse
 from config.firebase_config import get_firestore_db
+from utils.audit_logger import log_action
+from utils.projection import project_data as _project_data
+from utils.replica_store import get_replica_store
+from utils.cache_manager import get_cache_manager
+from utils.single_flight import get_single_flight, stream_rows
 import datetime
 
 class WarehouseController:
     def __init__(self):
         self.db = get_firestore_db()
         self.collection = 'warehouses'
+        self.replica = get_replica_store()
+        self.cache = get_cache_manager()
+        self.flights = get_single_flight()
     
     def get_all(self):
         """Obtiene todos los almacenes"""
-        warehouses = []
-        docs = self.db.collection(self.collection).stream()
+        # Si la réplica local está sincronizada, leer de memoria sin ir a la red
+        rows = self.replica.query(self.collection)
+        if rows is not None:
+            return [Warehouse.from_dict(doc_id, data) for doc_id, data in rows]
         
-        for doc in docs:
-            warehouse = Warehouse.from_dict(doc.id, doc.to_dict())
-            warehouses.append(warehouse)
+        # Las consultas idénticas simultáneas comparten una sola lectura
+        query = self.db.collection(self.collection)
+        rows = self.flights.do((self.collection, "all"), lambda: stream_rows(query))
         
-        return warehouses
+        return [Warehouse.from_dict(doc_id, data) for doc_id, data in rows]
+    
+    def get_all_projected(self, fields):
+        """Obtiene solo los campos indicados de cada almacén (proyección en el servidor)"""
+        rows = self.replica.query(self.collection)
+        if rows is not None:
+            return [_project_data(doc_id, data, fields) for doc_id, data in rows]
+        
+        query = self.db.collection(self.collection).select(list(fields))
+        rows = self.flights.do((self.collection, "projected", tuple(fields)), lambda: stream_rows(query))
+        
+        return [_project_data(doc_id, data, fields) for doc_id, data in rows]
     
     def get_by_id(self, warehouse_id):
-        """Obtiene un almacén por su ID"""
-        doc = self.db.collection(self.collection).document(warehouse_id).get()
-        if doc.exists:
-            return Warehouse.from_dict(doc.id, doc.to_dict())
+        """Obtiene un almacén por su ID (desde el caché si está disponible)"""
+        data = self.cache.get_document(self.db, self.collection, warehouse_id)
+        if data is not None:
+            return Warehouse.from_dict(warehouse_id, data)
         return None
     
     def create(self, warehouse):
@@ -35,9 +56,11 @@ class WarehouseController:
             doc_ref = self.db.collection(self.collection).document()
             warehouse.id = doc_ref.id
             doc_ref.set(warehouse.to_dict())
+            self.cache.set(self.collection, warehouse.id, warehouse.to_dict())
+            self.flights.forget(self.collection)
             
             # Registrar en log de auditoría
-            self._log_action("create", warehouse.id, warehouse.to_dict())
+            log_action(self.collection, warehouse.id, "create", warehouse.to_dict())
             
             return {"success": True, "id": warehouse.id}
         except Exception as e:
@@ -66,9 +89,11 @@ class WarehouseController:
             update_data["updated_at"] = datetime.datetime.now()
             
             doc_ref.update(update_data)
+            self.cache.invalidate(self.collection, warehouse_id)
+            self.flights.forget(self.collection)
             
             # Registrar en log de auditoría
-            self._log_action("update", warehouse_id, update_data)
+            log_action(self.collection, warehouse_id, "update", update_data)
             
             return {"success": True}
         except Exception as e:
@@ -94,23 +119,12 @@ class WarehouseController:
             
             # Eliminar documento
             doc_ref.delete()
+            self.cache.invalidate(self.collection, warehouse_id)
+            self.flights.forget(self.collection)
             
             # Registrar en log de auditoría
-            self._log_action("delete", warehouse_id, old_data)
+            log_action(self.collection, warehouse_id, "delete", old_data)
             
             return {"success": True}
         except Exception as e:
-            return {"success": False, "error": str(e)}
-    
-    def _log_action(self, action, warehouse_id, data):
-        """Registra acciones en el log de auditoría"""
-        log_data = {
-            "collection": self.collection,
-            "document_id": warehouse_id,
-            "action": action,
-            "data": data,
-            "timestamp": datetime.datetime.now(),
-            "user_id": "current_user_id"  # Esto debe ser reemplazado con el ID del usuario actual
-        }
-        
-        self.db.collection('audit_logs').add(log_data)
\ No newline at end of file
+            return {"success": False, "error": str(e)}
\ No newline at end of file
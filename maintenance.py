@@ -0,0 +1,78 @@
+# maintenance.py
+"""
+Tareas de mantenimiento de datos.
+
+Uso:
+    python maintenance.py stock-aggregates verify    # Reporta diferencias con el stock real
+    python maintenance.py stock-aggregates rebuild   # Recalcula los agregados desde cero
+    python maintenance.py fumigation-stats verify    # Reporta diferencias con las fumigaciones
+    python maintenance.py fumigation-stats rebuild   # Recalcula los contadores mensuales
+"""
+import argparse
+import sys
+
+from config.firebase_config import get_firestore_db
+from utils import stock_aggregates, fumigation_stats
+
+def print_drift(drift):
+    """Muestra las diferencias encontradas en los agregados"""
+    for item in drift:
+        warehouse_id, category, product_name, unit = item["cell"]
+        actual = item["actual"] or {"quantity": "-", "items": "-"}
+        print(f"  {warehouse_id} / {category} / {product_name} ({unit}): "
+              f"esperado {item['expected']['quantity']} ({item['expected']['items']} lotes), "
+              f"guardado {actual['quantity']} ({actual['items']} lotes)")
+
+def run_stock_aggregates(args):
+    db = get_firestore_db()
+    
+    if args.action == "rebuild":
+        drift = stock_aggregates.rebuild(db)
+        print(f"Agregados de stock reconstruidos ({len(drift)} diferencias corregidas)")
+        print_drift(drift)
+        return 0
+    
+    drift = stock_aggregates.verify(db)
+    if not drift:
+        print("Los agregados de stock coinciden con el inventario")
+        return 0
+    
+    print(f"Se encontraron {len(drift)} diferencias en los agregados de stock:")
+    print_drift(drift)
+    return 1
+
+def run_fumigation_stats(args):
+    db = get_firestore_db()
+    
+    if args.action == "rebuild":
+        drift = fumigation_stats.rebuild(db)
+        print(f"Estadísticas de fumigaciones reconstruidas ({len(drift)} diferencias corregidas)")
+    else:
+        drift = fumigation_stats.verify(db)
+        if not drift:
+            print("Las estadísticas de fumigaciones coinciden con el historial")
+            return 0
+        print(f"Se encontraron {len(drift)} diferencias en las estadísticas de fumigaciones:")
+    
+    for item in drift:
+        print(f"  {item['month']} / {item['counter']}: esperado {item['expected']}, guardado {item['actual']}")
+    
+    return 1 if drift and args.action == "verify" else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de datos")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    stock_parser = subparsers.add_parser("stock-aggregates", help="Verifica o reconstruye los agregados de stock")
+    stock_parser.add_argument("action", choices=["verify", "rebuild"])
+    stock_parser.set_defaults(func=run_stock_aggregates)
+    
+    stats_parser = subparsers.add_parser("fumigation-stats", help="Verifica o reconstruye las estadísticas de fumigaciones")
+    stats_parser.add_argument("action", choices=["verify", "rebuild"])
+    stats_parser.set_defaults(func=run_fumigation_stats)
+    
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
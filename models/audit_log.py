@@ -0,0 +1,36 @@
+# models/audit_log.py
+import datetime
+import uuid
+
+class AuditLog:
+    def __init__(self, id=None, collection=None, document_id=None, action=None, data=None, user_id=None, timestamp=None):
+        # El ID se genera en el cliente para que reintentar una escritura no duplique la entrada
+        self.id = id or uuid.uuid4().hex
+        self.collection = collection  # Colección afectada
+        self.document_id = document_id  # Documento afectado
+        self.action = action  # create, update, delete, transfer, change_status, etc.
+        self.data = data or {}  # Datos asociados a la acción
+        self.user_id = user_id or "current_user_id"  # Esto debe ser reemplazado con el ID del usuario actual
+        self.timestamp = timestamp or datetime.datetime.now()
+    
+    def to_dict(self):
+        return {
+            "collection": self.collection,
+            "document_id": self.document_id,
+            "action": self.action,
+            "data": self.data,
+            "timestamp": self.timestamp,
+            "user_id": self.user_id
+        }
+    
+    @staticmethod
+    def from_dict(id, data):
+        return AuditLog(
+            id=id,
+            collection=data.get("collection"),
+            document_id=data.get("document_id"),
+            action=data.get("action"),
+            data=data.get("data", {}),
+            user_id=data.get("user_id"),
+            timestamp=data.get("timestamp")
+        )
\ No newline at end of file
@@ -1,6 +1,7 @@
 # models/stock.py
 import datetime
 from config.firebase_config import get_firestore_db
+from utils.units import normalized_fields
 
 class Stock:
     def __init__(self, id=None, product_name=None, quantity=None, unit=None, warehouse_id=None, 
@@ -28,7 +29,9 @@ class Stock:
             "purchase_date": self.purchase_date,
             "expiry_date": self.expiry_date,
             "created_at": self.created_at,
-            "updated_at": self.updated_at
+            "updated_at": self.updated_at,
+            # Cantidad en la unidad base de su dimensión (kg, l, unidad) para sumar lotes con unidades distintas
+            **normalized_fields(self.quantity, self.unit)
         }
     
     @staticmethod
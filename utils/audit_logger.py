@@ -0,0 +1,293 @@
+# utils/audit_logger.py
+import atexit
+import collections
+import json
+import os
+import queue
+import threading
+import time
+
+from config.firebase_config import get_firestore_db
+from config.storage_config import get_data_path
+from models.audit_log import AuditLog
+from utils.json_codec import json_default, json_object_hook
+
+# Límite de operaciones por lote de escritura en Firestore
+MAX_BATCH_SIZE = 500
+
+# Entradas confirmadas que se toleran en el respaldo antes de reescribirlo
+MIN_SPILL_COMPACT = 1000
+
+class AuditLogWriter:
+    """
+    Escritor del log de auditoría en segundo plano.
+
+    Las entradas se encolan sin esperar a Firestore y un hilo las escribe en
+    lotes (db.batch()) cuando se juntan batch_size entradas o cuando pasa
+    flush_interval segundos. Cada entrada se agrega antes a un archivo local de
+    respaldo (JSON por línea), de modo que si el proceso termina antes de
+    escribir, las entradas se recuperan al iniciar. El respaldo se vacía cuando
+    se confirma todo lo pendiente y solo se reescribe cuando las entradas ya
+    confirmadas superan a las pendientes, así que vaciar un respaldo grande
+    cuesta O(n) en total. La cola es acotada: si está llena, log() no espera y
+    retiene la entrada para reintentarla. Las entradas retenidas
+    en memoria son como máximo max_overflow; las demás quedan solo en el respaldo
+    y se vuelven a leer de él cuando hay lugar, así que la memoria no crece
+    aunque Firestore no esté disponible.
+    """
+
+    def __init__(self, db, collection='audit_logs', batch_size=50, flush_interval=2.0,
+                 max_queue=1000, spill_path=None, max_overflow=1000):
+        self.db = db
+        self.collection = collection
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.flush_interval = flush_interval
+        self.max_overflow = max_overflow
+        self.spill_path = spill_path or get_data_path("audit_spill.jsonl")
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._overflow = collections.deque()  # Entradas que no cupieron en la cola o cuyo lote falló (hasta max_overflow)
+        self._in_memory = set()  # IDs de las entradas retenidas en memoria (cola, overflow o lote en curso)
+        self._spilled_only = False  # Hay entradas que quedaron solo en el respaldo
+        self._pending = 0  # Entradas del respaldo aún no confirmadas en Firestore
+        self._confirmed = set()  # IDs ya confirmados que siguen en el respaldo hasta vaciarlo o reescribirlo
+        self._spill_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._closed = False
+
+        self.stats = {"queued": 0, "written": 0, "spilled": 0, "failed_batches": 0, "recovered": 0}
+
+        # Recuperar entradas que quedaron sin escribir en una ejecución anterior
+        self._replay_spill()
+
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, entry):
+        """Encola una entrada (AuditLog) sin esperar a que se escriba en Firestore"""
+        self._append_spill(entry)
+
+        if self._closed:
+            # Después de cerrar, escribir directamente (si falla queda en el respaldo)
+            self._commit([entry])
+            return
+
+        self.stats["queued"] += 1
+
+        try:
+            # El llamador suele ser el hilo de Tk: nunca espera a que se libere la cola
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # La entrada ya está en el respaldo; se reintenta cuando el hilo tenga espacio
+            self._hold([entry])
+            self.stats["spilled"] += 1
+
+    def flush(self):
+        """Escribe de inmediato todas las entradas pendientes"""
+        while True:
+            batch = self._take_pending(block=False)
+            if not batch or not self._commit(batch):
+                break
+
+    def close(self, timeout=10.0):
+        """Detiene el hilo y escribe lo pendiente (se registra con atexit)"""
+        if self._closed:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self.flush()
+        self._closed = True
+
+    def pending_count(self):
+        """Cantidad de entradas aún no confirmadas en Firestore"""
+        with self._spill_lock:
+            return self._pending
+
+    def _run(self):
+        """Bucle del hilo escritor: junta lotes por tamaño o por tiempo y los confirma"""
+        while not self._stop.is_set():
+            batch = self._take_pending(block=True)
+            if batch and not self._commit(batch):
+                # Esperar antes de reintentar si Firestore no está disponible
+                self._stop.wait(self.flush_interval)
+
+    def _take_pending(self, block):
+        """Toma hasta batch_size entradas, primero las reintentadas y luego las de la cola"""
+        if self._spilled_only and len(self._overflow) < self.max_overflow:
+            self._reload_spill()
+
+        batch = []
+        with self._spill_lock:
+            while self._overflow and len(batch) < self.batch_size:
+                batch.append(self._overflow.popleft())
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if block:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _commit(self, batch):
+        """Escribe un lote en Firestore; si falla, las entradas se conservan para reintentar"""
+        with self._commit_lock:
+            try:
+                write_batch = self.db.batch()
+                for entry in batch:
+                    # Usar el ID de la entrada hace idempotente el reintento del mismo lote
+                    doc_ref = self.db.collection(self.collection).document(entry.id)
+                    write_batch.set(doc_ref, entry.to_dict())
+                write_batch.commit()
+            except Exception as e:
+                print(f"Error al registrar en log de auditoría: {str(e)}")
+                self.stats["failed_batches"] += 1
+                self._hold(batch)
+                return False
+
+            self.stats["written"] += len(batch)
+            self._remove_spill([entry.id for entry in batch])
+            return True
+
+    def _hold(self, entries):
+        """Retiene entradas para reintentar; las que exceden max_overflow quedan solo en el respaldo"""
+        with self._spill_lock:
+            for entry in entries:
+                if len(self._overflow) < self.max_overflow:
+                    self._overflow.append(entry)
+                else:
+                    self._in_memory.discard(entry.id)
+                    self._spilled_only = True
+
+    def _append_spill(self, entry):
+        """Agrega la entrada al archivo de respaldo local"""
+        with self._spill_lock:
+            self._in_memory.add(entry.id)
+            self._pending += 1
+            try:
+                with open(self.spill_path, "a", encoding="utf-8") as spill_file:
+                    spill_file.write(_encode_entry(entry) + "\n")
+            except OSError as e:
+                print(f"Error al escribir respaldo de auditoría: {str(e)}")
+
+    def _remove_spill(self, entry_ids):
+        """
+        Marca como confirmadas las entradas del respaldo. El archivo se vacía cuando
+        no queda nada pendiente y se reescribe sin las confirmadas solo cuando estas
+        superan a las pendientes
+        """
+        with self._spill_lock:
+            for entry_id in entry_ids:
+                self._in_memory.discard(entry_id)
+                if entry_id not in self._confirmed:
+                    self._confirmed.add(entry_id)
+                    self._pending -= 1
+            try:
+                if self._pending <= 0:
+                    open(self.spill_path, "w", encoding="utf-8").close()
+                    self._confirmed.clear()
+                    self._pending = 0
+                elif len(self._confirmed) > max(self._pending, MIN_SPILL_COMPACT):
+                    self._compact_spill()
+            except OSError as e:
+                print(f"Error al actualizar respaldo de auditoría: {str(e)}")
+
+    def _compact_spill(self):
+        """Reescribe el respaldo línea por línea sin las entradas confirmadas"""
+        tmp_path = self.spill_path + ".tmp"
+        kept = 0
+        with open(self.spill_path, "r", encoding="utf-8") as spill_file, \
+                open(tmp_path, "w", encoding="utf-8") as tmp_file:
+            for line in spill_file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry_id = json.loads(line).get("id")
+                except ValueError:
+                    continue
+                if entry_id not in self._confirmed:
+                    tmp_file.write(line + "\n")
+                    kept += 1
+        os.replace(tmp_path, self.spill_path)
+        self._confirmed.clear()
+        self._pending = kept
+
+    def _read_spill(self):
+        """Recorre las entradas del respaldo sin cargar el archivo completo"""
+        if not os.path.exists(self.spill_path):
+            return
+        try:
+            with open(self.spill_path, "r", encoding="utf-8") as spill_file:
+                for line in spill_file:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield _decode_entry(line)
+                    except ValueError:
+                        # Línea incompleta por un cierre abrupto
+                        continue
+        except OSError as e:
+            print(f"Error al leer respaldo de auditoría: {str(e)}")
+
+    def _reload_spill(self):
+        """Vuelve a retener (hasta max_overflow) las entradas que quedaron solo en el respaldo"""
+        with self._spill_lock:
+            self._spilled_only = False
+            for entry in self._read_spill():
+                if entry.id in self._in_memory or entry.id in self._confirmed:
+                    continue
+                if len(self._overflow) >= self.max_overflow:
+                    self._spilled_only = True
+                    break
+                self._in_memory.add(entry.id)
+                self._overflow.append(entry)
+
+    def _replay_spill(self):
+        """Retiene las entradas del respaldo que no llegaron a escribirse en una ejecución anterior"""
+        recovered = set()
+        for entry in self._read_spill():
+            if entry.id in recovered:
+                continue
+            recovered.add(entry.id)
+            if len(self._overflow) < self.max_overflow:
+                self._in_memory.add(entry.id)
+                self._overflow.append(entry)
+            else:
+                self._spilled_only = True
+        self._pending = len(recovered)
+        self.stats["recovered"] = len(recovered)
+
+def _encode_entry(entry):
+    return json.dumps({"id": entry.id, **entry.to_dict()}, default=json_default, ensure_ascii=False)
+
+def _decode_entry(line):
+    data = json.loads(line, object_hook=json_object_hook)
+    return AuditLog.from_dict(data.get("id"), data)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_audit_writer():
+    """Retorna el escritor de auditoría compartido, creándolo la primera vez"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AuditLogWriter(get_firestore_db())
+            atexit.register(_writer.close)
+        return _writer
+
+def log_action(collection, document_id, action, data):
+    """Registra una acción en el log de auditoría sin bloquear al llamador"""
+    entry = AuditLog(collection=collection, document_id=document_id, action=action, data=data)
+    get_audit_writer().log(entry)
+    return entry
\ No newline at end of file
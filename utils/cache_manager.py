@@ -0,0 +1,135 @@
+# utils/cache_manager.py
+import collections
+import threading
+import time
+
+# Tiempo de vida (segundos) de las entradas de cada colección
+DEFAULT_TTL = 60
+COLLECTION_TTLS = {
+    'users': 300,
+    'warehouses': 300,
+    'fields': 120,
+    'stock': 30,
+    'fumigations': 30
+}
+
+# Cantidad máxima de documentos en memoria
+MAX_ENTRIES = 2000
+
+# Campos que nunca se guardan en el caché
+PRIVATE_FIELDS = {
+    'users': ["password_hash"]
+}
+
+class CacheManager:
+    """
+    Caché de documentos en memoria, indexado por (colección, ID).
+
+    Cada entrada vence después del TTL de su colección y, cuando se supera
+    max_entries, se descarta la usada hace más tiempo (LRU). Los controladores
+    actualizan o invalidan las entradas al escribir, de modo que las lecturas
+    repetidas de un mismo documento (diálogos de edición, detalles, validaciones)
+    no vuelven a Firestore.
+
+    Uso:
+        cache = get_cache_manager()
+        data = cache.load('fields', field_id, lambda: read_from_firestore(field_id))
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, default_ttl=DEFAULT_TTL, ttls=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = COLLECTION_TTLS if ttls is None else ttls
+
+        self._entries = collections.OrderedDict()  # (colección, ID) -> (vencimiento, datos)
+        self._lock = threading.Lock()
+
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, collection, doc_id):
+        """Retorna una copia de los datos en caché o None si no están o vencieron"""
+        key = (collection, doc_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return dict(data)
+
+    def set(self, collection, doc_id, data):
+        """Guarda (o reemplaza) los datos de un documento"""
+        if not doc_id or data is None:
+            return
+
+        data = dict(data)
+        for field in PRIVATE_FIELDS.get(collection, []):
+            data.pop(field, None)
+
+        key = (collection, doc_id)
+        expires_at = time.monotonic() + self.ttls.get(collection, self.default_ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def load(self, collection, doc_id, loader):
+        """
+        Retorna los datos en caché o, si no están, los obtiene con loader()
+        (que retorna los datos o None si el documento no existe) y los guarda.
+        """
+        data = self.get(collection, doc_id)
+        if data is not None:
+            return data
+
+        data = loader()
+        if data is not None:
+            self.set(collection, doc_id, data)
+        return data
+
+    def get_document(self, db, collection, doc_id):
+        """Retorna los datos del documento desde el caché o leyéndolo de Firestore (None si no existe)"""
+        def read():
+            doc = db.collection(collection).document(doc_id).get()
+            return doc.to_dict() if doc.exists else None
+
+        return self.load(collection, doc_id, read)
+
+    def invalidate(self, collection, *doc_ids):
+        """Descarta las entradas de los documentos indicados"""
+        with self._lock:
+            for doc_id in doc_ids:
+                self._entries.pop((collection, doc_id), None)
+
+    def invalidate_collection(self, collection):
+        """Descarta todas las entradas de una colección"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == collection]:
+                del self._entries[key]
+
+    def clear(self):
+        """Descarta todas las entradas"""
+        with self._lock:
+            self._entries.clear()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache_manager():
+    """Retorna el caché compartido, creándolo la primera vez"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheManager()
+        return _cache
\ No newline at end of file
@@ -0,0 +1,139 @@
+# utils/dashboard_stats.py
+import datetime
+import threading
+import time
+
+from config.firebase_config import get_firestore_db
+from utils.replica_store import get_replica_store
+
+# Segundos durante los que los contadores se consideran vigentes
+DEFAULT_TTL = 30
+
+# Días hacia adelante de "programadas esta semana" y de "por vencer"
+SCHEDULED_DAYS = 7
+EXPIRING_DAYS = 30
+
+class DashboardStats:
+    """
+    Contadores del panel principal: campos, almacenes, productos en stock,
+    fumigaciones programadas para los próximos días y atrasadas, y productos
+    por vencer o vencidos.
+
+    Cada contador se calcula con la réplica si su colección está sincronizada
+    (sin red) y, si no, con una agregación count() de Firestore, que no descarga
+    los documentos. El resultado se guarda ttl segundos: cached() lo retorna al
+    instante (aunque esté vencido) para dibujar el panel, y refresh() lo vuelve
+    a calcular; refresh() bloquea, así que se llama en segundo plano.
+
+    Uso:
+        stats = get_dashboard_stats()
+        counts = stats.cached()  # None si todavía no se calculó
+        if not stats.is_fresh():
+            runner.submit(self, stats.refresh, self.show_counts)
+    """
+
+    def __init__(self, db, replica, ttl=DEFAULT_TTL):
+        self.db = db
+        self.replica = replica
+        self.ttl = ttl
+
+        self._counts = None
+        self._computed_at = None
+        self._lock = threading.Lock()
+
+    def cached(self):
+        """Retorna los últimos contadores calculados (pueden estar vencidos) o None"""
+        with self._lock:
+            return dict(self._counts) if self._counts is not None else None
+
+    def is_fresh(self):
+        """Indica si los contadores se calcularon hace menos de ttl segundos"""
+        with self._lock:
+            return self._computed_at is not None and time.monotonic() - self._computed_at < self.ttl
+
+    def invalidate(self):
+        """Marca los contadores como vencidos (se siguen mostrando hasta recalcularlos)"""
+        with self._lock:
+            self._computed_at = None
+
+    def clear(self):
+        """Descarta los contadores (por ejemplo, al cerrar sesión)"""
+        with self._lock:
+            self._counts = None
+            self._computed_at = None
+
+    def refresh(self):
+        """Calcula los contadores, los guarda y los retorna"""
+        counts = self.compute()
+        with self._lock:
+            self._counts = counts
+            self._computed_at = time.monotonic()
+        return dict(counts)
+
+    def compute(self):
+        """Calcula todos los contadores"""
+        # Las fechas se guardan como datetime.now() sin zona, que Firestore interpreta
+        # como UTC: los límites se arman igual para comparar con la misma hora de reloj
+        now = _as_utc(datetime.datetime.now())
+        today = _as_utc(datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+        week_end = now + datetime.timedelta(days=SCHEDULED_DAYS)
+        expiring_end = now + datetime.timedelta(days=EXPIRING_DAYS)
+
+        return {
+            "fields": self._count('fields'),
+            "warehouses": self._count('warehouses'),
+            "stock": self._count('stock'),
+            "scheduled_week": self._count_between('fumigations', "date", today, week_end, status="scheduled"),
+            "overdue": self._count_between('fumigations', "date", None, today, status="scheduled"),
+            "expiring_soon": self._count_between('stock', "expiry_date", now, expiring_end),
+            "expired": self._count_between('stock', "expiry_date", None, now)
+        }
+
+    def _count(self, collection):
+        count = self.replica.count(collection)
+        if count is not None:
+            return count
+        return _aggregate_count(self.db.collection(collection))
+
+    def _count_between(self, collection, field, start, end, **filters):
+        """Documentos con start <= field < end (start None: sin límite inferior) que cumplen los filtros"""
+        rows = self.replica.query(collection, **filters)
+        if rows is not None:
+            count = 0
+            for _, data in rows:
+                value = _as_utc(data.get(field))
+                if value is not None and (start is None or value >= start) and value < end:
+                    count += 1
+            return count
+
+        query = self.db.collection(collection)
+        for name, value in filters.items():
+            query = query.where(name, "==", value)
+        if start is not None:
+            query = query.where(field, ">=", start)
+        query = query.where(field, "<", end)
+        return _aggregate_count(query)
+
+def _aggregate_count(query):
+    """Cuenta en el servidor los documentos de la consulta (sin descargarlos)"""
+    result = query.count().get()
+    return int(result[0][0].value)
+
+def _as_utc(value):
+    """Fecha con zona UTC para comparar (las fechas sin zona se toman como UTC, igual que Firestore)"""
+    if not isinstance(value, datetime.datetime):
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+_stats = None
+_stats_lock = threading.Lock()
+
+def get_dashboard_stats():
+    """Retorna el servicio de contadores compartido, creándolo la primera vez"""
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = DashboardStats(get_firestore_db(), get_replica_store())
+        return _stats
@@ -0,0 +1,234 @@
+# utils/fumigation_stats.py
+import datetime
+
+from firebase_admin import firestore
+
+# Colección con un documento de contadores por mes (YYYY-MM)
+STATS_COLLECTION = 'fumigation_stats'
+
+# Documento para las fumigaciones sin fecha
+NO_DATE = "sin_fecha"
+
+# Estados que siempre aparecen en las estadísticas
+STATUSES = ["scheduled", "in_progress", "completed", "cancelled"]
+
+# Límite de operaciones por lote de escritura en Firestore
+MAX_BATCH_SIZE = 500
+
+def month_key(date):
+    """Retorna la clave YYYY-MM de una fecha, o NO_DATE si no tiene"""
+    if not date or not hasattr(date, "strftime"):
+        return NO_DATE
+    # Firestore guarda las fechas sin zona como UTC y las devuelve con zona UTC;
+    # se usa la hora UTC para que la fecha escrita y la leída caigan en el mismo mes
+    if getattr(date, "tzinfo", None) is not None:
+        date = date.astimezone(datetime.timezone.utc)
+    return date.strftime("%Y-%m")
+
+def month_range(month):
+    """Retorna (inicio, fin) en UTC del mes YYYY-MM, con el fin excluido"""
+    start = datetime.datetime.strptime(month, "%Y-%m").replace(tzinfo=datetime.timezone.utc)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+def counters_for(fumigation_data):
+    """
+    Contadores a los que aporta una fumigación, como rutas dentro del documento
+    de su mes: total, por estado, por campo, por aplicador y, dentro de cada
+    campo, por estado y por aplicador (para poder filtrar por campo).
+    """
+    if not fumigation_data:
+        return []
+
+    status = fumigation_data.get("status") or "scheduled"
+    field_id = fumigation_data.get("field_id")
+    applicator_id = fumigation_data.get("applicator_id")
+
+    paths = [("total",), ("by_status", status)]
+    if field_id:
+        paths.append(("by_field", field_id))
+        paths.append(("fields", field_id, "total"))
+        paths.append(("fields", field_id, "by_status", status))
+        if applicator_id:
+            paths.append(("fields", field_id, "by_applicator", applicator_id))
+    if applicator_id:
+        paths.append(("by_applicator", applicator_id))
+
+    month = month_key(fumigation_data.get("date"))
+    return [(month, path) for path in paths]
+
+class FumigationStatsDelta:
+    """
+    Acumula los cambios que una escritura de fumigación produce en los contadores
+    mensuales. Para una modificación se resta el aporte anterior y se suma el nuevo;
+    si se compensan (por ejemplo, solo cambian las notas) no se escribe nada.
+    """
+
+    def __init__(self):
+        self.counters = {}  # (mes, ruta) -> incremento
+
+    def add(self, fumigation_data, sign=1):
+        """Suma (o resta con sign=-1) el aporte de una fumigación"""
+        for key in counters_for(fumigation_data):
+            self.counters[key] = self.counters.get(key, 0) + sign
+
+    def remove(self, fumigation_data):
+        """Resta el aporte de una fumigación"""
+        self.add(fumigation_data, sign=-1)
+
+    def write(self, db, writer):
+        """Agrega los incrementos a writer (un WriteBatch o una Transaction)"""
+        by_month = {}
+        for (month, path), value in self.counters.items():
+            if value == 0:
+                continue
+            data = by_month.setdefault(month, {"month": None if month == NO_DATE else month})
+            _set_path(data, path, firestore.Increment(value))
+
+        for month, data in by_month.items():
+            writer.set(db.collection(STATS_COLLECTION).document(month), data, merge=True)
+
+def _set_path(data, path, value):
+    """Asigna value en el diccionario anidado siguiendo la ruta"""
+    for key in path[:-1]:
+        data = data.setdefault(key, {})
+    data[path[-1]] = value
+
+def _flatten(data, prefix=()):
+    """Convierte un documento de contadores en {ruta: valor}"""
+    flat = {}
+    for key, value in data.items():
+        if key == "month" and not prefix:
+            continue
+        if isinstance(value, dict):
+            flat.update(_flatten(value, prefix + (key,)))
+        else:
+            flat[prefix + (key,)] = value or 0
+    return flat
+
+def read_months(db, start_date=None, end_date=None):
+    """
+    Lee los documentos mensuales dentro del rango (por meses completos).
+    Sin rango se incluyen también las fumigaciones sin fecha.
+    """
+    query = db.collection(STATS_COLLECTION)
+    if start_date:
+        query = query.where("month", ">=", month_key(start_date))
+    if end_date:
+        query = query.where("month", "<=", month_key(end_date))
+    return [doc.to_dict() for doc in query.stream()]
+
+def build_statistics(months, field_id=None):
+    """
+    Arma las estadísticas con la misma forma que get_fumigation_statistics a
+    partir de los documentos mensuales (costo proporcional a la cantidad de meses)
+    """
+    stats = {
+        "total": 0,
+        "by_status": {status: 0 for status in STATUSES},
+        "by_field": {},
+        "by_applicator": {},
+        "by_month": {}
+    }
+
+    for month_data in months:
+        month = month_data.get("month") or NO_DATE
+        if field_id:
+            # Solo los contadores del campo pedido
+            source = (month_data.get("fields") or {}).get(field_id) or {}
+            by_field = {field_id: source.get("total") or 0}
+        else:
+            source = month_data
+            by_field = source.get("by_field") or {}
+
+        total = source.get("total") or 0
+        if total <= 0:
+            continue
+
+        stats["total"] += total
+        if month != NO_DATE:
+            stats["by_month"][month] = stats["by_month"].get(month, 0) + total
+
+        for target, counts in (("by_status", source.get("by_status")),
+                               ("by_field", by_field),
+                               ("by_applicator", source.get("by_applicator"))):
+            for key, count in (counts or {}).items():
+                if count:
+                    stats[target][key] = stats[target].get(key, 0) + count
+
+    return stats
+
+def compute_counters(fumigation_docs):
+    """Calcula los contadores desde cero a partir de los documentos de fumigaciones"""
+    delta = FumigationStatsDelta()
+    for doc in fumigation_docs:
+        delta.add(doc.to_dict())
+    return {key: value for key, value in delta.counters.items() if value}
+
+def _expected_counters(db, fumigation_collection):
+    """Contadores recalculados leyendo solo los campos necesarios de cada fumigación"""
+    query = db.collection(fumigation_collection).select(["date", "status", "field_id", "applicator_id"])
+    return compute_counters(query.stream())
+
+def _drift(db, expected):
+    """Compara los contadores esperados con los documentos mensuales guardados"""
+    actual = {}
+    existing_months = set()
+    for doc in db.collection(STATS_COLLECTION).stream():
+        existing_months.add(doc.id)
+        for path, value in _flatten(doc.to_dict()).items():
+            if value:
+                actual[(doc.id, path)] = value
+
+    drift = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        if expected.get(key, 0) != actual.get(key, 0):
+            month, path = key
+            drift.append({
+                "month": month,
+                "counter": ".".join(path),
+                "expected": expected.get(key, 0),
+                "actual": actual.get(key, 0)
+            })
+
+    return drift, existing_months
+
+def verify(db, fumigation_collection='fumigations'):
+    """
+    Recalcula los contadores desde las fumigaciones y los compara con los guardados.
+    Retorna una lista de diferencias: {"month", "counter", "expected", "actual"}
+    """
+    drift, _ = _drift(db, _expected_counters(db, fumigation_collection))
+    return drift
+
+def rebuild(db, fumigation_collection='fumigations'):
+    """
+    Reemplaza los documentos mensuales por los recalculados desde las fumigaciones.
+    Retorna las diferencias encontradas antes de reconstruir.
+    """
+    expected = _expected_counters(db, fumigation_collection)
+    drift, existing_months = _drift(db, expected)
+
+    by_month = {}
+    for (month, path), value in expected.items():
+        data = by_month.setdefault(month, {"month": None if month == NO_DATE else month})
+        _set_path(data, path, value)
+
+    writes = [("set", month, data) for month, data in by_month.items()]
+    writes.extend(("delete", month, None) for month in existing_months - set(by_month))
+
+    # Escribir en lotes de hasta MAX_BATCH_SIZE operaciones
+    for start in range(0, len(writes), MAX_BATCH_SIZE):
+        batch = db.batch()
+        for op, month, data in writes[start:start + MAX_BATCH_SIZE]:
+            ref = db.collection(STATS_COLLECTION).document(month)
+            if op == "set":
+                batch.set(ref, data)
+            else:
+                batch.delete(ref)
+        batch.commit()
+
+    return drift
\ No newline at end of file
@@ -0,0 +1,117 @@
+# utils/indexed_table.py
+
+class IndexedTable:
+    """
+    Tabla en memoria de documentos (ID -> datos) con índices secundarios por
+    igualdad. Cada índice mapea valor -> conjunto de IDs y se mantiene al
+    insertar, modificar o eliminar, de modo que buscar por un campo indexado
+    no recorre toda la tabla.
+
+    derived agrega índices calculados ({nombre: función(datos) -> clave}), por
+    ejemplo el mes de una fecha; se consultan por nombre como cualquier campo.
+
+    Uso:
+        table = IndexedTable(["warehouse_id", "status"])
+        table.upsert("abc", {"warehouse_id": "w1", "status": "received"})
+        table.ids_where("status", "received")  # {"abc"}
+        table.ids_matching({"warehouse_id": "w1", "status": None})  # {"abc"}
+    """
+
+    def __init__(self, index_fields=(), derived=None):
+        self.rows = {}  # ID -> datos del documento
+        self.derived = dict(derived or {})
+        self.indexes = {field: {} for field in list(index_fields) + list(self.derived)}  # campo -> valor -> {IDs}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.rows
+
+    def get(self, doc_id):
+        """Retorna los datos del documento o None si no está"""
+        return self.rows.get(doc_id)
+
+    def items(self):
+        """Retorna pares (ID, datos) de todos los documentos"""
+        return list(self.rows.items())
+
+    def upsert(self, doc_id, data):
+        """Inserta o reemplaza un documento; retorna los datos anteriores o None"""
+        old_data = self.rows.get(doc_id)
+        if old_data is not None:
+            self._unindex(doc_id, old_data)
+        self.rows[doc_id] = data
+        self._index(doc_id, data)
+        return old_data
+
+    def remove(self, doc_id):
+        """Elimina un documento; retorna sus datos o None si no estaba"""
+        old_data = self.rows.pop(doc_id, None)
+        if old_data is not None:
+            self._unindex(doc_id, old_data)
+        return old_data
+
+    def clear(self):
+        """Elimina todos los documentos"""
+        self.rows = {}
+        self.indexes = {field: {} for field in self.indexes}
+
+    def ids_where(self, field, value):
+        """IDs de los documentos cuyo campo es igual a value"""
+        if field in self.indexes:
+            return set(self.indexes[field].get(_index_key(value), ()))
+        return {doc_id for doc_id, data in self.rows.items() if data.get(field) == value}
+
+    def ids_matching(self, filters):
+        """
+        IDs de los documentos que cumplen todos los filtros por igualdad
+        ({campo: valor}; los valores None se ignoran). Intersecta los índices
+        empezando por el más chico. Retorna None si no hay ningún filtro activo.
+        """
+        active = [(field, value) for field, value in filters.items() if value is not None]
+        if not active:
+            return None
+
+        active.sort(key=lambda item: self._count(*item))
+        ids = None
+        for field, value in active:
+            matched = self.ids_where(field, value)
+            ids = matched if ids is None else ids & matched
+            if not ids:
+                break
+        return ids
+
+    def values(self, field):
+        """Valores distintos de un campo indexado"""
+        return list(self.indexes.get(field, {}).keys())
+
+    def _count(self, field, value):
+        """Cantidad de IDs para el valor (los campos sin índice cuentan como toda la tabla)"""
+        if field in self.indexes:
+            return len(self.indexes[field].get(_index_key(value), ()))
+        return len(self.rows)
+
+    def _key(self, field, data):
+        if field in self.derived:
+            return _index_key(self.derived[field](data))
+        return _index_key(data.get(field))
+
+    def _index(self, doc_id, data):
+        for field, index in self.indexes.items():
+            index.setdefault(self._key(field, data), set()).add(doc_id)
+
+    def _unindex(self, doc_id, data):
+        for field, index in self.indexes.items():
+            key = self._key(field, data)
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del index[key]
+
+def _index_key(value):
+    """Clave de índice para un valor (las listas no son hashables)"""
+    if isinstance(value, list):
+        return tuple(value)
+    return value
\ No newline at end of file
@@ -0,0 +1,14 @@
+# utils/json_codec.py
+import datetime
+
+def json_default(value):
+    """Serializa fechas y otros valores no soportados por JSON (usar como default de json.dumps)"""
+    if isinstance(value, datetime.datetime):
+        return {"$datetime": value.isoformat()}
+    return str(value)
+
+def json_object_hook(value):
+    """Restaura las fechas serializadas por json_default (usar como object_hook de json.loads)"""
+    if "$datetime" in value and len(value) == 1:
+        return datetime.datetime.fromisoformat(value["$datetime"])
+    return value
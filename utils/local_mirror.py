@@ -0,0 +1,143 @@
+# utils/local_mirror.py
+import datetime
+import hashlib
+import json
+import sqlite3
+import threading
+
+from config.storage_config import get_data_path
+from utils.json_codec import json_default, json_object_hook
+
+# Clave de sync_state con la marca de agua de las bajas tomadas del log de auditoría
+TOMBSTONES_KEY = 'audit_logs:delete'
+
+class LocalMirror:
+    """
+    Copia en disco (SQLite) de las colecciones replicadas.
+
+    Guarda cada documento como JSON junto con una marca de agua por colección
+    (el mayor updated_at sincronizado), de modo que al iniciar la réplica se carga
+    desde disco al instante y solo se piden a Firestore los documentos modificados
+    después de esa marca. Las bajas se concilian con las entradas "delete" del log
+    de auditoría, que tienen su propia marca de agua (TOMBSTONES_KEY).
+
+    Los listeners de la réplica escriben desde hilos de Firestore, así que la
+    conexión se comparte con un lock.
+
+    Con scope (el ID del usuario) cada usuario tiene su propio archivo, así que
+    una sesión nunca parte de los documentos ni las marcas de agua que sincronizó
+    otro usuario en la misma máquina.
+    """
+
+    def __init__(self, path=None, scope=None):
+        self.path = path or get_data_path(mirror_file_name(scope))
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " collection TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL,"
+                " PRIMARY KEY (collection, id))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state ("
+                " collection TEXT PRIMARY KEY, high_water TEXT)"
+            )
+
+    def load(self, collection):
+        """Retorna [(ID, datos)] de todos los documentos guardados de la colección"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, data FROM documents WHERE collection = ?", (collection,)
+            ).fetchall()
+        return [(doc_id, _decode(data)) for doc_id, data in rows]
+
+    def has_collection(self, collection):
+        """Indica si la colección ya se sincronizó alguna vez (tiene marca de agua)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM sync_state WHERE collection = ?", (collection,)
+            ).fetchone()
+        return row is not None
+
+    def get_high_water(self, collection):
+        """Retorna la marca de agua de la colección (datetime) o None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT high_water FROM sync_state WHERE collection = ?", (collection,)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return datetime.datetime.fromisoformat(row[0])
+
+    def apply(self, collection, upserts=(), removed=(), high_water=None):
+        """
+        Guarda en una sola transacción los documentos nuevos o modificados
+        ([(ID, datos)]), elimina los IDs dados de baja y avanza la marca de agua
+        (nunca la retrocede).
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                [(collection, doc_id, _encode(data)) for doc_id, data in upserts]
+            )
+            self._conn.executemany(
+                "DELETE FROM documents WHERE collection = ? AND id = ?",
+                [(collection, doc_id) for doc_id in removed]
+            )
+            self._set_high_water(collection, high_water)
+
+    def replace(self, collection, rows, high_water=None):
+        """Reemplaza todos los documentos guardados de la colección"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents WHERE collection = ?", (collection,))
+            self._conn.executemany(
+                "INSERT INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                [(collection, doc_id, _encode(data)) for doc_id, data in rows]
+            )
+            self._set_high_water(collection, high_water)
+
+    def set_high_water(self, collection, high_water):
+        """Avanza la marca de agua de la colección (nunca la retrocede)"""
+        with self._lock, self._conn:
+            self._set_high_water(collection, high_water)
+
+    def clear(self):
+        """Elimina todos los documentos y marcas de agua"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents")
+            self._conn.execute("DELETE FROM sync_state")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _set_high_water(self, collection, high_water):
+        row = self._conn.execute(
+            "SELECT high_water FROM sync_state WHERE collection = ?", (collection,)
+        ).fetchone()
+
+        if row is not None and row[0] is not None and high_water is not None:
+            if high_water <= datetime.datetime.fromisoformat(row[0]):
+                return
+        elif row is not None and high_water is None:
+            return
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sync_state (collection, high_water) VALUES (?, ?)",
+            (collection, high_water.isoformat() if high_water is not None else None)
+        )
+
+def mirror_file_name(scope=None):
+    """Nombre del archivo del mirror de scope (el ID no se usa tal cual en la ruta)"""
+    if scope is None:
+        return "replica.sqlite3"
+    digest = hashlib.sha256(str(scope).encode("utf-8")).hexdigest()[:16]
+    return f"replica_{digest}.sqlite3"
+
+def _encode(data):
+    return json.dumps(data, default=json_default, ensure_ascii=False)
+
+def _decode(data):
+    return json.loads(data, object_hook=json_object_hook)
\ No newline at end of file
@@ -0,0 +1,297 @@
+# utils/lot_allocator.py
+import bisect
+import datetime
+import heapq
+import math
+import threading
+
+from config.firebase_config import get_firestore_db
+from utils.replica_store import get_replica_store
+from utils.stock_aggregates import QUANTITY_TOLERANCE
+from utils.units import base_quantity, unit_info
+
+# Entradas obsoletas que se toleran en un heap antes de compactarlo
+MIN_COMPACT_SIZE = 32
+
+def expiry_key(expiry_date):
+    """
+    Clave de orden por vencimiento (los lotes sin vencimiento van al final). Las
+    fechas sin zona se toman como UTC, igual que Firestore al leerlas.
+    """
+    if not isinstance(expiry_date, datetime.datetime):
+        return math.inf
+    if expiry_date.tzinfo is None:
+        expiry_date = expiry_date.replace(tzinfo=datetime.timezone.utc)
+    return expiry_date.timestamp()
+
+def _eligible(data):
+    """Solo se asignan lotes recibidos con cantidad disponible"""
+    quantity = data.get("quantity")
+    return (data.get("status") == "received" and bool(data.get("product_name")) and
+            isinstance(quantity, (int, float)) and quantity > QUANTITY_TOLERANCE)
+
+class _LotHeaps:
+    """
+    Heaps de lotes ordenados por vencimiento, uno por producto y uno por
+    (producto, almacén). Las cantidades se comparan normalizadas a la unidad
+    base, así que un producto con lotes en kg y en ton se asigna bien. Modificar
+    un lote agrega una entrada nueva con otra
+    versión; la anterior queda obsoleta y se descarta al salir del heap (o al
+    compactarlo, cuando las obsoletas superan a las vigentes).
+
+    Los lotes vencidos salen del heap una sola vez y pasan a una lista aparte
+    ordenada por vencimiento, así que las asignaciones siguientes no los vuelven
+    a recorrer; solo regresan al heap si se asigna a una fecha anterior.
+    """
+
+    def __init__(self):
+        self.heaps = {}  # producto o (producto, almacén) -> [(vencimiento, ID, versión)]
+        self.lots = {}  # ID -> {"product", "warehouse_id", "expiry", "quantity", "base_unit", "factor", "version"}
+        self._live = {}  # clave de heap -> lotes vigentes
+        self._units = {}  # producto -> {unidad base: lotes vigentes}
+        self._expired = {}  # clave de heap -> [(vencimiento, ID, versión)] vencidas, de menor a mayor
+        self._version = 0
+
+    def put(self, doc_id, data):
+        """Agrega o actualiza un lote"""
+        self.remove(doc_id)
+        if not _eligible(data):
+            return
+
+        self._version += 1
+        quantity, base_unit = base_quantity(data)
+        lot = {
+            "product": data.get("product_name"),
+            "warehouse_id": data.get("warehouse_id"),
+            "expiry": expiry_key(data.get("expiry_date")),
+            "quantity": quantity,
+            "base_unit": base_unit,
+            "factor": data.get("quantity") / quantity if quantity else 1.0,
+            "version": self._version
+        }
+        self.lots[doc_id] = lot
+        units = self._units.setdefault(lot["product"], {})
+        units[base_unit] = units.get(base_unit, 0) + 1
+
+        entry = (lot["expiry"], doc_id, lot["version"])
+        for heap_key in self._heap_keys(lot):
+            heap = self.heaps.setdefault(heap_key, [])
+            heapq.heappush(heap, entry)
+            self._live[heap_key] = self._live.get(heap_key, 0) + 1
+            size = len(heap) + len(self._expired.get(heap_key, ()))
+            if size > MIN_COMPACT_SIZE and size > 2 * self._live[heap_key]:
+                self._compact(heap_key)
+
+    def remove(self, doc_id):
+        """Quita un lote (sus entradas se descartan al salir del heap)"""
+        lot = self.lots.pop(doc_id, None)
+        if lot is None:
+            return
+        for heap_key in self._heap_keys(lot):
+            self._live[heap_key] -= 1
+        units = self._units[lot["product"]]
+        units[lot["base_unit"]] -= 1
+        if not units[lot["base_unit"]]:
+            del units[lot["base_unit"]]
+
+    def base_units(self, product_name):
+        """Unidades base de los lotes vigentes del producto"""
+        return sorted(self._units.get(product_name, ()))
+
+    def take(self, heap_key, quantity, base_unit, min_expiry, used):
+        """
+        Saca del heap los lotes que vencen primero (sin los vencidos antes de
+        min_expiry, los ya usados ni los de otra unidad base) hasta cubrir
+        quantity, expresada en la unidad base. Retorna [(ID, cantidad en la
+        unidad del lote, cantidad en la unidad base)] y vuelve a dejar en el heap
+        los lotes vigentes: cuesta O(k log n). Los vencidos pasan a la lista de
+        vencidos en lugar de volver al heap.
+        """
+        heap = self.heaps.get(heap_key)
+        if heap is None:
+            return []
+
+        # Una asignación a una fecha anterior vuelve a usar lotes que ya se tomaron como vencidos
+        expired = self._expired.get(heap_key)
+        while expired and expired[-1][0] >= min_expiry:
+            heapq.heappush(heap, expired.pop())
+        if not heap:
+            return []
+
+        taken = []
+        kept = []
+        remaining = quantity
+        while heap and remaining > QUANTITY_TOLERANCE:
+            entry = heapq.heappop(heap)
+            _, doc_id, version = entry
+            lot = self.lots.get(doc_id)
+            if lot is None or lot["version"] != version:
+                # Entrada obsoleta: no vuelve al heap
+                continue
+
+            if entry[0] < min_expiry:
+                # Casi siempre se agrega al final: el heap sale en orden de vencimiento
+                bisect.insort(self._expired.setdefault(heap_key, []), entry)
+                continue
+
+            kept.append(entry)
+            if doc_id in used:
+                continue
+            if base_unit is not None and lot["base_unit"] != base_unit:
+                continue
+
+            amount = min(remaining, lot["quantity"])
+            taken.append((doc_id, amount * lot["factor"], amount))
+            used.add(doc_id)
+            remaining -= amount
+
+        for entry in kept:
+            heapq.heappush(heap, entry)
+        return taken
+
+    def _heap_keys(self, lot):
+        return (lot["product"], (lot["product"], lot["warehouse_id"]))
+
+    def _compact(self, heap_key):
+        heap = [entry for entry in self.heaps[heap_key] if self._current(entry)]
+        heapq.heapify(heap)
+        self.heaps[heap_key] = heap
+        if heap_key in self._expired:
+            self._expired[heap_key] = [entry for entry in self._expired[heap_key] if self._current(entry)]
+
+    def _current(self, entry):
+        lot = self.lots.get(entry[1])
+        return lot is not None and lot["version"] == entry[2]
+
+class LotAllocator:
+    """
+    Asigna lotes de stock a un consumo por orden de vencimiento (FEFO: primero
+    se usa el lote que vence antes), opcionalmente agotando primero los lotes de
+    un almacén.
+
+    Los heaps por producto se arman una sola vez desde la réplica y se mantienen
+    con sus eventos de cambio de stock, así que una asignación que usa k lotes
+    cuesta O(k log n) y no recorre el stock. Si la réplica no está sincronizada
+    se leen de Firestore solo los lotes recibidos del producto.
+
+    La asignación no descuenta stock: es el plan que luego se consume.
+
+    Uso:
+        result = get_lot_allocator().allocate("Glifosato", 120, warehouse_id=warehouse_id)
+        if result["shortfall"] == 0:
+            for stock_id, quantity in result["lots"]:
+                ...
+    """
+
+    def __init__(self, db, replica=None):
+        self.db = db
+        self.replica = replica
+        self._lots = None  # _LotHeaps armado desde la réplica
+        self._lock = threading.RLock()
+
+        self.stats = {"builds": 0, "events_applied": 0, "firestore_loads": 0}
+
+        if self.replica is not None:
+            self.replica.subscribe(['stock'], self._on_changes)
+
+    def allocate(self, product_name, quantity, warehouse_id=None, as_of=None, unit=None):
+        """
+        Elige los lotes del producto que cubren quantity, primero los que vencen
+        antes. Con warehouse_id se usan primero los lotes de ese almacén. Los
+        lotes vencidos a la fecha as_of (por defecto, ahora) no se asignan.
+        quantity está en unit (solo se usan lotes convertibles a ella) o, sin
+        unit, en la unidad base de los lotes del producto; si sus lotes miden
+        cosas distintas (por ejemplo kg y l) hay que indicar unit y, si no, se
+        lanza ValueError.
+        Retorna {"lots": [(ID, cantidad en la unidad del lote)], "allocated",
+        "shortfall", "unit"}, las dos cantidades en unit (o en la unidad base
+        usada, la de "unit"); shortfall es mayor que cero si el stock no alcanza.
+        """
+        min_expiry = expiry_key(as_of or datetime.datetime.now())
+        base_unit, factor = unit_info(unit) if unit else (None, 1.0)
+
+        with self._lock:
+            if self._replica_synced():
+                lots = self._ensure_built()
+            else:
+                # Sin réplica (o al cerrar sesión) se descartan los heaps y se lee solo el producto
+                self._lots = None
+                lots = self._load_product(product_name)
+
+            if base_unit is None:
+                units = lots.base_units(product_name)
+                if len(units) > 1:
+                    raise ValueError(f"El producto {product_name} tiene lotes en distintas unidades "
+                                     f"({', '.join(units)}); indique la unidad")
+                base_unit = units[0] if units else None
+            required = quantity * factor
+
+            used = set()
+            taken = []
+            if warehouse_id:
+                taken += lots.take((product_name, warehouse_id), required, base_unit, min_expiry, used)
+            allocated = sum(base for _, _, base in taken)
+            taken += lots.take(product_name, required - allocated, base_unit, min_expiry, used)
+
+        allocated = sum(base for _, _, base in taken) / factor
+        shortfall = quantity - allocated
+        return {
+            "lots": [(doc_id, amount) for doc_id, amount, _ in taken],
+            "allocated": allocated,
+            "shortfall": shortfall if shortfall > QUANTITY_TOLERANCE else 0,
+            "unit": unit or base_unit
+        }
+
+    def clear(self):
+        """Descarta los heaps; se vuelven a armar en la próxima asignación"""
+        with self._lock:
+            self._lots = None
+
+    def _replica_synced(self):
+        return self.replica is not None and self.replica.is_synced('stock')
+
+    def _ensure_built(self):
+        if self._lots is None:
+            lots = _LotHeaps()
+            for doc_id, data in self.replica.query('stock', status="received"):
+                lots.put(doc_id, data)
+            self._lots = lots
+            self.stats["builds"] += 1
+        return self._lots
+
+    def _load_product(self, product_name):
+        lots = _LotHeaps()
+        docs = (self.db.collection('stock')
+                .where("product_name", "==", product_name)
+                .where("status", "==", "received")
+                .stream())
+        for doc in docs:
+            lots.put(doc.id, doc.to_dict() or {})
+        self.stats["firestore_loads"] += 1
+        return lots
+
+    def _on_changes(self, event):
+        """Aplica a los heaps los cambios de stock publicados por la réplica"""
+        with self._lock:
+            if self._lots is None:
+                return
+            for doc_id in event["added"] + event["modified"]:
+                data = self.replica.get('stock', doc_id)
+                if data is None:
+                    self._lots.remove(doc_id)
+                else:
+                    self._lots.put(doc_id, data)
+            for doc_id in event["removed"]:
+                self._lots.remove(doc_id)
+            self.stats["events_applied"] += 1
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+def get_lot_allocator():
+    """Retorna el asignador de lotes compartido, creándolo la primera vez"""
+    global _allocator
+    with _allocator_lock:
+        if _allocator is None:
+            _allocator = LotAllocator(get_firestore_db(), get_replica_store())
+        return _allocator
@@ -0,0 +1,159 @@
+# utils/name_index.py
+import threading
+
+from config.firebase_config import get_firestore_db
+from utils.replica_store import get_replica_store
+
+# Campo con el nombre a mostrar de cada colección
+NAME_FIELDS = {
+    'fields': "name",
+    'warehouses': "name",
+    'users': "username",
+    'stock': "product_name"
+}
+
+# Campos de fecha por los que se buscan los documentos modificados desde la última carga
+# (los usuarios nuevos no tienen updated_at)
+DELTA_FIELDS = {
+    'users': ["created_at", "updated_at"]
+}
+
+class NameIndex:
+    """
+    Mapas ID -> nombre a mostrar de campos, almacenes, usuarios y productos,
+    compartidos por todas las vistas.
+
+    La primera consulta de una colección la carga completa (solo el campo de
+    nombre); refresh() trae solo los documentos con updated_at posterior a la
+    última carga, o nada si la réplica ya la tiene sincronizada. Los cambios que
+    publica la réplica se aplican al momento, así que filtrar o redibujar una
+    tabla no hace consultas a Firestore.
+
+    Los administradores no se incluyen en el mapa de usuarios, igual que en
+    UserController.get_all_projected().
+    """
+
+    def __init__(self, db, replica=None):
+        self.db = db
+        self.replica = replica
+        self._maps = {}  # colección -> {ID: nombre}
+        self._last_seen = {}  # colección -> mayor fecha de modificación cargada
+        self._lock = threading.RLock()
+
+        self.stats = {"full_loads": 0, "delta_loads": 0, "events_applied": 0}
+
+        if self.replica is not None:
+            self.replica.subscribe(list(NAME_FIELDS), self._on_changes)
+
+    def names(self, collection):
+        """Retorna el mapa ID -> nombre de la colección, cargándolo la primera vez"""
+        with self._lock:
+            if collection not in self._maps:
+                self._load(collection)
+            return self._maps[collection]
+
+    def name(self, collection, doc_id, default="Desconocido"):
+        """Retorna el nombre a mostrar de un documento"""
+        return self.names(collection).get(doc_id, default)
+
+    def find_id(self, collection, name):
+        """Retorna el ID del primer documento con ese nombre o None"""
+        for doc_id, doc_name in self.names(collection).items():
+            if doc_name == name:
+                return doc_id
+        return None
+
+    def refresh(self, *collections):
+        """Actualiza las colecciones indicadas (o todas las cargadas) con los cambios desde la última carga"""
+        with self._lock:
+            for collection in collections or list(self._maps):
+                if collection not in self._maps:
+                    self._load(collection)
+                elif not self._replica_synced(collection):
+                    self._load_delta(collection)
+
+    def clear(self):
+        """Descarta todos los mapas; se recargan completos en la próxima consulta"""
+        with self._lock:
+            self._maps = {}
+            self._last_seen = {}
+
+    def _replica_synced(self, collection):
+        return self.replica is not None and self.replica.is_synced(collection)
+
+    def _load(self, collection):
+        """Carga el mapa completo desde la réplica o, si no está sincronizada, desde Firestore"""
+        self._maps[collection] = {}
+        self._last_seen.pop(collection, None)
+
+        if self._replica_synced(collection):
+            for doc_id, data in self.replica.query(collection):
+                self._apply(collection, doc_id, data)
+            return
+
+        docs = self.db.collection(collection).select(self._select_fields(collection)).stream()
+        for doc in docs:
+            self._apply(collection, doc.id, doc.to_dict() or {})
+        self.stats["full_loads"] += 1
+
+    def _load_delta(self, collection):
+        """Trae solo los documentos modificados después de la última carga"""
+        since = self._last_seen.get(collection)
+        if since is None:
+            self._load(collection)
+            return
+
+        for delta_field in DELTA_FIELDS.get(collection, ["updated_at"]):
+            docs = (self.db.collection(collection)
+                    .where(delta_field, ">", since)
+                    .select(self._select_fields(collection))
+                    .stream())
+            for doc in docs:
+                self._apply(collection, doc.id, doc.to_dict() or {})
+        self.stats["delta_loads"] += 1
+
+    def _select_fields(self, collection):
+        fields = [NAME_FIELDS[collection]] + DELTA_FIELDS.get(collection, ["updated_at"])
+        if collection == 'users':
+            fields.append("role")
+        return fields
+
+    def _apply(self, collection, doc_id, data):
+        """Agrega, actualiza o quita un documento del mapa"""
+        names = self._maps[collection]
+        if collection == 'users' and data.get("role") == 'admin':
+            names.pop(doc_id, None)
+        else:
+            names[doc_id] = data.get(NAME_FIELDS[collection]) or ""
+
+        for delta_field in DELTA_FIELDS.get(collection, ["updated_at"]):
+            value = data.get(delta_field)
+            last_seen = self._last_seen.get(collection)
+            if value is not None and (last_seen is None or value > last_seen):
+                self._last_seen[collection] = value
+
+    def _on_changes(self, event):
+        """Aplica los cambios publicados por la réplica a los mapas ya cargados"""
+        collection = event["collection"]
+        with self._lock:
+            if collection not in self._maps:
+                return
+
+            for doc_id in event["removed"]:
+                self._maps[collection].pop(doc_id, None)
+            for doc_id in event["added"] + event["modified"]:
+                data = self.replica.get(collection, doc_id)
+                if data is not None:
+                    self._apply(collection, doc_id, data)
+            self.stats["events_applied"] += 1
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_name_index():
+    """Retorna el índice de nombres compartido, creándolo la primera vez"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NameIndex(get_firestore_db(), get_replica_store())
+        return _index
\ No newline at end of file
@@ -0,0 +1,74 @@
+# utils/pagination.py
+import bisect
+
+from firebase_admin import firestore
+
+# Tamaño de página por defecto para las listas de las vistas
+DEFAULT_PAGE_SIZE = 50
+
+def fetch_page(query, order_by, build, page_size=DEFAULT_PAGE_SIZE, cursor=None, descending=False):
+    """
+    Obtiene una página de resultados ordenada por order_by a partir de un cursor.
+
+    build convierte cada snapshot en el objeto a retornar. El cursor es el último
+    snapshot de la página anterior (opaco para el llamador): Firestore reanuda la
+    consulta justo después de él, desempatando por ID de documento. Se pide un
+    documento extra para saber si hay más páginas sin hacer otra consulta.
+
+    Los documentos que no tienen el campo order_by no aparecen en la consulta.
+
+    Retorna {"items": [...], "next_cursor": snapshot o None, "has_more": bool}
+    """
+    direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+    query = query.order_by(order_by, direction=direction)
+    if cursor is not None:
+        query = query.start_after(cursor)
+
+    docs = list(query.limit(page_size + 1).stream())
+    has_more = len(docs) > page_size
+    docs = docs[:page_size]
+
+    return {
+        "items": [build(doc) for doc in docs],
+        "next_cursor": docs[-1] if has_more else None,
+        "has_more": has_more
+    }
+
+def slice_page(rows, build, page_size=DEFAULT_PAGE_SIZE, cursor=None, order_by=None, descending=False):
+    """
+    Igual que fetch_page pero sobre filas [(ID, datos)] ya filtradas y ordenadas en
+    memoria (por ejemplo, de la réplica) por (order_by, ID), o por ID si no hay
+    order_by. build recibe (ID, datos).
+
+    El cursor es la clave de orden de la última fila de la página anterior, así que
+    la página siguiente se ubica con bisect aunque esa fila ya no esté (se borró o
+    dejó de cumplir el filtro). También acepta el cursor de una página obtenida de
+    Firestore (un snapshot): se continúa después de ese documento. Si el cursor no
+    se puede ubicar se retorna una página vacía en lugar de volver a empezar.
+    """
+    def row_key(doc_id, data):
+        return (data.get(order_by), doc_id) if order_by else (doc_id,)
+
+    start = 0
+    if cursor is not None:
+        if not isinstance(cursor, tuple):
+            cursor = row_key(cursor.id, cursor.to_dict() or {})
+        keys = [row_key(doc_id, data) for doc_id, data in rows]
+        try:
+            if descending:
+                # Filas de mayor a menor: la página sigue en la primera clave menor que el cursor
+                start = len(keys) - bisect.bisect_left(keys[::-1], cursor)
+            else:
+                start = bisect.bisect_right(keys, cursor)
+        except TypeError:
+            # El valor del cursor no se puede comparar con los de las filas (por ejemplo, falta el campo)
+            return {"items": [], "next_cursor": None, "has_more": False}
+
+    page_rows = rows[start:start + page_size]
+    has_more = start + page_size < len(rows)
+
+    return {
+        "items": [build(doc_id, data) for doc_id, data in page_rows],
+        "next_cursor": row_key(*page_rows[-1]) if has_more else None,
+        "has_more": has_more
+    }
\ No newline at end of file
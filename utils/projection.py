@@ -0,0 +1,20 @@
+# utils/projection.py
+
+def project(doc, fields):
+    """
+    Convierte un documento obtenido con select() en un diccionario liviano
+    con su "id" y los campos pedidos (None si el documento no los tiene).
+    """
+    return project_data(doc.id, doc.to_dict(), fields)
+
+def project_data(doc_id, data, fields):
+    """Igual que project pero a partir del ID y los datos (por ejemplo, de la réplica)"""
+    data = data or {}
+    record = {"id": doc_id}
+    for field in fields:
+        record[field] = data.get(field)
+    return record
+
+def lookup_map(records, field, default=None):
+    """Arma un mapa id -> valor a partir de registros proyectados"""
+    return {record["id"]: record.get(field, default) for record in records}
\ No newline at end of file
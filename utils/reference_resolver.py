@@ -0,0 +1,76 @@
+# utils/reference_resolver.py
+
+class ReferenceResolver:
+    """
+    Resuelve en una sola llamada (multi-get) todas las referencias a documentos
+    que necesita una validación, en lugar de hacer un get() por referencia.
+
+    Uso:
+        resolver = ReferenceResolver(db)
+        resolver.add('fields', field_id)
+        resolver.add('stock', product_id)
+        resolver.resolve()
+        if not resolver.exists('fields', field_id): ...
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._refs = {}  # (colección, id) -> DocumentReference
+        self.documents = {}  # (colección, id) -> datos del documento o None
+
+    def add(self, collection, doc_id):
+        """Registra una referencia para resolverla en la próxima llamada a resolve()"""
+        key = (collection, doc_id)
+        if doc_id and key not in self._refs:
+            self._refs[key] = self.db.collection(collection).document(doc_id)
+        return key
+
+    def add_many(self, collection, doc_ids):
+        """Registra varias referencias de una misma colección"""
+        return [self.add(collection, doc_id) for doc_id in doc_ids or []]
+
+    def resolve(self, transaction=None, cache=None):
+        """
+        Obtiene todos los documentos registrados en una sola llamada.
+        Si se pasa un cache (CacheManager) y no hay transacción, los documentos en
+        caché no se vuelven a leer y los leídos se guardan en él.
+        """
+        self.documents = {key: None for key in self._refs}
+        if not self._refs:
+            return self.documents
+
+        # Dentro de una transacción siempre se lee de Firestore
+        if transaction is not None:
+            cache = None
+
+        refs = {}
+        for key, ref in self._refs.items():
+            data = cache.get(*key) if cache is not None else None
+            if data is not None:
+                self.documents[key] = data
+            else:
+                refs[key] = ref
+
+        if not refs:
+            return self.documents
+
+        # get_all no garantiza el orden, se asocia cada snapshot por su ruta
+        keys_by_path = {ref.path: key for key, ref in refs.items()}
+        snapshots = self.db.get_all(list(refs.values()), transaction=transaction)
+
+        for snapshot in snapshots:
+            key = keys_by_path.get(snapshot.reference.path)
+            if key is not None and snapshot.exists:
+                self.documents[key] = snapshot.to_dict()
+                if cache is not None:
+                    cache.set(key[0], key[1], self.documents[key])
+
+        return self.documents
+
+    def get(self, collection, doc_id):
+        """Retorna los datos del documento resuelto o None si no existe"""
+        return self.documents.get((collection, doc_id))
+
+    def exists(self, collection, doc_id):
+        """Indica si el documento resuelto existe"""
+        return self.get(collection, doc_id) is not None
\ No newline at end of file
@@ -0,0 +1,419 @@
+# utils/replica_store.py
+import datetime
+import queue
+import sqlite3
+import threading
+
+from config.firebase_config import get_firestore_db
+from utils.fumigation_stats import month_key
+from utils.indexed_table import IndexedTable
+from utils.local_mirror import LocalMirror, TOMBSTONES_KEY
+
+# Colecciones replicadas y los campos indexados de cada una
+REPLICATED_COLLECTIONS = {
+    'fields': ["status", "risk_level"],
+    'warehouses': [],
+    'stock': ["warehouse_id", "status", "category", "product_name"],
+    'fumigations': ["status", "field_id", "applicator_id"],
+    'users': ["role", "username"]
+}
+
+# Índices calculados de cada colección ({nombre: función(datos) -> clave})
+DERIVED_INDEXES = {
+    'fumigations': {"date_month": lambda data: month_key(data.get("date"))}
+}
+
+# Campos que nunca se guardan en la réplica
+PRIVATE_FIELDS = {
+    'users': ["password_hash"]
+}
+
+# Campo de fecha de modificación por el que se sincroniza cada colección de forma
+# incremental. Las colecciones sin campo (los usuarios nuevos no tienen updated_at)
+# se sincronizan completas en cada inicio.
+SYNC_FIELDS = {
+    'fields': "updated_at",
+    'warehouses': "updated_at",
+    'stock': "updated_at",
+    'fumigations': "updated_at"
+}
+
+# Margen que se resta a las marcas de agua para tolerar diferencias de reloj
+# entre clientes y entradas de auditoría escritas con demora
+SYNC_OVERLAP = datetime.timedelta(minutes=10)
+
+class ReplicaStore:
+    """
+    Réplica en memoria de las colecciones principales, mantenida con listeners
+    de Firestore (on_snapshot).
+
+    El primer snapshot de cada colección trae todos los documentos; después solo
+    llegan los cambios, que se aplican a una IndexedTable por colección. Mientras
+    una colección está sincronizada los controladores leen de la réplica sin ir a
+    la red. Los listeners corren en hilos de Firestore, así que los eventos de
+    cambio se encolan y se entregan a los suscriptores en el hilo que llama a
+    dispatch_pending() (el de Tk, mediante pump()).
+
+    Con un mirror (LocalMirror) cada cambio se guarda también en disco. Al iniciar,
+    las colecciones ya guardadas se cargan desde disco y quedan sincronizadas al
+    instante; su listener solo pide los documentos con fecha de modificación
+    posterior a la marca de agua, y las bajas llegan por un listener de las
+    entradas "delete" del log de auditoría.
+
+    Con mirror_factory(scope) el mirror se abre en start(scope): cada usuario usa
+    el suyo y al iniciar con otro usuario se cambia de archivo.
+    """
+
+    def __init__(self, db, collections=None, mirror=None, mirror_factory=None):
+        self.db = db
+        self.collections = collections or REPLICATED_COLLECTIONS
+        self.mirror = mirror
+        self.mirror_factory = mirror_factory
+        self._mirror_scope = None
+        self.tables = {name: IndexedTable(fields, DERIVED_INDEXES.get(name))
+                       for name, fields in self.collections.items()}
+
+        self._lock = threading.RLock()
+        self._synced = {name: threading.Event() for name in self.collections}
+        self._watches = {}  # colección -> watch de on_snapshot
+        self._tombstone_watch = None
+        self._subscribers = []  # (colecciones, callback)
+        self._events = queue.Queue()
+
+        self.stats = {"snapshots": 0, "changes": 0, "events_dispatched": 0,
+                      "loaded_from_disk": 0, "tombstones": 0}
+
+    def start(self, scope=None):
+        """
+        Inicia los listeners de las colecciones que aún no se están replicando. scope
+        (el ID del usuario) elige el mirror en disco si la réplica usa mirror_factory
+        """
+        if self.mirror_factory is not None and (self.mirror is None or scope != self._mirror_scope):
+            self._open_mirror(scope)
+
+        for name in self.collections:
+            if name in self._watches:
+                continue
+
+            query = self.db.collection(name)
+            full_sync = True
+
+            # Cargar desde disco y pedir solo lo modificado desde la última sincronización
+            if self._load_from_mirror(name):
+                sync_field = SYNC_FIELDS.get(name)
+                high_water = self.mirror.get_high_water(name)
+                if sync_field and high_water is not None:
+                    query = query.where(sync_field, ">", high_water - SYNC_OVERLAP)
+                    full_sync = False
+
+            self._watches[name] = query.on_snapshot(self._make_handler(name, full_sync))
+
+        if self.mirror is not None and self._tombstone_watch is None:
+            self._start_tombstone_watch()
+
+    def stop(self):
+        """Detiene los listeners y descarta los datos replicados (el mirror en disco se conserva)"""
+        watches = list(self._watches.values())
+        if self._tombstone_watch is not None:
+            watches.append(self._tombstone_watch)
+
+        for watch in watches:
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                print(f"Error al detener listener de réplica: {str(e)}")
+        self._watches = {}
+        self._tombstone_watch = None
+
+        with self._lock:
+            for name, table in self.tables.items():
+                table.clear()
+                self._synced[name].clear()
+
+    def is_synced(self, collection):
+        """Indica si la colección ya recibió su primer snapshot"""
+        synced = self._synced.get(collection)
+        return synced is not None and synced.is_set()
+
+    def wait_until_synced(self, collection, timeout=None):
+        """Espera el primer snapshot de la colección; retorna False si se agota el tiempo"""
+        synced = self._synced.get(collection)
+        return synced is not None and synced.wait(timeout)
+
+    def get(self, collection, doc_id):
+        """Retorna una copia de los datos del documento o None si no está en la réplica"""
+        with self._lock:
+            data = self.tables[collection].get(doc_id)
+            return dict(data) if data is not None else None
+
+    def query(self, collection, order_by=None, descending=False, **filters):
+        """
+        Retorna [(ID, datos)] de los documentos que cumplen los filtros por igualdad
+        (los filtros en None se ignoran), ordenados por order_by o por ID. Los
+        filtros pueden usar los índices calculados (por ejemplo date_month="2024-05").
+        Retorna None si la colección aún no está sincronizada, para que el llamador
+        consulte Firestore.
+        """
+        if not self.is_synced(collection):
+            return None
+
+        with self._lock:
+            table = self.tables[collection]
+            ids = table.ids_matching(filters)
+
+            if ids is None:
+                rows = [(doc_id, dict(data)) for doc_id, data in table.items()]
+            else:
+                rows = [(doc_id, dict(table.get(doc_id))) for doc_id in ids]
+
+        if order_by:
+            # Igual que en Firestore, los documentos sin el campo de orden no aparecen
+            rows = [row for row in rows if row[1].get(order_by) is not None]
+            rows.sort(key=lambda row: (row[1][order_by], row[0]), reverse=descending)
+        else:
+            rows.sort(key=lambda row: row[0])
+
+        return rows
+
+    def count(self, collection, **filters):
+        """
+        Cantidad de documentos que cumplen los filtros por igualdad (sin copiarlos).
+        Retorna None si la colección aún no está sincronizada.
+        """
+        if not self.is_synced(collection):
+            return None
+        with self._lock:
+            table = self.tables[collection]
+            ids = table.ids_matching(filters)
+            return len(table) if ids is None else len(ids)
+
+    def values(self, collection, field):
+        """
+        Valores distintos de un campo indexado (o índice calculado) de la colección.
+        Retorna None si la colección aún no está sincronizada.
+        """
+        if not self.is_synced(collection):
+            return None
+        with self._lock:
+            return self.tables[collection].values(field)
+
+    def subscribe(self, collections, callback):
+        """
+        Registra callback(event) para los cambios en las colecciones indicadas.
+        event es {"collection", "added", "modified", "removed"} con listas de IDs.
+        Retorna una función que cancela la suscripción.
+        """
+        entry = (set(collections), callback)
+        self._subscribers.append(entry)
+
+        def unsubscribe():
+            if entry in self._subscribers:
+                self._subscribers.remove(entry)
+
+        return unsubscribe
+
+    def dispatch_pending(self):
+        """Entrega a los suscriptores los cambios encolados, agrupados por colección"""
+        pending = {}
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+            merged = pending.setdefault(event["collection"], {"added": set(), "modified": set(), "removed": set()})
+            for kind in ("added", "modified", "removed"):
+                merged[kind].update(event[kind])
+
+        for collection, changes in pending.items():
+            event = {"collection": collection, **{kind: sorted(ids) for kind, ids in changes.items()}}
+            for collections, callback in list(self._subscribers):
+                if collection not in collections:
+                    continue
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"Error al notificar cambios de {collection}: {str(e)}")
+            self.stats["events_dispatched"] += 1
+
+    def pump(self, widget, interval_ms=200):
+        """Entrega los cambios periódicamente en el hilo de Tk mientras exista el widget"""
+        def tick():
+            if not widget.winfo_exists():
+                return
+            self.dispatch_pending()
+            widget.after(interval_ms, tick)
+
+        widget.after(interval_ms, tick)
+
+    def _open_mirror(self, scope):
+        """Cambia al mirror de scope; los datos replicados del anterior se descartan"""
+        if self._watches or self._tombstone_watch is not None:
+            self.stop()
+        if self.mirror is not None:
+            try:
+                self.mirror.close()
+            except sqlite3.Error as e:
+                print(f"Error al cerrar réplica local: {str(e)}")
+
+        try:
+            self.mirror = self.mirror_factory(scope)
+        except sqlite3.Error as e:
+            # Sin copia en disco la réplica funciona igual, solo que arranca en frío
+            print(f"Error al abrir réplica local: {str(e)}")
+            self.mirror = None
+        self._mirror_scope = scope
+
+    def _load_from_mirror(self, collection):
+        """Carga la colección desde disco; retorna False si nunca se sincronizó"""
+        if self.mirror is None:
+            return False
+
+        try:
+            if not self.mirror.has_collection(collection):
+                return False
+            rows = self.mirror.load(collection)
+        except sqlite3.Error as e:
+            print(f"Error al leer réplica local de {collection}: {str(e)}")
+            return False
+
+        with self._lock:
+            table = self.tables[collection]
+            table.clear()
+            for doc_id, data in rows:
+                table.upsert(doc_id, data)
+
+        self._synced[collection].set()
+        self.stats["loaded_from_disk"] += len(rows)
+        return True
+
+    def _make_handler(self, collection, full_sync=True):
+        # El primer snapshot de un listener completo trae todos los documentos:
+        # los que quedaron en disco y ya no existen se descartan
+        first = [full_sync]
+
+        def on_snapshot(snapshots, changes, read_time):
+            present_ids = {doc.id for doc in snapshots} if first[0] else None
+            first[0] = False
+            self._apply_changes(collection, changes, present_ids)
+        return on_snapshot
+
+    def _apply_changes(self, collection, changes, present_ids=None):
+        """
+        Aplica a la tabla los cambios de un snapshot (se ejecuta en el hilo del listener).
+        Si se pasa present_ids, se eliminan los documentos que no están en él.
+        """
+        event = {"collection": collection, "added": [], "modified": [], "removed": []}
+        private_fields = PRIVATE_FIELDS.get(collection, [])
+        sync_field = SYNC_FIELDS.get(collection)
+        upserts = []
+        high_water = None
+
+        with self._lock:
+            table = self.tables[collection]
+            for change in changes:
+                doc = change.document
+                kind = change.type.name
+                if kind == "REMOVED":
+                    table.remove(doc.id)
+                    event["removed"].append(doc.id)
+                    continue
+
+                data = doc.to_dict() or {}
+                for field in private_fields:
+                    data.pop(field, None)
+                table.upsert(doc.id, data)
+                upserts.append((doc.id, data))
+                event["added" if kind == "ADDED" else "modified"].append(doc.id)
+
+                modified_at = data.get(sync_field) if sync_field else None
+                if isinstance(modified_at, datetime.datetime) and (high_water is None or modified_at > high_water):
+                    high_water = modified_at
+
+            if present_ids is not None:
+                for doc_id, _ in table.items():
+                    if doc_id not in present_ids:
+                        table.remove(doc_id)
+                        event["removed"].append(doc_id)
+                rows = table.items()
+
+        self._save_to_mirror(collection, upserts, event["removed"], high_water,
+                             rows if present_ids is not None else None)
+
+        self.stats["snapshots"] += 1
+        self.stats["changes"] += len(changes)
+
+        # El primer snapshot marca la colección como sincronizada
+        first_sync = not self._synced[collection].is_set()
+        self._synced[collection].set()
+        if (changes or event["removed"]) and not first_sync:
+            self._events.put(event)
+
+    def _save_to_mirror(self, collection, upserts, removed, high_water, rows=None):
+        """Guarda en disco los cambios aplicados; rows reemplaza la colección completa"""
+        if self.mirror is None:
+            return
+
+        try:
+            if rows is not None:
+                self.mirror.replace(collection, rows, high_water)
+            else:
+                self.mirror.apply(collection, upserts, removed, high_water)
+        except sqlite3.Error as e:
+            print(f"Error al guardar réplica local de {collection}: {str(e)}")
+
+    def _start_tombstone_watch(self):
+        """Escucha las bajas registradas en el log de auditoría desde la última sincronización"""
+        since = self.mirror.get_high_water(TOMBSTONES_KEY)
+        if since is None:
+            # Primera sincronización: las colecciones se cargan completas, solo interesan las bajas futuras.
+            # Las fechas se guardan como datetime.now() sin zona, que Firestore interpreta como UTC
+            since = datetime.datetime.now().replace(tzinfo=datetime.timezone.utc)
+            self.mirror.set_high_water(TOMBSTONES_KEY, since)
+
+        query = (self.db.collection('audit_logs')
+                 .where("action", "==", "delete")
+                 .where("timestamp", ">", since - SYNC_OVERLAP))
+        self._tombstone_watch = query.on_snapshot(self._on_tombstones)
+
+    def _on_tombstones(self, snapshots, changes, read_time):
+        """Elimina de la réplica y del disco los documentos dados de baja según el log de auditoría"""
+        removed = {}
+        high_water = None
+
+        with self._lock:
+            for change in changes:
+                if change.type.name != "ADDED":
+                    continue
+
+                entry = change.document.to_dict() or {}
+                collection = entry.get("collection")
+                doc_id = entry.get("document_id")
+                timestamp = entry.get("timestamp")
+                if isinstance(timestamp, datetime.datetime) and (high_water is None or timestamp > high_water):
+                    high_water = timestamp
+
+                if collection in self.tables and doc_id and self.tables[collection].remove(doc_id) is not None:
+                    removed.setdefault(collection, []).append(doc_id)
+
+        for collection, doc_ids in removed.items():
+            self._save_to_mirror(collection, [], doc_ids, None)
+            self._events.put({"collection": collection, "added": [], "modified": [], "removed": doc_ids})
+            self.stats["tombstones"] += len(doc_ids)
+
+        if high_water is not None:
+            try:
+                self.mirror.set_high_water(TOMBSTONES_KEY, high_water)
+            except sqlite3.Error as e:
+                print(f"Error al guardar réplica local: {str(e)}")
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_replica_store():
+    """Retorna la réplica compartida, creándola la primera vez (sin iniciar los listeners)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            # Un mirror en disco por usuario; se abre al iniciar la réplica con su ID
+            _store = ReplicaStore(get_firestore_db(), mirror_factory=lambda scope: LocalMirror(scope=scope))
+        return _store
\ No newline at end of file
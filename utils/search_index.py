@@ -0,0 +1,73 @@
+# utils/search_index.py
+import bisect
+import unicodedata
+
+# Milisegundos sin escribir antes de buscar (búsqueda mientras se escribe)
+SEARCH_DELAY_MS = 250
+
+def normalize(text):
+    """Pasa el texto a minúsculas y le quita los acentos ("Maíz" -> "maiz")"""
+    text = unicodedata.normalize("NFKD", str(text or "")).lower()
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+class SearchIndex:
+    """
+    Índice de palabras normalizadas para buscar sobre una lista en memoria.
+
+    texts(item) retorna los textos buscables de cada elemento. rebuild() arma
+    una lista ordenada de palabras y, para cada una, las posiciones de los
+    elementos que la contienen; search() busca cada término como comienzo de
+    palabra con bisect, así que una búsqueda no recorre los elementos ni vuelve a
+    normalizar sus textos. El índice se reconstruye solo cuando cambian los datos.
+
+    Uso:
+        index = SearchIndex(lambda field: [field.name, field.location])
+        index.rebuild(fields)
+        results = index.search("norte maiz")
+    """
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.items = []
+        self._tokens = []  # Palabras ordenadas
+        self._postings = {}  # palabra -> posiciones de los elementos
+
+    def rebuild(self, items):
+        """Vuelve a indexar los elementos"""
+        self.items = list(items)
+        postings = {}
+        for position, item in enumerate(self.items):
+            for text in self.texts(item):
+                for token in normalize(text).split():
+                    postings.setdefault(token, set()).add(position)
+        self._postings = postings
+        self._tokens = sorted(postings)
+
+    def search(self, query):
+        """
+        Retorna, en el orden original, los elementos en los que cada término de
+        la consulta es el comienzo de alguna palabra (sin distinguir mayúsculas
+        ni acentos). Una consulta vacía retorna todos los elementos.
+        """
+        terms = normalize(query).split()
+        if not terms:
+            return list(self.items)
+
+        positions = None
+        # Empezar por el término más largo, que suele tener menos coincidencias
+        for term in sorted(terms, key=len, reverse=True):
+            matches = self._prefix_matches(term)
+            positions = matches if positions is None else positions & matches
+            if not positions:
+                return []
+
+        return [self.items[position] for position in sorted(positions)]
+
+    def _prefix_matches(self, term):
+        matches = set()
+        start = bisect.bisect_left(self._tokens, term)
+        for token in self._tokens[start:]:
+            if not token.startswith(term):
+                break
+            matches |= self._postings[token]
+        return matches
@@ -0,0 +1,94 @@
+# utils/single_flight.py
+import threading
+import time
+
+# Segundos durante los que un resultado recién obtenido se comparte con llamadas idénticas
+DEFAULT_WINDOW = 1.0
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+class SingleFlight:
+    """
+    Agrupa consultas idénticas para que compartan una sola lectura.
+
+    Si llega una llamada con la misma clave mientras otra está en curso, espera
+    su resultado en lugar de repetir la consulta; si la anterior terminó hace
+    menos de window segundos, reutiliza su resultado. Las claves empiezan por el
+    nombre de la colección, y los controladores llaman a forget(colección) al
+    escribir para que la siguiente lectura vaya de nuevo a Firestore.
+
+    Uso:
+        rows = flights.do(('stock', 'all', warehouse_id, status), lambda: fetch())
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._flights = {}  # clave -> _Flight
+        self._lock = threading.Lock()
+
+        self.stats = {"calls": 0, "executed": 0, "deduplicated": 0}
+
+    def do(self, key, fn):
+        """Retorna el resultado de fn(), compartido con las llamadas de la misma clave"""
+        with self._lock:
+            self.stats["calls"] += 1
+            flight = self._flights.get(key)
+            if flight is not None and flight.done.is_set() and (
+                    flight.error is not None or time.monotonic() - flight.finished_at > self.window):
+                flight = None
+
+            if flight is not None:
+                self.stats["deduplicated"] += 1
+                leader = False
+            else:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.stats["executed"] += 1
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            flight.finished_at = time.monotonic()
+            flight.done.set()
+            with self._lock:
+                # Los errores no se comparten con llamadas posteriores
+                if flight.error is not None and self._flights.get(key) is flight:
+                    del self._flights[key]
+
+        return flight.result
+
+    def forget(self, collection):
+        """Descarta los resultados (y consultas en curso) de la colección para las próximas llamadas"""
+        with self._lock:
+            for key in [key for key in self._flights if key[0] == collection]:
+                del self._flights[key]
+
+def stream_rows(query):
+    """Ejecuta la consulta y retorna [(ID, datos)] para compartirlos entre llamadas"""
+    return [(doc.id, doc.to_dict()) for doc in query.stream()]
+
+_flights = None
+_flights_lock = threading.Lock()
+
+def get_single_flight():
+    """Retorna el agrupador de consultas compartido, creándolo la primera vez"""
+    global _flights
+    with _flights_lock:
+        if _flights is None:
+            _flights = SingleFlight()
+        return _flights
\ No newline at end of file
@@ -0,0 +1,231 @@
+# utils/stock_aggregates.py
+import hashlib
+import json
+
+from firebase_admin import firestore
+
+from utils.units import base_quantity, conversion_factor
+
+# Colección con los agregados materializados del stock recibido
+AGGREGATES_COLLECTION = 'stock_aggregates'
+
+# Claves usadas en el resumen para valores faltantes (mismas que get_stock_summary)
+NO_WAREHOUSE = "sin_almacen"
+NO_CATEGORY = "sin_categoria"
+
+# Tolerancia para comparar cantidades acumuladas con incrementos de punto flotante
+QUANTITY_TOLERANCE = 1e-6
+
+# Límite de operaciones por lote de escritura en Firestore
+MAX_BATCH_SIZE = 500
+
+def cell_key(stock_data):
+    """
+    Retorna la celda (almacén, categoría, producto, unidad base) a la que aporta un
+    lote de stock, o None si el lote no cuenta en el resumen (solo cuenta el stock
+    recibido). Los lotes de unidades que no se pueden convertir entre sí (kg y l,
+    o unidades desconocidas) van a celdas distintas.
+    """
+    if not stock_data or stock_data.get("status") != "received":
+        return None
+    return (
+        stock_data.get("warehouse_id") or NO_WAREHOUSE,
+        stock_data.get("category") or NO_CATEGORY,
+        stock_data.get("product_name"),
+        base_quantity(stock_data)[1]
+    )
+
+def cell_id(key):
+    """ID de documento estable para una celda (los nombres pueden contener '/')"""
+    return hashlib.sha1(json.dumps(list(key), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+class StockAggregateDelta:
+    """
+    Acumula los cambios que una escritura de stock produce en los agregados.
+
+    Cada lote recibido aporta su cantidad y un item a la celda (almacén, categoría,
+    producto, unidad base). La cantidad se acumula normalizada a la unidad base
+    (utils/units.py), así que lotes del mismo producto en kg y en ton se suman
+    bien y nunca se suman unidades de dimensiones distintas. Para una
+    modificación se resta el aporte anterior y se suma el nuevo; write() agrega
+    los incrementos al mismo lote o transacción que escribe el stock.
+    """
+
+    def __init__(self):
+        self.cells = {}  # celda -> {"quantity", "items", "unit"}
+
+    def add(self, stock_data, sign=1):
+        """Suma (o resta con sign=-1) el aporte de un lote"""
+        key = cell_key(stock_data)
+        if key is None:
+            return
+        cell = self.cells.setdefault(key, {"quantity": 0, "items": 0})
+        cell["quantity"] += sign * base_quantity(stock_data)[0]
+        cell["items"] += sign
+
+    def remove(self, stock_data):
+        """Resta el aporte de un lote"""
+        self.add(stock_data, sign=-1)
+
+    def write(self, db, writer):
+        """Agrega los incrementos a writer (un WriteBatch o una Transaction)"""
+        for key, cell in self.cells.items():
+            if cell["quantity"] == 0 and cell["items"] == 0:
+                continue
+
+            warehouse_id, category, product_name, unit = key
+            data = {
+                "warehouse_id": warehouse_id,
+                "category": category,
+                "product_name": product_name,
+                "unit": unit,
+                "quantity": firestore.Increment(cell["quantity"]),
+                "items": firestore.Increment(cell["items"])
+            }
+
+            writer.set(db.collection(AGGREGATES_COLLECTION).document(cell_id(key)), data, merge=True)
+
+def read_cells(db):
+    """Lee todas las celdas de agregados con al menos un lote"""
+    cells = []
+    for doc in db.collection(AGGREGATES_COLLECTION).stream():
+        cell = doc.to_dict()
+        if (cell.get("items") or 0) > 0:
+            cells.append(cell)
+    return cells
+
+def build_summary(cells, groupby="warehouse", unit=None):
+    """
+    Arma el resumen con la misma forma que StockController.get_stock_summary
+    a partir de las celdas de agregados (costo proporcional a la cantidad de grupos).
+    Las cantidades de las celdas están en su unidad base; con unit se expresan en
+    esa unidad las que son convertibles (las demás quedan en su unidad base).
+    Un producto con lotes en unidades no convertibles entre sí tiene un total por
+    unidad, con la clave "producto (unidad)".
+    """
+    summary = {}
+    factors = {}  # unidad base -> (factor, unidad del resumen), una vez por unidad
+    product_units = {}  # producto -> unidades del resumen en las que aparece
+
+    for cell in cells:
+        product_name = cell.get("product_name")
+        items = cell.get("items") or 0
+        cell_unit = cell.get("unit")
+        if cell_unit not in factors:
+            factor = conversion_factor(cell_unit, unit) if unit else None
+            factors[cell_unit] = (factor, unit) if factor is not None else (1.0, cell_unit)
+        factor, unit_shown = factors[cell_unit]
+        quantity = (cell.get("quantity") or 0) * factor
+        product_units.setdefault(product_name, set()).add(unit_shown)
+        product_key = (product_name, unit_shown)
+
+        if groupby == "product":
+            group = summary.setdefault(product_key, {"total_quantity": 0, "unit": unit_shown, "warehouses": {}})
+            group["total_quantity"] += quantity
+            warehouses = group["warehouses"]
+            warehouses[cell.get("warehouse_id")] = warehouses.get(cell.get("warehouse_id"), 0) + quantity
+        elif groupby in ("warehouse", "category"):
+            group_key = cell.get("warehouse_id") if groupby == "warehouse" else cell.get("category")
+            group = summary.setdefault(group_key, {"total_items": 0, "products": {}})
+            group["total_items"] += items
+            product = group["products"].setdefault(product_key, {"quantity": 0, "unit": unit_shown})
+            product["quantity"] += quantity
+
+    def label(product_key):
+        product_name, unit_shown = product_key
+        return product_name if len(product_units[product_name]) == 1 else f"{product_name} ({unit_shown})"
+
+    if groupby == "product":
+        return {label(key): group for key, group in summary.items()}
+    for group in summary.values():
+        group["products"] = {label(key): product for key, product in group["products"].items()}
+    return summary
+
+def compute_cells(stock_docs):
+    """Calcula las celdas desde cero a partir de los documentos de stock"""
+    delta = StockAggregateDelta()
+    for doc in stock_docs:
+        delta.add(doc.to_dict())
+    return delta.cells
+
+def _expected_cells(db, stock_collection):
+    """Celdas recalculadas desde el stock recibido"""
+    return compute_cells(db.collection(stock_collection).where("status", "==", "received").stream())
+
+def _drift(db, expected):
+    """Compara las celdas esperadas con los documentos materializados"""
+    expected_by_id = {cell_id(key): (key, cell) for key, cell in expected.items()}
+
+    drift = []
+    seen = set()
+    for doc in db.collection(AGGREGATES_COLLECTION).stream():
+        seen.add(doc.id)
+        actual = doc.to_dict()
+        key, cell = expected_by_id.get(doc.id, (None, {"quantity": 0, "items": 0}))
+        if key is None:
+            key = (actual.get("warehouse_id"), actual.get("category"), actual.get("product_name"), actual.get("unit"))
+
+        if (abs((actual.get("quantity") or 0) - cell["quantity"]) > QUANTITY_TOLERANCE or
+                (actual.get("items") or 0) != cell["items"]):
+            drift.append({
+                "cell": key,
+                "expected": {"quantity": cell["quantity"], "items": cell["items"]},
+                "actual": {"quantity": actual.get("quantity") or 0, "items": actual.get("items") or 0}
+            })
+
+    for doc_id, (key, cell) in expected_by_id.items():
+        if doc_id not in seen:
+            drift.append({
+                "cell": key,
+                "expected": {"quantity": cell["quantity"], "items": cell["items"]},
+                "actual": None
+            })
+
+    return drift, seen
+
+def verify(db, stock_collection='stock'):
+    """
+    Recalcula los agregados desde el stock y los compara con los materializados.
+    Retorna una lista de diferencias: {"cell", "expected", "actual"}
+    """
+    drift, _ = _drift(db, _expected_cells(db, stock_collection))
+    return drift
+
+def rebuild(db, stock_collection='stock'):
+    """
+    Reemplaza los agregados por los recalculados desde el stock.
+    Retorna las diferencias encontradas antes de reconstruir.
+    """
+    expected = _expected_cells(db, stock_collection)
+    drift, existing_ids = _drift(db, expected)
+
+    writes = []
+    expected_ids = set()
+    for key, cell in expected.items():
+        warehouse_id, category, product_name, unit = key
+        doc_id = cell_id(key)
+        expected_ids.add(doc_id)
+        writes.append(("set", doc_id, {
+            "warehouse_id": warehouse_id,
+            "category": category,
+            "product_name": product_name,
+            "unit": unit,
+            "quantity": cell["quantity"],
+            "items": cell["items"]
+        }))
+
+    for doc_id in existing_ids - expected_ids:
+        writes.append(("delete", doc_id, None))
+
+    # Escribir en lotes de hasta MAX_BATCH_SIZE operaciones
+    for start in range(0, len(writes), MAX_BATCH_SIZE):
+        batch = db.batch()
+        for op, doc_id, data in writes[start:start + MAX_BATCH_SIZE]:
+            ref = db.collection(AGGREGATES_COLLECTION).document(doc_id)
+            if op == "set":
+                batch.set(ref, data)
+            else:
+                batch.delete(ref)
+        batch.commit()
+
+    return drift
\ No newline at end of file
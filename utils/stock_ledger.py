@@ -0,0 +1,220 @@
+# utils/stock_ledger.py
+import datetime
+
+from firebase_admin import firestore
+
+from utils.stock_aggregates import StockAggregateDelta, QUANTITY_TOLERANCE
+from utils.units import normalized_fields
+
+# Colecciones del libro de movimientos (solo se agregan documentos, nunca se modifican)
+MOVEMENTS_COLLECTION = 'stock_movements'
+CHECKPOINTS_COLLECTION = 'stock_checkpoints'
+
+# Cada cuántos movimientos de un lote se guarda su saldo; una consulta de saldo a
+# una fecha reproduce como máximo esta cantidad de movimientos
+CHECKPOINT_INTERVAL = 50
+
+# Tipos de movimiento
+RECEIPT = "receipt"
+TRANSFER_OUT = "transfer_out"
+TRANSFER_IN = "transfer_in"
+CONSUMPTION = "consumption"
+ADJUSTMENT = "adjustment"
+
+MOVEMENT_TYPES = [RECEIPT, TRANSFER_OUT, TRANSFER_IN, CONSUMPTION, ADJUSTMENT]
+
+def entry_id(stock_id, sequence):
+    """ID de documento de un movimiento o checkpoint (ordenado por secuencia dentro del lote)"""
+    return f"{stock_id}_{sequence:010d}"
+
+class StockLedgerEntries:
+    """
+    Acumula los movimientos que una escritura de stock agrega al libro.
+
+    Cada lote lleva en su documento el saldo (quantity) y el número del último
+    movimiento (ledger_sequence). record() parte de los datos del lote leídos en
+    la misma transacción, numera el movimiento y retorna los campos con los que
+    hay que actualizar el lote; write() agrega los movimientos (y los checkpoints
+    que correspondan) al mismo lote o transacción que escribe el stock, así que
+    el saldo y el libro nunca quedan desfasados y dos escrituras concurrentes no
+    se pisan (la transacción se reintenta si el lote cambió).
+
+    Uso:
+        ledger = StockLedgerEntries()
+        update_data.update(ledger.record(stock_id, stock_data, CONSUMPTION, -5))
+        transaction.update(doc_ref, update_data)
+        ledger.write(db, transaction)
+    """
+
+    def __init__(self):
+        self.movements = []
+        self.checkpoints = []
+        self._lots = {}  # stock_id -> {"sequence", "balance"}
+
+    def record(self, stock_id, stock_data, movement_type, quantity, warehouse_id=None, reference=None,
+               timestamp=None):
+        """
+        Registra un movimiento de quantity (con signo) sobre el lote. stock_data son
+        los datos del lote antes de la escritura (None para un lote nuevo). Retorna
+        {"quantity", "ledger_sequence"} con el saldo y la secuencia resultantes.
+        """
+        if movement_type not in MOVEMENT_TYPES:
+            raise ValueError(f"Tipo de movimiento desconocido: {movement_type}")
+
+        timestamp = timestamp or datetime.datetime.now()
+        state = self._lots.get(stock_id)
+        if state is None:
+            state = self._open(stock_id, stock_data, timestamp)
+
+        state["sequence"] += 1
+        state["balance"] += quantity
+
+        movement = {
+            "stock_id": stock_id,
+            "sequence": state["sequence"],
+            "type": movement_type,
+            "quantity": quantity,
+            "balance": state["balance"],
+            "warehouse_id": warehouse_id if warehouse_id is not None else (stock_data or {}).get("warehouse_id"),
+            "reference": reference,
+            "timestamp": timestamp
+        }
+        self.movements.append(movement)
+
+        if state["sequence"] % CHECKPOINT_INTERVAL == 0:
+            self._checkpoint(stock_id, state["sequence"], state["balance"], timestamp)
+
+        return {"quantity": state["balance"], "ledger_sequence": state["sequence"]}
+
+    def _open(self, stock_id, stock_data, timestamp):
+        """Estado inicial del lote; los lotes anteriores al libro abren con un checkpoint de su saldo"""
+        stock_data = stock_data or {}
+        sequence = stock_data.get("ledger_sequence")
+        balance = stock_data.get("quantity") or 0
+
+        if sequence is None:
+            sequence = 0
+            if stock_data:
+                self._checkpoint(stock_id, 0, balance, stock_data.get("created_at") or timestamp)
+
+        state = {"sequence": sequence, "balance": balance}
+        self._lots[stock_id] = state
+        return state
+
+    def _checkpoint(self, stock_id, sequence, balance, as_of):
+        self.checkpoints.append({
+            "stock_id": stock_id,
+            "sequence": sequence,
+            "balance": balance,
+            "as_of": as_of
+        })
+
+    def write(self, db, writer):
+        """Agrega los movimientos y checkpoints a writer (un WriteBatch o una Transaction)"""
+        for movement in self.movements:
+            ref = db.collection(MOVEMENTS_COLLECTION).document(entry_id(movement["stock_id"], movement["sequence"]))
+            writer.create(ref, movement)
+
+        for checkpoint in self.checkpoints:
+            ref = db.collection(CHECKPOINTS_COLLECTION).document(entry_id(checkpoint["stock_id"], checkpoint["sequence"]))
+            writer.create(ref, checkpoint)
+
+def consume_lots(db, writer, lots, quantities, reference=None, timestamp=None, collection='stock'):
+    """
+    Descuenta quantities {ID: cantidad} de los lotes, cuyos datos (lots {ID: datos},
+    None si no existe) se leyeron en la misma transacción. Valida todos los lotes
+    antes de escribir, así que si alguno no alcanza no se descuenta ninguno.
+    Escribe en writer el nuevo saldo de cada lote, los movimientos de consumo y
+    los agregados, y retorna {"success", "balances": {ID: saldo}} o {"success", "error"}.
+    """
+    timestamp = timestamp or datetime.datetime.now()
+
+    for stock_id, quantity in quantities.items():
+        stock_data = lots.get(stock_id)
+        if stock_data is None:
+            return {"success": False, "error": f"El producto con ID {stock_id} no existe"}
+
+        product_name = stock_data.get("product_name") or stock_id
+        if not isinstance(quantity, (int, float)) or quantity <= 0:
+            return {"success": False, "error": f"La cantidad de {product_name} debe ser un número mayor que cero"}
+
+        if stock_data.get("status") != "received":
+            return {"success": False, "error": f"El producto {product_name} no está recibido"}
+
+        available = stock_data.get("quantity") or 0
+        if quantity > available + QUANTITY_TOLERANCE:
+            return {"success": False, "error": f"No hay suficiente stock de {product_name} "
+                                               f"(disponible {available:g}, requerido {quantity:g})"}
+
+    ledger = StockLedgerEntries()
+    delta = StockAggregateDelta()
+    balances = {}
+    for stock_id, quantity in quantities.items():
+        stock_data = lots[stock_id]
+        update_data = {"updated_at": timestamp}
+        update_data.update(ledger.record(stock_id, stock_data, CONSUMPTION, -quantity,
+                                         reference=reference, timestamp=timestamp))
+        update_data.update(normalized_fields(update_data["quantity"], stock_data.get("unit")))
+
+        delta.remove(stock_data)
+        delta.add({**stock_data, **update_data})
+        writer.update(db.collection(collection).document(stock_id), update_data)
+        balances[stock_id] = update_data["quantity"]
+
+    delta.write(db, writer)
+    ledger.write(db, writer)
+    return {"success": True, "balances": balances}
+
+def read_movements(db, stock_id, limit=None):
+    """Lee los movimientos de un lote, del más reciente al más antiguo"""
+    query = (db.collection(MOVEMENTS_COLLECTION)
+             .where("stock_id", "==", stock_id)
+             .order_by("sequence", direction=firestore.Query.DESCENDING))
+    if limit:
+        query = query.limit(limit)
+    return [doc.to_dict() for doc in query.stream()]
+
+def balance_as_of(db, stock_id, as_of):
+    """
+    Saldo de un lote a la fecha as_of: parte del último checkpoint anterior a la
+    fecha y suma los movimientos siguientes hasta la fecha (como máximo
+    CHECKPOINT_INTERVAL, porque después viene el próximo checkpoint)
+    """
+    checkpoints = (db.collection(CHECKPOINTS_COLLECTION)
+                   .where("stock_id", "==", stock_id)
+                   .where("as_of", "<=", as_of)
+                   .order_by("as_of", direction=firestore.Query.DESCENDING)
+                   .limit(1)
+                   .stream())
+
+    sequence = 0
+    balance = 0
+    for doc in checkpoints:
+        checkpoint = doc.to_dict()
+        sequence = checkpoint.get("sequence") or 0
+        balance = checkpoint.get("balance") or 0
+
+    movements = (db.collection(MOVEMENTS_COLLECTION)
+                 .where("stock_id", "==", stock_id)
+                 .where("sequence", ">", sequence)
+                 .order_by("sequence")
+                 .limit(CHECKPOINT_INTERVAL)
+                 .stream())
+
+    until = _as_utc(as_of)
+    for doc in movements:
+        movement = doc.to_dict()
+        timestamp = _as_utc(movement.get("timestamp"))
+        if timestamp is None or timestamp > until:
+            break
+        balance += movement.get("quantity") or 0
+
+    return balance
+
+def _as_utc(value):
+    """Fecha con zona UTC para comparar (las fechas sin zona se toman como UTC, igual que Firestore)"""
+    if not isinstance(value, datetime.datetime):
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
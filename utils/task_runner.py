@@ -0,0 +1,141 @@
+# utils/task_runner.py
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Hilos para las consultas de los controladores (casi todo el tiempo es espera de red)
+DEFAULT_WORKERS = 4
+
+class Task:
+    """Tarea en segundo plano; cancel() descarta su resultado"""
+
+    def __init__(self, owner, key, on_success, on_error):
+        self.owner = owner
+        self.key = key
+        self.on_success = on_success
+        self.on_error = on_error
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class TaskRunner:
+    """
+    Ejecuta las llamadas a los controladores en un pool de hilos y entrega el
+    resultado en el hilo de Tk, para que la ventana no se congele mientras se
+    espera a Firestore.
+
+    Cada tarea pertenece a un widget (owner). Los resultados se encolan y pump()
+    los entrega con after(); se descartan si la tarea se canceló, si el widget
+    ya no existe (el usuario cambió de vista) o si es un resultado viejo: una
+    tarea nueva con el mismo owner y key reemplaza a la anterior.
+
+    Uso:
+        runner.submit(self, lambda: controller.get_all(), self.show_items, key="load")
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task")
+        self._results = queue.Queue()
+        self._tasks = set()  # Tareas pendientes de entregar
+        self._latest = {}  # (owner, key) -> última tarea enviada
+        self._lock = threading.Lock()
+
+        self.stats = {"submitted": 0, "delivered": 0, "dropped": 0}
+
+    def submit(self, owner, fn, on_success=None, on_error=None, key=None):
+        """
+        Ejecuta fn() en segundo plano y luego, en el hilo de Tk, llama a
+        on_success(resultado) u on_error(excepción). Retorna la tarea.
+        """
+        task = Task(owner, key, on_success, on_error)
+        with self._lock:
+            if key is not None:
+                previous = self._latest.get((str(owner), key))
+                if previous is not None:
+                    previous.cancel()
+                self._latest[(str(owner), key)] = task
+            self._tasks.add(task)
+            self.stats["submitted"] += 1
+
+        self._executor.submit(self._run, task, fn)
+        return task
+
+    def cancel(self, owner):
+        """Cancela las tareas del widget y de los widgets que contiene; retorna cuántas canceló"""
+        path = str(owner)
+        cancelled = 0
+        with self._lock:
+            for task in list(self._tasks):
+                task_path = str(task.owner)
+                if not task.cancelled and (task_path == path or task_path.startswith(path + ".")):
+                    task.cancel()
+                    cancelled += 1
+        return cancelled
+
+    def dispatch_pending(self):
+        """Entrega los resultados terminados (llamar desde el hilo de Tk)"""
+        while True:
+            try:
+                task, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            with self._lock:
+                self._tasks.discard(task)
+                if self._latest.get((str(task.owner), task.key)) is task:
+                    del self._latest[(str(task.owner), task.key)]
+
+            if task.cancelled or not _exists(task.owner):
+                self.stats["dropped"] += 1
+                continue
+
+            self.stats["delivered"] += 1
+            try:
+                if error is not None:
+                    if task.on_error is not None:
+                        task.on_error(error)
+                    else:
+                        print(f"Error en tarea en segundo plano: {str(error)}")
+                elif task.on_success is not None:
+                    task.on_success(result)
+            except Exception as e:
+                print(f"Error al entregar resultado de tarea: {str(e)}")
+
+    def pump(self, widget, interval_ms=50):
+        """Entrega los resultados periódicamente en el hilo de Tk mientras exista el widget"""
+        def tick():
+            if not widget.winfo_exists():
+                return
+            self.dispatch_pending()
+            widget.after(interval_ms, tick)
+
+        widget.after(interval_ms, tick)
+
+    def _run(self, task, fn):
+        if task.cancelled:
+            # Si se canceló antes de empezar no se ejecuta, pero igual se entrega para descartarla
+            self._results.put((task, None, None))
+            return
+        try:
+            result, error = fn(), None
+        except Exception as e:
+            result, error = None, e
+        self._results.put((task, result, error))
+
+def _exists(widget):
+    try:
+        return bool(widget.winfo_exists())
+    except Exception:
+        return False
+
+_runner = None
+_runner_lock = threading.Lock()
+
+def get_task_runner():
+    """Retorna el ejecutor de tareas compartido, creándolo la primera vez"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = TaskRunner()
+        return _runner
@@ -0,0 +1,89 @@
+# utils/units.py
+import unicodedata
+
+# Unidad base de cada dimensión
+BASE_UNITS = {
+    "mass": "kg",
+    "volume": "l",
+    "count": "unidad"
+}
+
+# Unidades conocidas: unidad -> (dimensión, factor para pasar a la unidad base)
+UNITS = {
+    "kg": ("mass", 1.0),
+    "g": ("mass", 0.001),
+    "mg": ("mass", 0.000001),
+    "ton": ("mass", 1000.0),
+    "lb": ("mass", 0.45359237),
+    "oz": ("mass", 0.028349523125),
+    "l": ("volume", 1.0),
+    "ml": ("volume", 0.001),
+    "m3": ("volume", 1000.0),
+    "gal": ("volume", 3.785411784),
+    "unidad": ("count", 1.0)
+}
+
+# Otras formas de escribir las unidades conocidas
+ALIASES = {
+    "kgs": "kg", "kilo": "kg", "kilos": "kg", "kilogramo": "kg", "kilogramos": "kg",
+    "gr": "g", "grs": "g", "gramo": "g", "gramos": "g",
+    "miligramo": "mg", "miligramos": "mg",
+    "t": "ton", "tn": "ton", "tonelada": "ton", "toneladas": "ton",
+    "lbs": "lb", "libra": "lb", "libras": "lb",
+    "onza": "oz", "onzas": "oz",
+    "lt": "l", "lts": "l", "litro": "l", "litros": "l",
+    "cc": "ml", "mililitro": "ml", "mililitros": "ml",
+    "galon": "gal", "galones": "gal",
+    "u": "unidad", "un": "unidad", "unidades": "unidad"
+}
+
+def canonical_unit(unit):
+    """
+    Nombre normalizado de la unidad ("Kilos" -> "kg"). Las unidades desconocidas
+    (por ejemplo "paquete") se retornan en minúsculas y sin acentos.
+    """
+    text = unicodedata.normalize("NFKD", str(unit or "")).strip().lower()
+    text = "".join(c for c in text if not unicodedata.combining(c)).rstrip(".")
+    return ALIASES.get(text, text)
+
+def unit_info(unit):
+    """
+    Retorna (unidad base, factor) de la unidad. Una unidad desconocida es su
+    propia unidad base, así que solo se suma con lotes de la misma unidad.
+    """
+    unit = canonical_unit(unit)
+    known = UNITS.get(unit)
+    if known is None:
+        return unit, 1.0
+    dimension, factor = known
+    return BASE_UNITS[dimension], factor
+
+def normalized_fields(quantity, unit):
+    """Campos con la cantidad normalizada que se guardan en cada lote de stock"""
+    base_unit, factor = unit_info(unit)
+    return {"base_quantity": (quantity or 0) * factor, "base_unit": base_unit}
+
+def base_quantity(stock_data):
+    """
+    Retorna (cantidad, unidad base) de un lote, usando los campos normalizados
+    guardados o calculándolos si el lote es anterior a ellos
+    """
+    if stock_data.get("base_unit") is not None and stock_data.get("base_quantity") is not None:
+        return stock_data["base_quantity"], stock_data["base_unit"]
+    fields = normalized_fields(stock_data.get("quantity"), stock_data.get("unit"))
+    return fields["base_quantity"], fields["base_unit"]
+
+def conversion_factor(from_unit, to_unit):
+    """Factor para pasar de from_unit a to_unit, o None si miden cosas distintas"""
+    from_base, from_factor = unit_info(from_unit)
+    to_base, to_factor = unit_info(to_unit)
+    if from_base != to_base:
+        return None
+    return from_factor / to_factor
+
+def convert(quantity, from_unit, to_unit):
+    """Convierte una cantidad entre unidades; retorna None si no son compatibles"""
+    factor = conversion_factor(from_unit, to_unit)
+    if factor is None:
+        return None
+    return (quantity or 0) * factor
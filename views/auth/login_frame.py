@@ -2,6 +2,7 @@
 import customtkinter as ctk
 from PIL import Image, ImageTk
 import os
+from utils.task_runner import get_task_runner
 
 class LoginFrame(ctk.CTkFrame):
     def __init__(self, master, auth_controller, on_login_success):
@@ -68,9 +69,25 @@ class LoginFrame(ctk.CTkFrame):
             self.error_label.configure(text="Por favor, complete todos los campos")
             return
         
-        result = self.auth_controller.login(username, password)
+        # Validar credenciales en segundo plano, sin congelar la ventana
+        self.login_button.configure(state="disabled", text="Iniciando sesión...")
+        self.error_label.configure(text="")
+        get_task_runner().submit(
+            self,
+            lambda: self.auth_controller.login(username, password),
+            self.on_login_result,
+            self.on_login_error,
+            key="login"
+        )
+    
+    def on_login_result(self, result):
+        self.login_button.configure(state="normal", text="Iniciar Sesión")
         if result["success"]:
             self.error_label.configure(text="")
             self.on_login_success()
         else:
-            self.error_label.configure(text=result.get("error", "Credenciales incorrectas"))
\ No newline at end of file
+            self.error_label.configure(text=result.get("error", "Credenciales incorrectas"))
+    
+    def on_login_error(self, error):
+        self.login_button.configure(state="normal", text="Iniciar Sesión")
+        self.error_label.configure(text=f"Error al iniciar sesión: {str(error)}")
\ No newline at end of file
@@ -0,0 +1,30 @@
+# views/background_action.py
+from utils.task_runner import get_task_runner
+
+def submit_action(dialog, fn, on_success, button=None, error_label=None, error_text="Error al guardar"):
+    """
+    Ejecuta en segundo plano la escritura de un diálogo (fn() llama al controlador y
+    retorna {"success", "error"}) para que la ventana no se congele mientras
+    responde Firestore. El botón queda deshabilitado hasta que llega el resultado;
+    entonces, en el hilo de Tk, se llama a on_success(result) o se muestra el error
+    en error_label y se vuelve a habilitar el botón. Si el diálogo se cierra antes,
+    el resultado se descarta (la vista igual se actualiza con la réplica).
+    """
+    if button is not None:
+        button.configure(state="disabled")
+
+    def show_error(message):
+        if button is not None:
+            button.configure(state="normal")
+        if error_label is not None:
+            error_label.configure(text=message)
+        else:
+            print(f"Error en operación en segundo plano: {message}")
+
+    def on_result(result):
+        if result.get("success"):
+            on_success(result)
+        else:
+            show_error(result.get("error", error_text))
+
+    return get_task_runner().submit(dialog, fn, on_result, lambda error: show_error(f"{error_text}: {str(error)}"))
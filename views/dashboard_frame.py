@@ -1,6 +1,8 @@
 # views/dashboard_frame.py
 import customtkinter as ctk
 from datetime import datetime
+from utils.task_runner import get_task_runner
+from views.frame_manager import FrameManager
 
 class DashboardFrame(ctk.CTkFrame):
     def __init__(self, master, auth_controller, on_logout):
@@ -12,8 +14,12 @@ class DashboardFrame(ctk.CTkFrame):
         # Crear layout de la aplicación
         self.create_layout()
         
-        # Mostrar panel principal por defecto
+        # Vistas de módulo: se construyen una vez y luego solo se ocultan al cambiar de pestaña
+        self.frames = FrameManager(self.content_frame)
+        self.register_modules()
         
+        # Mostrar panel principal por defecto
+        self.show_main_dashboard()
     
     def create_layout(self):
         # Configurar grid
@@ -45,50 +51,24 @@ class DashboardFrame(ctk.CTkFrame):
         # Obtener información del usuario actual
         user = self.auth_controller.get_current_user()
         if user:
-            try:
-                # Obtener el ID del usuario, con fallback
-                user_id = user.get('id')
-                
-                # Si no hay ID del usuario, usamos un valor por defecto
-                if not user_id:
-                    self.user_name_label = ctk.CTkLabel(
-                        self.user_frame, 
-                        text="Usuario",
-                        font=ctk.CTkFont(size=14)
-                    )
-                    self.user_name_label.pack(side="left", padx=(0, 10))
-                else:
-                    # Obtener datos del usuario
-                    user_doc = self.auth_controller.db.collection('users').document(user_id).get()
-                    
-                    if user_doc.exists:
-                        user_data = user_doc.to_dict()
-                        user_name = user_data.get('username', 'Usuario')
-                        user_role = user_data.get('role', 'básico')
-                        
-                        self.user_name_label = ctk.CTkLabel(
-                            self.user_frame, 
-                            text=f"{user_name} ({user_role})",
-                            font=ctk.CTkFont(size=14)
-                        )
-                        self.user_name_label.pack(side="left", padx=(0, 10))
-                    else:
-                        # Si no existe el documento
-                        self.user_name_label = ctk.CTkLabel(
-                            self.user_frame, 
-                            text="Usuario",
-                            font=ctk.CTkFont(size=14)
-                        )
-                        self.user_name_label.pack(side="left", padx=(0, 10))
-            except Exception as e:
-                print(f"Error al obtener datos del usuario: {str(e)}")
-                # Fallback en caso de error
-                self.user_name_label = ctk.CTkLabel(
-                    self.user_frame, 
-                    text="Usuario",
-                    font=ctk.CTkFont(size=14)
+            # Etiqueta genérica hasta obtener los datos del usuario
+            self.user_name_label = ctk.CTkLabel(
+                self.user_frame, 
+                text="Usuario",
+                font=ctk.CTkFont(size=14)
+            )
+            self.user_name_label.pack(side="left", padx=(0, 10))
+            
+            # Obtener el ID del usuario, con fallback
+            user_id = user.get('id')
+            if user_id:
+                # Obtener datos del usuario en segundo plano
+                get_task_runner().submit(
+                    self,
+                    lambda: self.auth_controller.db.collection('users').document(user_id).get(),
+                    self.show_user_name,
+                    lambda e: print(f"Error al obtener datos del usuario: {str(e)}")
                 )
-                self.user_name_label.pack(side="left", padx=(0, 10))
         else:
             # Si no hay usuario, mostrar etiqueta genérica
             self.user_name_label = ctk.CTkLabel(
@@ -154,95 +134,90 @@ class DashboardFrame(ctk.CTkFrame):
         self.content_frame = ctk.CTkFrame(self)
         self.content_frame.grid(row=1, column=1, padx=20, pady=20, sticky="nsew")
     
+    def register_modules(self):
+        """Registra las vistas de módulo a las que el usuario tiene acceso"""
+        current_user = self.auth_controller.get_current_user() or {}
+        role = current_user.get('role')
+        
+        def build_main(parent):
+            from views.main_panel import MainPanelFrame
+            return MainPanelFrame(parent, self.auth_controller)
+        
+        def build_fields(parent):
+            from views.field_frames import FieldManagementFrame
+            return FieldManagementFrame(parent, self.auth_controller)
+        
+        def build_warehouses(parent):
+            from views.warehouse_frames import WarehouseManagementFrame
+            return WarehouseManagementFrame(parent, self.auth_controller)
+        
+        def build_stock(parent):
+            from views.stock_frames import StockManagementFrame
+            return StockManagementFrame(parent, self.auth_controller)
+        
+        def build_fumigation(parent):
+            from views.fumigation_frames import FumigationManagementFrame
+            return FumigationManagementFrame(parent, self.auth_controller)
+        
+        def build_users(parent):
+            from views.user_management_frames import UserManagementFrame
+            return UserManagementFrame(parent, self.auth_controller)
+        
+        def build_fumigator(parent):
+            from views.fumigator_view import FumigatorDashboardView
+            return FumigatorDashboardView(parent, self.auth_controller)
+        
+        # Se registran en el orden del menú (se usa para preconstruir la siguiente pestaña)
+        if role == 'fumigator':
+            self.frames.register("fumigator", build_fumigator)
+        else:
+            self.frames.register("main", build_main)
+        self.frames.register("fields", build_fields)
+        self.frames.register("warehouses", build_warehouses)
+        if self.auth_controller.has_permission("manage_stock"):
+            self.frames.register("stock", build_stock)
+        if role != 'fumigator':
+            self.frames.register("fumigation", build_fumigation)
+        if self.can_manage_users():
+            self.frames.register("users", build_users)
+    
+    def can_manage_users(self):
+        """Indica si el usuario puede ver la gestión de usuarios"""
+        # Verificar si tiene permiso para ver la gestión de usuarios
+        has_user_permissions = (
+            self.auth_controller.has_permission("manage_users") or 
+            self.auth_controller.has_permission("create_user")
+        )
+        
+        # También permitir acceso a roles específicos incluso sin permisos
+        current_user = self.auth_controller.get_current_user() or {}
+        is_admin = current_user.get('role') == 'admin'
+        is_manager = current_user.get('role') == 'manager'
+        
+        return has_user_permissions or is_admin or is_manager
+    
+    def show_user_name(self, user_doc):
+        """Muestra el nombre y rol del usuario actual en la barra superior"""
+        if user_doc.exists:
+            user_data = user_doc.to_dict()
+            user_name = user_data.get('username', 'Usuario')
+            user_role = user_data.get('role', 'básico')
+            self.user_name_label.configure(text=f"{user_name} ({user_role})")
+    
     def show_main_dashboard(self):
         try:
-            # Limpiar contenido actual
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
+            # Ocultar la vista actual y limpiar el resto del contenido
+            self.frames.clear()
 
             # Verificar si el usuario es fumigador
             current_user = self.auth_controller.get_current_user()
             if current_user and current_user.get('role') == 'fumigator':
                 self.show_fumigator_dashboard()
                 return
-
-        
-            # Configurar grid del contenido
-            self.content_frame.grid_columnconfigure((0, 1, 2), weight=1)
-        except Exception as e:
-            print(f"Error en show_main_dashboard: {str(e)}")
-    
-    def show_fumigator_dashboard(self):
-        try:
-            # Limpiar contenido actual
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-
-            # Crear y mostrar la vista de fumigador
-            from views.fumigator_view import FumigatorDashboardView
-            fumigator_frame = FumigatorDashboardView(self.content_frame, self.auth_controller)
-            fumigator_frame.pack(fill="both", expand=True)
-        except Exception as e:
-            print(f"Error al mostrar panel de fumigador: {str(e)}")
-            error_label = ctk.CTkLabel(
-                self.content_frame,
-                text=f"Error al cargar el panel de fumigador: {str(e)}",
-                text_color="red"
-            )
-            error_label.pack(pady=50)
-            self.content_frame.grid_rowconfigure(0, weight=0)
-            self.content_frame.grid_rowconfigure(1, weight=0)
-            self.content_frame.grid_rowconfigure(2, weight=1)
-            
-            # Título
-            title_label = ctk.CTkLabel(
-                self.content_frame,
-                text="Panel Principal",
-                font=ctk.CTkFont(size=20, weight="bold")
-            )
-            title_label.grid(row=0, column=0, columnspan=3, padx=20, pady=20, sticky="w")
-            
-            # Tarjetas de resumen
-            self.create_summary_card(0, 0, "Campos Registrados", "0", "green")
-            self.create_summary_card(0, 1, "Almacenes", "0", "blue")
-            self.create_summary_card(0, 2, "Productos en Stock", "0", "purple")
-            
-            # Gráfico o informe reciente
-            chart_frame = ctk.CTkFrame(self.content_frame)
-            chart_frame.grid(row=2, column=0, columnspan=2, padx=10, pady=10, sticky="nsew")
-            
-            chart_title = ctk.CTkLabel(
-                chart_frame,
-                text="Actividad Reciente",
-                font=ctk.CTkFont(size=16, weight="bold")
-            )
-            chart_title.pack(anchor="w", padx=15, pady=15)
-            
-            # Placeholder para gráfico (a implementar con matplotlib)
-            chart_placeholder = ctk.CTkLabel(
-                chart_frame,
-                text="Aquí irá un gráfico de actividad",
-                font=ctk.CTkFont(size=14)
-            )
-            chart_placeholder.pack(expand=True)
-            
-            # Panel de alertas o notificaciones
-            alerts_frame = ctk.CTkFrame(self.content_frame)
-            alerts_frame.grid(row=2, column=2, padx=10, pady=10, sticky="nsew")
             
-            alerts_title = ctk.CTkLabel(
-                alerts_frame,
-                text="Alertas",
-                font=ctk.CTkFont(size=16, weight="bold")
-            )
-            alerts_title.pack(anchor="w", padx=15, pady=15)
-            
-            # Ejemplo de alertas
-            self.create_alert(alerts_frame, "Bienvenido al sistema", "low")
-            self.create_alert(alerts_frame, "Configure sus campos y almacenes", "medium")
-            self.create_alert(alerts_frame, "Para ayuda contacte al administrador", "high")
+            # Mostrar el panel con los contadores (se construye solo la primera vez)
+            self.frames.show("main")
         except Exception as e:
-            # Manejo de errores
             print(f"Error en show_main_dashboard: {str(e)}")
             error_label = ctk.CTkLabel(
                 self.content_frame,
@@ -251,75 +226,23 @@ class DashboardFrame(ctk.CTkFrame):
             )
             error_label.pack(pady=50)
     
-    def create_summary_card(self, row, column, title, value, color):
+    def show_fumigator_dashboard(self):
         try:
-            # Colores según el tema
-            colors = {
-                "green": ("#E5F5E5", "#1F5B1F"),
-                "blue": ("#E5F0FF", "#1F3D7A"),
-                "purple": ("#F0E5FF", "#5F1F7A"),
-                "orange": ("#FFF2E5", "#7A4B1F")
-            }
-            
-            # Crear tarjeta
-            card = ctk.CTkFrame(self.content_frame)
-            card.grid(row=row+1, column=column, padx=10, pady=10, sticky="nsew")
-            
-            # Título de la tarjeta
-            card_title = ctk.CTkLabel(
-                card,
-                text=title,
-                font=ctk.CTkFont(size=14)
-            )
-            card_title.pack(anchor="w", padx=15, pady=(15, 5))
-            
-            # Valor
-            card_value = ctk.CTkLabel(
-                card,
-                text=value,
-                font=ctk.CTkFont(size=28, weight="bold")
-            )
-            card_value.pack(anchor="w", padx=15, pady=(5, 15))
+            # Mostrar la vista de fumigador (se construye solo la primera vez)
+            self.frames.show("fumigator")
         except Exception as e:
-            print(f"Error en create_summary_card: {str(e)}")
-    
-    def create_alert(self, parent, message, priority):
-        try:
-            # Colores según prioridad
-            colors = {
-                "high": "#FF5252",
-                "medium": "#FFB74D",
-                "low": "#4CAF50"
-            }
-            
-            alert_frame = ctk.CTkFrame(parent)
-            alert_frame.pack(fill="x", padx=15, pady=5)
-            
-            # Indicador de prioridad
-            priority_indicator = ctk.CTkFrame(alert_frame, width=5, fg_color=colors[priority])
-            priority_indicator.pack(side="left", fill="y")
-            
-            # Mensaje
-            alert_message = ctk.CTkLabel(
-                alert_frame,
-                text=message,
-                font=ctk.CTkFont(size=12),
-                anchor="w"
+            print(f"Error al mostrar panel de fumigador: {str(e)}")
+            error_label = ctk.CTkLabel(
+                self.content_frame,
+                text=f"Error al cargar el panel de fumigador: {str(e)}",
+                text_color="red"
             )
-            alert_message.pack(side="left", padx=10, pady=10, fill="x", expand=True)
-        except Exception as e:
-            print(f"Error en create_alert: {str(e)}")
+            error_label.pack(pady=50)
     
     def show_fields(self):
         try:
-            # Limpiar contenido actual
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-            
-            # Crear y mostrar la vista de campos
-            from views.field_frames import FieldManagementFrame
-            fields_frame = FieldManagementFrame(self.content_frame, self.auth_controller)
-            fields_frame.pack(fill="both", expand=True)
+            # Mostrar la vista de campos (se construye solo la primera vez)
+            self.frames.show("fields")
         except Exception as e:
             print(f"Error al mostrar campos: {str(e)}")
             error_label = ctk.CTkLabel(
@@ -331,14 +254,8 @@ class DashboardFrame(ctk.CTkFrame):
     
     def show_warehouses(self):
         try:
-            # Limpiar contenido actual
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-            
-            # Crear y mostrar la vista de almacenes
-            from views.warehouse_frames import WarehouseManagementFrame
-            warehouses_frame = WarehouseManagementFrame(self.content_frame, self.auth_controller)
-            warehouses_frame.pack(fill="both", expand=True)
+            # Mostrar la vista de almacenes (se construye solo la primera vez)
+            self.frames.show("warehouses")
         except Exception as e:
             print(f"Error al mostrar almacenes: {str(e)}")
             error_label = ctk.CTkLabel(
@@ -350,19 +267,13 @@ class DashboardFrame(ctk.CTkFrame):
     
     def show_stock(self):
         try:
-            # Limpiar contenido actual
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-            
             # Verificar si tiene permiso para gestionar inventario
             if not self.auth_controller.has_permission("manage_stock"):
                 self.show_placeholder("Gestión de Inventario")
                 return
             
-            # Crear y mostrar la vista de inventario
-            from views.stock_frames import StockManagementFrame
-            stock_frame = StockManagementFrame(self.content_frame, self.auth_controller)
-            stock_frame.pack(fill="both", expand=True)
+            # Mostrar la vista de inventario (se construye solo la primera vez)
+            self.frames.show("stock")
         except Exception as e:
             print(f"Error al mostrar inventario: {str(e)}")
             error_label = ctk.CTkLabel(
@@ -382,14 +293,8 @@ class DashboardFrame(ctk.CTkFrame):
                 return
             
             # Para otros usuarios, mostrar la vista normal de fumigación
-            # Limpiar contenido actual
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-        
-            # Crear y mostrar la vista de fumigación
-            from views.fumigation_frames import FumigationManagementFrame
-            fumigation_frame = FumigationManagementFrame(self.content_frame, self.auth_controller)
-            fumigation_frame.pack(fill="both", expand=True)
+            # (se construye solo la primera vez)
+            self.frames.show("fumigation")
         except Exception as e:
             print(f"Error al mostrar fumigaciones: {str(e)}")
             error_label = ctk.CTkLabel(
@@ -406,26 +311,9 @@ class DashboardFrame(ctk.CTkFrame):
     
     def show_users(self):
         try:
-            # Limpiar contenido actual
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-        
-            # Verificar si tiene permiso para ver la gestión de usuarios
-            has_user_permissions = (
-                self.auth_controller.has_permission("manage_users") or 
-                self.auth_controller.has_permission("create_user")
-            )
-        
-            # También permitir acceso a roles específicos incluso sin permisos
-            current_user = self.auth_controller.get_current_user() or {}
-            is_admin = current_user.get('role') == 'admin'
-            is_manager = current_user.get('role') == 'manager'
-        
-            if has_user_permissions or is_admin or is_manager:
-                # Crear y mostrar la vista de usuarios
-                from views.user_management_frames import UserManagementFrame
-                users_frame = UserManagementFrame(self.content_frame, self.auth_controller)
-                users_frame.pack(fill="both", expand=True)
+            if self.can_manage_users():
+                # Mostrar la vista de usuarios (se construye solo la primera vez)
+                self.frames.show("users")
             else:
                 # Mostrar mensaje si no tiene permiso
                 self.show_placeholder("Gestión de Usuarios - Acceso Restringido")
@@ -444,9 +332,8 @@ class DashboardFrame(ctk.CTkFrame):
     
     def show_placeholder(self, title):
         try:
-            # Limpiar contenido actual
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
+            # Ocultar la vista actual y limpiar el resto del contenido
+            self.frames.clear()
             
             # Mostrar título
             title_label = ctk.CTkLabel(
@@ -3,6 +3,12 @@ import customtkinter as ctk
 from datetime import datetime
 from controllers.field_controller import FieldController
 from models.field import Field
+from views.background_action import submit_action
+from views.paged_loader import PagedLoader
+from views.virtual_table import VirtualTable
+from utils.replica_store import get_replica_store
+from utils.search_index import SearchIndex, SEARCH_DELAY_MS
+from utils.task_runner import get_task_runner
 
 class FieldManagementFrame(ctk.CTkFrame):
     def __init__(self, master, auth_controller):
@@ -14,6 +20,12 @@ class FieldManagementFrame(ctk.CTkFrame):
         # Lista de campos
         self.fields = []
         
+        # Índice de búsqueda sobre todos los campos; se reconstruye solo cuando cambian los datos
+        self.search_index = SearchIndex(lambda field: [field.name, field.location, field.crop_type])
+        self.search_index_stale = True
+        self.pages_stale = False  # Hubo cambios mientras se mostraba una búsqueda
+        self.search_job = None
+        
         # Valores predefinidos para los selectores
         self.status_options = ["Activo", "En descanso", "En preparación", "Cosechado"]
         self.risk_levels = ["Bajo", "Medio", "Alto", "Crítico"]
@@ -21,8 +33,62 @@ class FieldManagementFrame(ctk.CTkFrame):
         # Crear interfaz
         self.create_interface()
         
+        # Carga por páginas a medida que se hace scroll
+        self.field_loader = PagedLoader(
+            self.field_table,
+            lambda cursor: self.field_controller.get_page(cursor=cursor),
+            self.display_fields
+        )
+        
         # Cargar datos
         self.load_fields()
+        
+        # Recargar cuando cambien los datos replicados (por ejemplo, ediciones de otros usuarios)
+        self.unsubscribe_changes = get_replica_store().subscribe(["fields"], self.on_data_changed)
+    
+    def on_data_changed(self, event):
+        """Recarga la tabla (o la búsqueda activa) con los datos actualizados de la réplica"""
+        self.search_index_stale = True
+        if self.field_loader.paused and self.search_var.get().strip():
+            self.pages_stale = True
+            self.search_fields()
+            return
+        
+        # Las modificaciones y bajas se aplican fila por fila; las altas requieren recargar
+        replica = get_replica_store()
+        if event["added"] or not replica.is_synced("fields"):
+            self.load_fields()
+            return
+        
+        changed = []
+        for field_id in event["modified"]:
+            data = replica.get("fields", field_id)
+            if data is not None:
+                changed.append(Field.from_dict(field_id, data))
+        self.patch_rows(changed, event["removed"])
+    
+    def destroy(self):
+        # Dejar de recibir cambios de la réplica y descartar las cargas pendientes al cerrar la vista
+        self.unsubscribe_changes()
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        get_task_runner().cancel(self)
+        super().destroy()
+    
+    def on_hide(self):
+        # La búsqueda pendiente se retoma en reload() al volver a mostrar la vista
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+            self.search_job = None
+    
+    def reload(self):
+        """Vuelve a pedir lo que se canceló al ocultar la vista (páginas o índice de búsqueda)"""
+        self.search_index_stale = True
+        if self.search_var.get().strip():
+            self.pages_stale = True
+            self.search_fields()
+        else:
+            self.load_fields()
     
     def create_interface(self):
         # Configurar grid
@@ -70,6 +136,9 @@ class FieldManagementFrame(ctk.CTkFrame):
         )
         self.search_entry.pack(side="right")
         
+        # Buscar mientras se escribe, cuando se deja de teclear
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+        
         # Botón de búsqueda
         self.search_button = ctk.CTkButton(
             self.controls_frame,
@@ -87,223 +156,119 @@ class FieldManagementFrame(ctk.CTkFrame):
         self.table_container.grid_columnconfigure(0, weight=1)
         self.table_container.grid_rowconfigure(0, weight=1)
         
-        # Crear scrollbar
-        self.scrollable_frame = ctk.CTkScrollableFrame(self.table_container)
-        self.scrollable_frame.grid(row=0, column=0, sticky="nsew")
-        
-        # Configurar grid del scrollable frame
-        self.scrollable_frame.grid_columnconfigure((0, 1, 2, 3, 4, 5), weight=1)
-        self.scrollable_frame.grid_columnconfigure(6, weight=0)
-        
-        # Cabecera de la tabla
-        headers = ["Nombre", "Ubicación", "Tamaño", "Cultivo", "Estado", "Nivel de Riesgo", "Acciones"]
-        for i, header in enumerate(headers):
-            label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text=header,
-                font=ctk.CTkFont(weight="bold")
-            )
-            label.grid(row=0, column=i, padx=10, pady=10, sticky="w")
-        
-        # Separador
-        separator = ctk.CTkFrame(self.scrollable_frame, height=1, fg_color="gray")
-        separator.grid(row=1, column=0, columnspan=7, sticky="ew", padx=5)
+        # Tabla virtualizada: solo se crean las filas visibles
+        risk_colors = {
+            "Bajo": "#4CAF50",
+            "Medio": "#FFC107",
+            "Alto": "#FF5722",
+            "Crítico": "#F44336"
+        }
+        risk_order = {level: i for i, level in enumerate(self.risk_levels)}
+        columns = [
+            {"header": "Nombre", "text": lambda field: field.name},
+            {"header": "Ubicación", "text": lambda field: field.location},
+            {"header": "Tamaño", "text": lambda field: field.size or ""},
+            {"header": "Cultivo", "text": lambda field: field.crop_type},
+            {"header": "Estado", "text": lambda field: field.status},
+            {"header": "Nivel de Riesgo",
+             "text": lambda field: field.risk_level or "Bajo",
+             "sort": lambda field: risk_order.get(field.risk_level or "Bajo", 0),
+             "color": lambda field: risk_colors.get(field.risk_level or "Bajo", "#4CAF50")}
+        ]
+        actions = [
+            {"text": "Editar", "command": lambda field: self.show_edit_field(field.id)},
+            {"text": "Eliminar", "fg_color": "#FF5252", "command": lambda field: self.confirm_delete(field.id)}
+        ]
+        self.field_table = VirtualTable(self.table_container, columns, actions)
+        self.field_table.grid(row=0, column=0, sticky="nsew")
     
     def load_fields(self):
-        # Limpiar tabla existente (excepto cabecera y separador)
-        for widget in self.scrollable_frame.winfo_children():
-            if widget.grid_info()["row"] > 1:  # Solo eliminar filas de datos
-                widget.destroy()
-        
-        # Obtener campos
-        self.fields = self.field_controller.get_all()
-        
-        if not self.fields:
-            # Mostrar mensaje si no hay campos
-            no_data_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text="No hay campos registrados",
-                font=ctk.CTkFont(size=14)
-            )
-            no_data_label.grid(row=2, column=0, columnspan=7, padx=10, pady=20)
-            return
-        
-        # Mostrar campos en la tabla
-        for i, field in enumerate(self.fields):
-            row = i + 2  # +2 porque la fila 0 es la cabecera y la 1 es el separador
-            
-            # Nombre
-            name_label = ctk.CTkLabel(self.scrollable_frame, text=field.name or "")
-            name_label.grid(row=row, column=0, padx=10, pady=5, sticky="w")
-            
-            # Ubicación
-            location_label = ctk.CTkLabel(self.scrollable_frame, text=field.location or "")
-            location_label.grid(row=row, column=1, padx=10, pady=5, sticky="w")
-            
-            # Tamaño
-            size_label = ctk.CTkLabel(self.scrollable_frame, text=str(field.size or ""))
-            size_label.grid(row=row, column=2, padx=10, pady=5, sticky="w")
-            
-            # Cultivo
-            crop_label = ctk.CTkLabel(self.scrollable_frame, text=field.crop_type or "")
-            crop_label.grid(row=row, column=3, padx=10, pady=5, sticky="w")
-            
-            # Estado
-            status_label = ctk.CTkLabel(self.scrollable_frame, text=field.status or "")
-            status_label.grid(row=row, column=4, padx=10, pady=5, sticky="w")
-            
-            # Nivel de riesgo con color
-            risk_text = field.risk_level or "Bajo"
-            risk_colors = {
-                "Bajo": "#4CAF50",
-                "Medio": "#FFC107",
-                "Alto": "#FF5722",
-                "Crítico": "#F44336"
-            }
-            risk_color = risk_colors.get(risk_text, "#4CAF50")
-            
-            risk_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            risk_frame.grid(row=row, column=5, padx=10, pady=5, sticky="w")
-            
-            risk_indicator = ctk.CTkFrame(risk_frame, width=15, height=15, fg_color=risk_color, corner_radius=7)
-            risk_indicator.pack(side="left", padx=(0, 5))
-            
-            risk_label = ctk.CTkLabel(risk_frame, text=risk_text)
-            risk_label.pack(side="left")
-            
-            # Frame para botones de acción
-            action_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            action_frame.grid(row=row, column=6, padx=10, pady=5)
-            
-            # Botón editar
-            edit_button = ctk.CTkButton(
-                action_frame,
-                text="Editar",
-                width=70,
-                height=25,
-                command=lambda fid=field.id: self.show_edit_field(fid)
-            )
-            edit_button.pack(side="left", padx=(0, 5))
-            
-            # Botón eliminar
-            delete_button = ctk.CTkButton(
-                action_frame,
-                text="Eliminar",
-                width=70,
-                height=25,
-                fg_color="#FF5252",
-                command=lambda fid=field.id: self.confirm_delete(fid)
-            )
-            delete_button.pack(side="left")
-            
-            # Agregar un separador después de cada fila
-            if i < len(self.fields) - 1:
-                row_separator = ctk.CTkFrame(self.scrollable_frame, height=1, fg_color="gray70")
-                row_separator.grid(row=row+1, column=0, columnspan=7, sticky="ew", padx=20)
+        # Obtener la primera página de campos; las siguientes se cargan al hacer scroll.
+        # Las filas actuales se mantienen hasta que llega la página y se concilian con ella
+        self.search_index_stale = True
+        self.pages_stale = False
+        self.field_loader.reset()
+        self.fields = self.field_loader.items
+    
+    def display_fields(self, fields, start_index=0):
+        """Muestra los campos de una página recién cargada"""
+        if start_index == 0:
+            # Primera página: actualizar solo las filas que cambiaron
+            self.field_table.update_items(fields, empty_text="No hay campos registrados")
+        else:
+            self.field_table.append_items(fields)
+    
+    def refresh_rows(self, field_ids):
+        """Vuelve a leer en segundo plano los campos indicados y actualiza solo sus filas"""
+        get_task_runner().submit(
+            self,
+            lambda: [self.field_controller.get_by_id(field_id) for field_id in field_ids],
+            lambda fields: self.patch_rows([field for field in fields if field])
+        )
+    
+    def patch_rows(self, changed, removed=()):
+        """Actualiza las filas de los campos cambiados; recarga si alguno no estaba en la tabla"""
+        self.search_index_stale = True
+        if self.field_loader.paused:
+            # La tabla muestra una búsqueda: las páginas cargadas quedaron desactualizadas
+            self.pages_stale = True
+        if not self.field_table.patch(changed, removed):
+            self.load_fields()
+    
+    def schedule_search(self, event=None):
+        """Busca cuando se deja de escribir, en lugar de en cada tecla"""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(SEARCH_DELAY_MS, self.search_fields)
     
     def search_fields(self):
-        search_text = self.search_var.get().lower().strip()
+        self.search_job = None
+        search_text = self.search_var.get().strip()
         
-        # Si no hay texto de búsqueda, mostrar todos
+        # Sin texto de búsqueda se vuelve a las páginas ya cargadas, sin consultar la base de datos
         if not search_text:
-            self.load_fields()
+            if self.field_loader.paused:
+                if self.pages_stale:
+                    self.load_fields()
+                    return
+                self.field_loader.paused = False
+                self.field_table.update_items(self.field_loader.items, empty_text="No hay campos registrados")
             return
         
-        # Filtrar campos
-        filtered_fields = [
-            field for field in self.fields 
-            if (search_text in (field.name or "").lower() or 
-                search_text in (field.location or "").lower() or
-                search_text in (field.crop_type or "").lower())
-        ]
-        
-        # Limpiar tabla existente (excepto cabecera y separador)
-        for widget in self.scrollable_frame.winfo_children():
-            if widget.grid_info()["row"] > 1:  # Solo eliminar filas de datos
-                widget.destroy()
-        
-        if not filtered_fields:
-            # Mostrar mensaje si no hay resultados
-            no_data_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text=f"No se encontraron campos con '{search_text}'",
-                font=ctk.CTkFont(size=14)
+        # Mientras se muestran resultados de búsqueda no se cargan más páginas
+        self.field_loader.paused = True
+        
+        if self.search_index_stale:
+            # Indexar todos los campos, no solo las páginas cargadas, y luego buscar
+            self.field_table.set_loading(True)
+            get_task_runner().submit(
+                self,
+                self.field_controller.get_all,
+                self.on_search_index_loaded,
+                key="search"
             )
-            no_data_label.grid(row=2, column=0, columnspan=7, padx=10, pady=20)
             return
         
-        # Mostrar campos filtrados
-        for i, field in enumerate(filtered_fields):
-            row = i + 2  # +2 porque la fila 0 es la cabecera y la 1 es el separador
-            
-            # Nombre
-            name_label = ctk.CTkLabel(self.scrollable_frame, text=field.name or "")
-            name_label.grid(row=row, column=0, padx=10, pady=5, sticky="w")
-            
-            # Ubicación
-            location_label = ctk.CTkLabel(self.scrollable_frame, text=field.location or "")
-            location_label.grid(row=row, column=1, padx=10, pady=5, sticky="w")
-            
-            # Tamaño
-            size_label = ctk.CTkLabel(self.scrollable_frame, text=str(field.size or ""))
-            size_label.grid(row=row, column=2, padx=10, pady=5, sticky="w")
-            
-            # Cultivo
-            crop_label = ctk.CTkLabel(self.scrollable_frame, text=field.crop_type or "")
-            crop_label.grid(row=row, column=3, padx=10, pady=5, sticky="w")
-            
-            # Estado
-            status_label = ctk.CTkLabel(self.scrollable_frame, text=field.status or "")
-            status_label.grid(row=row, column=4, padx=10, pady=5, sticky="w")
-            
-            # Nivel de riesgo con color
-            risk_text = field.risk_level or "Bajo"
-            risk_colors = {
-                "Bajo": "#4CAF50",
-                "Medio": "#FFC107",
-                "Alto": "#FF5722",
-                "Crítico": "#F44336"
-            }
-            risk_color = risk_colors.get(risk_text, "#4CAF50")
-            
-            risk_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            risk_frame.grid(row=row, column=5, padx=10, pady=5, sticky="w")
-            
-            risk_indicator = ctk.CTkFrame(risk_frame, width=15, height=15, fg_color=risk_color, corner_radius=7)
-            risk_indicator.pack(side="left", padx=(0, 5))
-            
-            risk_label = ctk.CTkLabel(risk_frame, text=risk_text)
-            risk_label.pack(side="left")
-            
-            # Frame para botones de acción
-            action_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            action_frame.grid(row=row, column=6, padx=10, pady=5)
-            
-            # Botón editar
-            edit_button = ctk.CTkButton(
-                action_frame,
-                text="Editar",
-                width=70,
-                height=25,
-                command=lambda fid=field.id: self.show_edit_field(fid)
-            )
-            edit_button.pack(side="left", padx=(0, 5))
-            
-            # Botón eliminar
-            delete_button = ctk.CTkButton(
-                action_frame,
-                text="Eliminar",
-                width=70,
-                height=25,
-                fg_color="#FF5252",
-                command=lambda fid=field.id: self.confirm_delete(fid)
-            )
-            delete_button.pack(side="left")
-            
-            # Agregar un separador después de cada fila
-            if i < len(filtered_fields) - 1:
-                row_separator = ctk.CTkFrame(self.scrollable_frame, height=1, fg_color="gray70")
-                row_separator.grid(row=row+1, column=0, columnspan=7, sticky="ew", padx=20)
+        self.show_search_results()
+    
+    def on_search_index_loaded(self, fields):
+        """Reconstruye el índice de búsqueda con todos los campos"""
+        self.search_index.rebuild(fields)
+        self.search_index_stale = False
+        self.field_table.set_loading(False)
+        self.show_search_results()
+    
+    def show_search_results(self):
+        """Muestra los campos que coinciden con la búsqueda"""
+        search_text = self.search_var.get().strip()
+        if not self.field_loader.paused or not search_text:
+            # Se volvió a la lista completa mientras se buscaba
+            return
+        
+        filtered_fields = self.search_index.search(search_text)
+        
+        # Mostrar campos filtrados (las filas que siguen en el resultado no se redibujan)
+        self.field_table.update_items(filtered_fields, empty_text=f"No se encontraron campos con '{search_text}'")
     
     def show_add_field(self):
         # Crear ventana de diálogo
@@ -455,14 +420,13 @@ class FieldManagementFrame(ctk.CTkFrame):
                 workers=workers_list
             )
             
-            # Guardar en la base de datos
-            result = self.field_controller.create(field)
-            
-            if result["success"]:
+            def on_saved(result):
                 dialog.destroy()
                 self.load_fields()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al guardar"))
+            
+            # Guardar en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.field_controller.create(field), on_saved,
+                          button=save_button, error_label=error_label, error_text="Error al guardar")
         
         save_button = ctk.CTkButton(
             button_frame,
@@ -472,8 +436,16 @@ class FieldManagementFrame(ctk.CTkFrame):
         save_button.pack(side="right")
     
     def show_edit_field(self, field_id):
-        # Obtener datos del campo
-        field = self.field_controller.get_by_id(field_id)
+        # Obtener datos del campo en segundo plano
+        get_task_runner().submit(
+            self,
+            lambda: self.field_controller.get_by_id(field_id),
+            lambda field: self.open_edit_field(field_id, field),
+            key="edit"
+        )
+    
+    def open_edit_field(self, field_id, field):
+        """Muestra el formulario para editar el campo obtenido"""
         if not field:
             return
         
@@ -629,14 +601,13 @@ class FieldManagementFrame(ctk.CTkFrame):
                 "workers": workers_list
             }
             
-            # Guardar en la base de datos
-            result = self.field_controller.update(field.id, updated_data)
-            
-            if result["success"]:
+            def on_updated(result):
                 dialog.destroy()
-                self.load_fields()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al actualizar"))
+                self.refresh_rows([field.id])  # Actualizar solo esta fila
+            
+            # Guardar en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.field_controller.update(field.id, updated_data), on_updated,
+                          button=save_button, error_label=error_label, error_text="Error al actualizar")
         
         save_button = ctk.CTkButton(
             button_frame,
@@ -646,8 +617,15 @@ class FieldManagementFrame(ctk.CTkFrame):
         save_button.pack(side="right")
     
     def confirm_delete(self, field_id):
-        # Obtener datos del campo
-        field = self.field_controller.get_by_id(field_id)
+        """Obtiene el campo en segundo plano y luego pide confirmación para eliminarlo"""
+        get_task_runner().submit(
+            self,
+            lambda: self.field_controller.get_by_id(field_id),
+            lambda field: self.open_confirm_delete(field_id, field),
+            key="delete"
+        )
+    
+    def open_confirm_delete(self, field_id, field):
         if not field:
             return
         
@@ -706,13 +684,13 @@ class FieldManagementFrame(ctk.CTkFrame):
 
         # Botón eliminar
         def delete_field():
-           result = self.field_controller.delete(field_id)
-           
-           if result["success"]:
+           def on_deleted(result):
                dialog.destroy()
-               self.load_fields()  # Recargar lista
-           else:
-               error_label.configure(text=result.get("error", "Error al eliminar"))
+               self.patch_rows([], [field_id])  # Quitar solo esta fila
+           
+           # Eliminar en segundo plano (el botón queda deshabilitado hasta que responda)
+           submit_action(dialog, lambda: self.field_controller.delete(field_id), on_deleted,
+                         button=delete_button, error_label=error_label, error_text="Error al eliminar")
        
         delete_button = ctk.CTkButton(
            button_frame,
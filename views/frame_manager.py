@@ -0,0 +1,136 @@
+# views/frame_manager.py
+from utils.task_runner import get_task_runner
+
+# Milisegundos de inactividad tras cambiar de pestaña antes de preconstruir la siguiente
+PREBUILD_DELAY_MS = 1500
+
+class FrameManager:
+    """
+    Mantiene vivas las vistas de módulo dentro del contenedor de contenido.
+
+    Cada vista se construye la primera vez que se muestra (factory(container)) y
+    luego solo se oculta con pack_forget() al cambiar de pestaña, así que volver a
+    ella no repite controladores, carga de datos ni construcción de widgets; las
+    vistas se actualizan solas con los eventos de la réplica.
+
+    Al ocultar una vista se cancelan sus tareas en segundo plano y se llama a su
+    on_hide() (si lo define) para que detenga sus after() pendientes. Si se
+    canceló alguna carga, al volver a mostrarla se llama a su reload().
+
+    Si prebuild es True, un rato después de cada cambio de pestaña se construye
+    en segundo plano (oculta) la pestaña que probablemente se abra después: la
+    que más veces siguió a la actual o, si todavía no hay historial, la siguiente
+    registrada.
+
+    Uso:
+        frames = FrameManager(self.content_frame)
+        frames.register("fields", lambda parent: FieldManagementFrame(parent, auth))
+        frames.show("fields")
+    """
+
+    def __init__(self, container, prebuild=True):
+        self.container = container
+        self.prebuild_enabled = prebuild
+
+        self._factories = {}  # nombre -> factory(container), en orden de registro
+        self.frames = {}  # nombre -> vista ya construida
+        self.current = None
+        self._transitions = {}  # nombre -> {nombre siguiente: veces}
+        self._interrupted = set()  # Vistas a las que se les canceló una carga al ocultarlas
+        self._prebuild_job = None
+
+    def register(self, name, factory):
+        """Registra cómo construir la vista de un módulo"""
+        self._factories[name] = factory
+
+    def show(self, name):
+        """Muestra la vista del módulo, construyéndola solo la primera vez"""
+        previous = self.current
+        self.clear()
+
+        frame = self.frames.get(name)
+        if frame is None or not frame.winfo_exists():
+            frame = self._factories[name](self.container)
+            self.frames[name] = frame
+            self._interrupted.discard(name)
+
+        frame.pack(fill="both", expand=True)
+        self.current = name
+        if name in self._interrupted:
+            self._interrupted.discard(name)
+            reload = getattr(frame, "reload", None)
+            if reload is not None:
+                reload()
+
+        if previous is not None and previous != name:
+            followers = self._transitions.setdefault(previous, {})
+            followers[name] = followers.get(name, 0) + 1
+        self._schedule_prebuild(name)
+        return frame
+
+    def clear(self):
+        """Oculta la vista actual y elimina el resto del contenido (mensajes, errores)"""
+        self._cancel_prebuild()
+        if self.current is not None and self.current in self.frames:
+            self._stop(self.current)
+        kept = set(self.frames.values())
+        for widget in self.container.winfo_children():
+            if widget in kept:
+                widget.pack_forget()
+            else:
+                widget.destroy()
+        self.current = None
+
+    def discard(self, name):
+        """Destruye la vista del módulo; se vuelve a construir al mostrarla"""
+        frame = self.frames.pop(name, None)
+        if frame is not None:
+            frame.destroy()
+        self._interrupted.discard(name)
+        if self.current == name:
+            self.current = None
+
+    def predict_next(self, name):
+        """Retorna la pestaña que probablemente se abra después de name, o None"""
+        followers = self._transitions.get(name)
+        if followers:
+            return max(followers, key=followers.get)
+
+        names = list(self._factories)
+        if name in names and names.index(name) + 1 < len(names):
+            return names[names.index(name) + 1]
+        return None
+
+    def _stop(self, name):
+        """Detiene las cargas y after() pendientes de la vista que se oculta"""
+        frame = self.frames[name]
+        if not frame.winfo_exists():
+            return
+        on_hide = getattr(frame, "on_hide", None)
+        if on_hide is not None:
+            on_hide()
+        if get_task_runner().cancel(frame):
+            self._interrupted.add(name)
+
+    def _schedule_prebuild(self, name):
+        if not self.prebuild_enabled:
+            return
+        upcoming = self.predict_next(name)
+        if upcoming is None or upcoming in self.frames:
+            return
+        self._prebuild_job = self.container.after(PREBUILD_DELAY_MS, lambda: self._prebuild(upcoming))
+
+    def _cancel_prebuild(self):
+        if self._prebuild_job is not None:
+            self.container.after_cancel(self._prebuild_job)
+            self._prebuild_job = None
+
+    def _prebuild(self, name):
+        """Construye la vista sin mostrarla (su carga de datos va en segundo plano)"""
+        self._prebuild_job = None
+        if name in self.frames or not self.container.winfo_exists():
+            return
+        try:
+            self.frames[name] = self._factories[name](self.container)
+        except Exception as e:
+            print(f"Error al preconstruir la vista {name}: {str(e)}")
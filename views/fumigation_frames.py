@@ -6,6 +6,13 @@ from controllers.field_controller import FieldController
 from controllers.user_controller import UserController
 from controllers.stock_controller import StockController
 from models.fumigation import Fumigation
+from views.background_action import submit_action
+from views.paged_loader import PagedLoader
+from views.virtual_table import VirtualTable
+from utils.replica_store import get_replica_store
+from utils.name_index import get_name_index
+from utils.task_runner import get_task_runner
+from utils.fumigation_stats import month_key, NO_DATE
 
 class FumigationManagementFrame(ctk.CTkFrame):
     def __init__(self, master, auth_controller):
@@ -34,339 +41,58 @@ class FumigationManagementFrame(ctk.CTkFrame):
             "cancelled": "Cancelada"
         }
         
-        # Crear interfaz
-        self.create_interface()
-        
-        # Cargar datos
-        self.load_fumigations()
-    
-    def create_interface(self):
-        # Configurar grid
-        self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(0, weight=0)  # Título
-        self.grid_rowconfigure(1, weight=0)  # Botones y filtros
-        self.grid_rowconfigure(2, weight=1)  # Tabla
-        
-        # Título
-        if self.is_fumigator:
-            title_text = "Mis Tareas de Fumigación"
-        else:
-            title_text = "Gestión de Fumigaciones"
-        
-        self.title_label = ctk.CTkLabel(
-            self, 
-            text=title_text,
-            font=ctk.CTkFont(size=20, weight="bold")
-        )
-        self.title_label.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="w")
+        # Mapas de ID a nombre para mostrar la tabla (se cargan con cada recarga)
+        self.field_map = {}
+        self.user_map = {}
+        self.stock_map = {}
         
-        # Frame para controles y filtros
-        self.controls_frame = ctk.CTkFrame(self, fg_color="transparent")
-        self.controls_frame.grid(row=1, column=0, padx=20, pady=(0, 10), sticky="ew")
-        
-        # Botones de acción
-        self.action_frame = ctk.CTkFrame(self.controls_frame, fg_color="transparent")
-        self.action_frame.pack(side="left", fill="y")
+        # Nombre -> ID del aplicador y etiqueta -> mes (YYYY-MM), para resolver los filtros sin recorrer listas
+        self.applicator_ids = {}
+        self.month_keys = {}
         
-        # Botón para agregar fumigación
-        if not self.is_fumigator:
-            self.add_button = ctk.CTkButton(
-                self.action_frame,
-                text="+ Programar Fumigación",
-                command=self.show_add_fumigation
-            )
-            self.add_button.pack(side="left", padx=(0, 10))
+        # Filtros de la consulta, tomados de la interfaz al recargar
+        self.fumigation_filters = {"applicator_id": None, "status": None, "month": None}
         
-        # Botón para refrescar lista
-        self.refresh_button = ctk.CTkButton(
-            self.action_frame,
-            text="↻ Refrescar",
-            command=self.load_fumigations,
-            fg_color="#4CAF50"
-        )
-        self.refresh_button.pack(side="left")
-        
-        # Frame para filtros
-        self.filter_frame = ctk.CTkFrame(self.controls_frame, fg_color="transparent")
-        self.filter_frame.pack(side="right", fill="y")
-        
-        # Filtro por estado
-        self.status_filter_var = ctk.StringVar(value="Todos los estados")
-        status_options = ["Todos los estados"] + [self.status_labels[status] for status in self.status_options]
-        self.status_filter = ctk.CTkOptionMenu(
-            self.filter_frame,
-            values=status_options,
-            variable=self.status_filter_var,
-            command=self.filter_fumigations
-        )
-        self.status_filter.pack(side="left", padx=(0, 10))
-        
-        # Filtro por aplicador (si es admin)
-        if self.is_admin:
-            self.applicator_filter_var = ctk.StringVar(value="Todos los aplicadores")
-            
-            # Obtener lista de usuarios (aplicadores posibles)
-            users = self.user_controller.get_all()
-            applicator_options = ["Todos los aplicadores"] + [user.get("username", "") for user in users]
-            
-            self.applicator_filter = ctk.CTkOptionMenu(
-                self.filter_frame,
-                values=applicator_options,
-                variable=self.applicator_filter_var,
-                command=self.filter_fumigations
-            )
-            self.applicator_filter.pack(side="left")
-        
-        # Frame para la tabla con scroll
-        self.table_container = ctk.CTkFrame(self)
-        self.table_container.grid(row=2, column=0, padx=20, pady=(0, 20), sticky="nsew")
+        # Crear interfaz
+        self.create_interface()
         
-        # Configurar grid del contenedor
-        self.table_container.grid_columnconfigure(0, weight=1)
-        self.table_container.grid_rowconfigure(0, weight=1)
+        # Carga por páginas a medida que se hace scroll
+        self.fumigation_loader = PagedLoader(self.fumigation_table, self.fetch_fumigation_page, self.display_fumigation_page)
         
-        # Crear scrollbar
-        self.scrollable_frame = ctk.CTkScrollableFrame(self.table_container)
-        self.scrollable_frame.grid(row=0, column=0, sticky="nsew")
-        
-        # Configurar grid del scrollable frame
-        self.scrollable_frame.grid_columnconfigure((0, 1, 2, 3, 4, 5), weight=1)
-        self.scrollable_frame.grid_columnconfigure(6, weight=0)
-        
-        # Cabecera de la tabla
-        headers = ["Campo", "Aplicador", "Fecha", "Notas", "Productos", "Estado", "Acciones"]
-        for i, header in enumerate(headers):
-            label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text=header,
-                font=ctk.CTkFont(weight="bold"),
-                width=100
-            )
-            label.grid(row=0, column=i, padx=10, pady=10, sticky="w")
+        # Cargar datos
+        self.load_fumigations()
         
-        # Separador
-        separator = ctk.CTkFrame(self.scrollable_frame, height=1, fg_color="gray")
-        separator.grid(row=1, column=0, columnspan=7, sticky="ew", padx=5)
+        # Recargar cuando cambien los datos replicados (por ejemplo, ediciones de otros usuarios)
+        self.unsubscribe_changes = get_replica_store().subscribe(["fumigations", "fields", "users", "stock"], self.on_data_changed)
     
-    def load_fumigations(self):
-        """Carga todas las fumigaciones"""
-        # Limpiar tabla existente (excepto cabecera y separador)
-        for widget in self.scrollable_frame.winfo_children():
-            if widget.grid_info()["row"] > 1:  # Solo eliminar filas de datos
-                widget.destroy()
-        
-        # Obtener fumigaciones
-        if self.is_admin:
-            self.fumigations = self.fumigation_controller.get_all()
-        else:
-            # Si no es admin, solo mostrar las fumigaciones asignadas a este usuario
-            user_id = self.current_user.get('id')
-            if user_id:
-                self.fumigations = self.fumigation_controller.get_all(applicator_id=user_id)
-            else:
-                self.fumigations = []  # Si no hay ID de usuario, no mostrar fumigaciones
-        
-        if not self.fumigations:
-            # Mostrar mensaje si no hay fumigaciones
-            no_data_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text="No hay fumigaciones registradas",
-                font=ctk.CTkFont(size=14)
-            )
-            no_data_label.grid(row=2, column=0, columnspan=7, padx=10, pady=20)
+    def on_data_changed(self, event):
+        """Actualiza la tabla con los datos modificados de la réplica"""
+        if event["collection"] != "fumigations":
+            # El índice de nombres ya aplicó los cambios: solo redibujar los nombres visibles
+            self.fumigation_table.refresh()
             return
         
-        # Ordenar fumigaciones por fecha (más reciente primero)
-        self.fumigations.sort(key=lambda x: x.date if x.date else datetime.now(), reverse=True)
+        # Las modificaciones y bajas se aplican fila por fila; las altas requieren recargar
+        replica = get_replica_store()
+        if event["added"] or not replica.is_synced("fumigations"):
+            self.load_fumigations(refresh_names=False)
+            return
         
-        # Mostrar fumigaciones en la tabla
-        self.display_fumigations(self.fumigations)
+        changed = []
+        for fumigation_id in event["modified"]:
+            data = replica.get("fumigations", fumigation_id)
+            if data is not None:
+                changed.append(Fumigation.from_dict(fumigation_id, data))
+        self.patch_rows(changed, event["removed"])
     
-    def filter_fumigations(self, *args):
-        """Filtra las fumigaciones según los criterios seleccionados"""
-        # Limpiar tabla existente (excepto cabecera y separador)
-        for widget in self.scrollable_frame.winfo_children():
-            if widget.grid_info()["row"] > 1:  # Solo eliminar filas de datos
-                widget.destroy()
-        
-        # Obtener valores de filtros
-        status_filter = self.status_filter_var.get()
-        
-        # Si no es "Todos los estados", convertir a valor interno
-        status_value = None
-        for key, label in self.status_labels.items():
-            if label == status_filter:
-                status_value = key
-                break
-        
-        # Filtrar por aplicador si es admin
-        applicator_filter = None
-        if self.is_admin and hasattr(self, 'applicator_filter_var'):
-            applicator_name = self.applicator_filter_var.get()
-            if applicator_name != "Todos los aplicadores":
-                # Buscar ID del aplicador por nombre
-                for user in self.user_controller.get_all():
-                    if user.get("username") == applicator_name:
-                        applicator_filter = user.get("id")
-                        break
-        
-        # Filtrar fumigaciones
-        filtered_fumigations = []
-        for fumigation in self.fumigations:
-            # Filtrar por estado
-            if status_value and fumigation.status != status_value:
-                continue
-            
-            # Filtrar por aplicador
-            if applicator_filter and fumigation.applicator_id != applicator_filter:
-                continue
-            
-            # Si pasa todos los filtros, incluir
-            filtered_fumigations.append(fumigation)
-        
-        # Mostrar fumigaciones filtradas
-        self.display_fumigations(filtered_fumigations)
+    def destroy(self):
+        # Dejar de recibir cambios de la réplica y descartar las cargas pendientes al cerrar la vista
+        self.unsubscribe_changes()
+        get_task_runner().cancel(self)
+        super().destroy()
     
-    def display_fumigations(self, fumigations):
-        """Muestra las fumigaciones en la tabla"""
-        if not fumigations:
-            # Mostrar mensaje si no hay fumigaciones
-            no_data_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text="No hay fumigaciones que coincidan con los filtros",
-                font=ctk.CTkFont(size=14)
-            )
-            no_data_label.grid(row=2, column=0, columnspan=7, padx=10, pady=20)
-            return
-        
-        # Obtener datos adicionales
-        field_map = {}
-        user_map = {}
-        stock_map = {}
-        
-        # Cargar campos
-        fields = self.field_controller.get_all()
-        for field in fields:
-            field_map[field.id] = field.name
-        
-        # Cargar usuarios
-        users = self.user_controller.get_all()
-        for user in users:
-            user_map[user.get("id")] = user.get("username")
-        
-        # Cargar productos
-        stock_items = self.stock_controller.get_all()
-        for item in stock_items:
-            stock_map[item.id] = item.product_name
-        
-        # Mostrar fumigaciones en la tabla
-        for i, fumigation in enumerate(fumigations):
-            row = i + 2  # +2 porque la fila 0 es la cabecera y la 1 es el separador
-            
-            # Campo
-            field_name = field_map.get(fumigation.field_id, "Desconocido")
-            field_label = ctk.CTkLabel(self.scrollable_frame, text=field_name, width=100)
-            field_label.grid(row=row, column=0, padx=10, pady=5, sticky="w")
-
-            # Aplicador
-            applicator_name = user_map.get(fumigation.applicator_id, "Desconocido")
-            applicator_label = ctk.CTkLabel(self.scrollable_frame, text=applicator_name, width=100)
-            applicator_label.grid(row=row, column=1, padx=10, pady=5, sticky="w")
-
-            # Fecha
-            date_text = fumigation.date.strftime("%d/%m/%Y") if fumigation.date else "No programada"
-            date_label = ctk.CTkLabel(self.scrollable_frame, text=date_text, width=100)
-            date_label.grid(row=row, column=2, padx=10, pady=5, sticky="w")
-
-            # Productos
-            product_names = []
-            for product_id in fumigation.products:
-                product_name = stock_map.get(product_id, "Desconocido")
-                product_names.append(product_name)
-
-            # Notas
-            notes_text = fumigation.notes or ""
-            if len(notes_text) > 30:
-                notes_text = notes_text[:27] + "..."
-
-            notes_label = ctk.CTkLabel(self.scrollable_frame, text=notes_text, width=100)
-            notes_label.grid(row=row, column=3, padx=10, pady=5, sticky="w")
-
-            # Productos
-            product_names = []
-            for product_id in fumigation.products:
-                product_name = stock_map.get(product_id, "Desconocido")
-                product_names.append(product_name)
-
-            products_text = ", ".join(product_names) if product_names else "Ninguno"
-            if len(products_text) > 30:
-                products_text = products_text[:27] + "..."
-
-            products_label = ctk.CTkLabel(self.scrollable_frame, text=products_text, width=100)
-            products_label.grid(row=row, column=4, padx=10, pady=5, sticky="w")
-
-            # Estado (con colores)
-            status_text = self.status_labels.get(fumigation.status, "Desconocido")
-            status_colors = {
-                "scheduled": "#FFC107",  # Amarillo
-                "in_progress": "#2196F3",  # Azul
-                "completed": "#4CAF50",  # Verde
-                "cancelled": "#F44336"   # Rojo
-            }
-            status_color = status_colors.get(fumigation.status, "#9E9E9E")
-
-            status_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            status_frame.grid(row=row, column=5, padx=10, pady=5, sticky="w")
-
-            status_indicator = ctk.CTkFrame(status_frame, width=10, height=10, fg_color=status_color, corner_radius=5)
-            status_indicator.pack(side="left", padx=(0, 5))
-
-            status_label = ctk.CTkLabel(status_frame, text=status_text, width=100)
-            status_label.pack(side="left")
-            
-            # Frame para botones de acción
-            action_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            action_frame.grid(row=row, column=6, padx=10, pady=5)
-# views/fumigation_frames.py
-import customtkinter as ctk
-from datetime import datetime, timedelta
-from controllers.fumigation_controller import FumigationController
-from controllers.field_controller import FieldController
-from controllers.user_controller import UserController
-from controllers.stock_controller import StockController
-from models.fumigation import Fumigation
-
-class FumigationManagementFrame(ctk.CTkFrame):
-    def __init__(self, master, auth_controller):
-        super().__init__(master)
-        self.master = master
-        self.auth_controller = auth_controller
-        self.fumigation_controller = FumigationController()
-        self.field_controller = FieldController()
-        self.user_controller = UserController(auth_controller)
-        self.stock_controller = StockController()
-        
-        # Obtener información del usuario actual
-        self.current_user = self.auth_controller.get_current_user() or {}
-        self.is_admin = self.current_user and self.current_user.get('role') == 'admin'
-        self.is_fumigator = self.current_user and self.current_user.get('role') == 'fumigator'
-
-        # Lista de fumigaciones
-        self.fumigations = []
-        
-        # Lista de estados disponibles
-        self.status_options = ["scheduled", "in_progress", "completed", "cancelled"]
-        self.status_labels = {
-            "scheduled": "Programada",
-            "in_progress": "En Progreso",
-            "completed": "Completada",
-            "cancelled": "Cancelada"
-        }
-        
-        # Crear interfaz
-        self.create_interface()
-        
-        # Cargar datos
+    def reload(self):
+        """Vuelve a cargar nombres y fumigaciones si la carga se canceló al ocultar la vista"""
         self.load_fumigations()
     
     def create_interface(self):
@@ -430,17 +156,24 @@ class FumigationManagementFrame(ctk.CTkFrame):
         )
         self.status_filter.pack(side="left", padx=(0, 10))
         
+        # Filtro por mes (los meses con fumigaciones se agregan al cargar los nombres)
+        self.month_filter_var = ctk.StringVar(value="Todos los meses")
+        self.month_filter = ctk.CTkOptionMenu(
+            self.filter_frame,
+            values=["Todos los meses"],
+            variable=self.month_filter_var,
+            command=self.filter_fumigations
+        )
+        self.month_filter.pack(side="left", padx=(0, 10))
+        
         # Filtro por aplicador (si es admin)
         if self.is_admin:
             self.applicator_filter_var = ctk.StringVar(value="Todos los aplicadores")
             
-            # Obtener lista de usuarios (aplicadores posibles)
-            users = self.user_controller.get_all()
-            applicator_options = ["Todos los aplicadores"] + [user.get("username", "") for user in users]
-            
+            # Los usuarios (aplicadores posibles) se agregan al cargar los nombres
             self.applicator_filter = ctk.CTkOptionMenu(
                 self.filter_frame,
-                values=applicator_options,
+                values=["Todos los aplicadores"],
                 variable=self.applicator_filter_var,
                 command=self.filter_fumigations
             )
@@ -454,268 +187,199 @@ class FumigationManagementFrame(ctk.CTkFrame):
         self.table_container.grid_columnconfigure(0, weight=1)
         self.table_container.grid_rowconfigure(0, weight=1)
         
-        # Crear scrollbar
-        self.scrollable_frame = ctk.CTkScrollableFrame(self.table_container)
-        self.scrollable_frame.grid(row=0, column=0, sticky="nsew")
-        
-        # Configurar grid del scrollable frame
-        self.scrollable_frame.grid_columnconfigure((0, 1, 2, 3, 4, 5), weight=1)
-        self.scrollable_frame.grid_columnconfigure(6, weight=0)
-        
-        # Cabecera de la tabla
-        headers = ["Campo", "Aplicador", "Fecha", "Notas", "Productos", "Estado", "Acciones"]
-        for i, header in enumerate(headers):
-            label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text=header,
-                font=ctk.CTkFont(weight="bold"),
-                width=100
-            )
-            label.grid(row=0, column=i, padx=10, pady=10, sticky="w")
-        
-        # Separador
-        separator = ctk.CTkFrame(self.scrollable_frame, height=1, fg_color="gray")
-        separator.grid(row=1, column=0, columnspan=7, sticky="ew", padx=5)
+        # Tabla virtualizada: solo se crean las filas visibles
+        status_colors = {
+            "scheduled": "#FFC107",  # Amarillo
+            "in_progress": "#2196F3",  # Azul
+            "completed": "#4CAF50",  # Verde
+            "cancelled": "#F44336"   # Rojo
+        }
+        columns = [
+            {"header": "Campo", "text": lambda fumigation: self.field_map.get(fumigation.field_id, "Desconocido")},
+            {"header": "Aplicador", "text": lambda fumigation: self.user_map.get(fumigation.applicator_id, "Desconocido")},
+            {"header": "Fecha",
+             "text": lambda fumigation: fumigation.date.strftime("%d/%m/%Y") if fumigation.date else "No programada",
+             "sort": lambda fumigation: fumigation.date},
+            # Notas y productos se truncan si son muy largos
+            {"header": "Notas", "text": lambda fumigation: fumigation.notes, "max_chars": 30},
+            {"header": "Productos", "text": self.format_products, "max_chars": 30},
+            {"header": "Estado",
+             "text": lambda fumigation: self.status_labels.get(fumigation.status, "Desconocido"),
+             "color": lambda fumigation: status_colors.get(fumigation.status, "#9E9E9E")}
+        ]
+        
+        # Según el estado, se muestran diferentes botones
+        actions = [
+            {"text": "Detalles", "command": lambda fumigation: self.show_fumigation_details(fumigation.id)},
+            {"text": "Iniciar", "fg_color": "#2196F3",
+             "command": lambda fumigation: self.start_fumigation(fumigation.id),
+             "visible": lambda fumigation: fumigation.status == "scheduled"},
+            {"text": "Cancelar", "fg_color": "#F44336",
+             "command": lambda fumigation: self.cancel_fumigation(fumigation.id),
+             "visible": lambda fumigation: fumigation.status == "scheduled"},
+            {"text": "Completar", "width": 80, "fg_color": "#4CAF50",
+             "command": lambda fumigation: self.complete_fumigation(fumigation.id),
+             "visible": lambda fumigation: fumigation.status == "in_progress"},
+            # Las fumigaciones completadas o canceladas solo las puede editar un admin
+            {"text": "Editar",
+             "command": lambda fumigation: self.show_edit_fumigation(fumigation.id),
+             "visible": lambda fumigation: self.is_admin and fumigation.status in ("completed", "cancelled")}
+        ]
+        
+        self.fumigation_table = VirtualTable(self.table_container, columns, actions)
+        self.fumigation_table.grid(row=0, column=0, sticky="nsew")
     
-    def load_fumigations(self):
-        """Carga todas las fumigaciones"""
-        # Limpiar tabla existente (excepto cabecera y separador)
-        for widget in self.scrollable_frame.winfo_children():
-            if widget.grid_info()["row"] > 1:  # Solo eliminar filas de datos
-                widget.destroy()
-        
-        # Obtener fumigaciones
-        if self.is_admin:
-            self.fumigations = self.fumigation_controller.get_all()
-        else:
-            # Si no es admin, solo mostrar las fumigaciones asignadas a este usuario
-            user_id = self.current_user.get('id')
-            if user_id:
-                self.fumigations = self.fumigation_controller.get_all(applicator_id=user_id)
-            else:
-                self.fumigations = []  # Si no hay ID de usuario, no mostrar fumigaciones
-        
-        if not self.fumigations:
-            # Mostrar mensaje si no hay fumigaciones
-            no_data_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text="No hay fumigaciones registradas",
-                font=ctk.CTkFont(size=14)
-            )
-            no_data_label.grid(row=2, column=0, columnspan=7, padx=10, pady=20)
-            return
-        
-        # Ordenar fumigaciones por fecha (más reciente primero)
-        self.fumigations.sort(key=lambda x: x.date if x.date else datetime.now(), reverse=True)
-        
-        # Mostrar fumigaciones en la tabla
-        self.display_fumigations(self.fumigations)
+    def load_fumigations(self, refresh_names=True):
+        """
+        Carga la primera página de fumigaciones según los filtros seleccionados.
+        refresh_names=False reutiliza los nombres ya cargados (por ejemplo, al filtrar).
+        """
+        filtered = (self.status_filter_var.get() != "Todos los estados" or
+                    self.month_filter_var.get() != "Todos los meses" or
+                    (hasattr(self, 'applicator_filter_var') and
+                     self.applicator_filter_var.get() != "Todos los aplicadores"))
+        self.fumigation_empty_text = ("No hay fumigaciones que coincidan con los filtros" if filtered
+                                      else "No hay fumigaciones registradas")
+        self.fumigation_table.set_loading(True)
+        
+        # Obtener datos adicionales en segundo plano, una sola vez para todas las páginas
+        get_task_runner().submit(
+            self,
+            lambda: self.fetch_lookup_maps(refresh_names),
+            self.on_lookup_maps_loaded,
+            key="lookup"
+        )
     
-    def filter_fumigations(self, *args):
-        """Filtra las fumigaciones según los criterios seleccionados"""
-        # Limpiar tabla existente (excepto cabecera y separador)
-        for widget in self.scrollable_frame.winfo_children():
-            if widget.grid_info()["row"] > 1:  # Solo eliminar filas de datos
-                widget.destroy()
+    def on_lookup_maps_loaded(self, maps):
+        """Guarda los nombres obtenidos y pide la primera página de fumigaciones"""
+        self.field_map, self.user_map, self.stock_map, months = maps
+        self.applicator_ids = {username: user_id for user_id, username in self.user_map.items()}
+        self.month_keys = {f"{month[5:]}/{month[:4]}": month for month in months}
         
-        # Obtener valores de filtros
-        status_filter = self.status_filter_var.get()
+        # Actualizar opciones del filtro de mes (más reciente primero)
+        self.month_filter.configure(values=["Todos los meses"] + list(self.month_keys))
+        
+        if self.is_admin:
+            # Actualizar opciones del filtro de aplicador
+            self.applicator_filter.configure(values=["Todos los aplicadores"] + list(self.user_map.values()))
         
         # Si no es "Todos los estados", convertir a valor interno
+        status_filter = self.status_filter_var.get()
         status_value = None
         for key, label in self.status_labels.items():
             if label == status_filter:
                 status_value = key
                 break
         
-        # Filtrar por aplicador si es admin
         applicator_filter = None
-        if self.is_admin and hasattr(self, 'applicator_filter_var'):
-            applicator_name = self.applicator_filter_var.get()
-            if applicator_name != "Todos los aplicadores":
+        if self.is_admin:
+            # Filtrar por aplicador si es admin
+            if hasattr(self, 'applicator_filter_var'):
                 # Buscar ID del aplicador por nombre
-                for user in self.user_controller.get_all():
-                    if user.get("username") == applicator_name:
-                        applicator_filter = user.get("id")
-                        break
-        
-        # Filtrar fumigaciones
-        filtered_fumigations = []
-        for fumigation in self.fumigations:
-            # Filtrar por estado
-            if status_value and fumigation.status != status_value:
-                continue
-            
-            # Filtrar por aplicador
-            if applicator_filter and fumigation.applicator_id != applicator_filter:
-                continue
-            
-            # Si pasa todos los filtros, incluir
-            filtered_fumigations.append(fumigation)
+                applicator_filter = self.applicator_ids.get(self.applicator_filter_var.get())
+        else:
+            # Si no es admin, solo mostrar las fumigaciones asignadas a este usuario
+            applicator_filter = self.current_user.get('id')
+        
+        # Las páginas se piden en segundo plano, así que los filtros se leen aquí.
+        # Con la réplica sincronizada se resuelven con los índices en memoria, sin red
+        self.fumigation_filters = {
+            "applicator_id": applicator_filter,
+            "status": status_value,
+            "month": self.month_keys.get(self.month_filter_var.get())
+        }
         
-        # Mostrar fumigaciones filtradas
-        self.display_fumigations(filtered_fumigations)
+        # Obtener la primera página (más reciente primero); las siguientes se cargan al hacer scroll.
+        # Las filas actuales se mantienen hasta que llega la página y se concilian con ella
+        self.fumigation_table.set_loading(False)
+        self.fumigation_loader.reset()
+        self.fumigations = self.fumigation_loader.items
     
-    def display_fumigations(self, fumigations):
-        """Muestra las fumigaciones en la tabla"""
-        if not fumigations:
-            # Mostrar mensaje si no hay fumigaciones
-            no_data_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text="No hay fumigaciones que coincidan con los filtros",
-                font=ctk.CTkFont(size=14)
-            )
-            no_data_label.grid(row=2, column=0, columnspan=7, padx=10, pady=20)
-            return
-        
-        # Obtener datos adicionales
-        field_map = {}
-        user_map = {}
-        stock_map = {}
+    def filter_fumigations(self, *args):
+        """Filtra las fumigaciones según los criterios seleccionados"""
+        # Los filtros se aplican en la consulta, así que se recarga desde la primera página
+        self.load_fumigations(refresh_names=False)
+    
+    def fetch_fumigation_page(self, cursor):
+        """Obtiene una página de fumigaciones aplicando los filtros en la consulta (en segundo plano)"""
+        if not self.is_admin and not self.fumigation_filters["applicator_id"]:
+            # Si no hay ID de usuario, no mostrar fumigaciones
+            return {"items": [], "next_cursor": None, "has_more": False}
         
-        # Cargar campos
+        return self.fumigation_controller.get_page(cursor=cursor, **self.fumigation_filters)
+    
+    def fetch_lookup_maps(self, refresh=True):
+        """
+        Obtiene del índice compartido los nombres de campos, usuarios y productos, y
+        los meses con fumigaciones del índice de la réplica (en segundo plano)
+        """
+        name_index = get_name_index()
+        
+        # Traer solo los cambios desde la última carga
+        if refresh:
+            name_index.refresh('fields', 'users', 'stock')
+        
+        # Sin réplica sincronizada solo se ofrece "Todos los meses"
+        months = get_replica_store().values('fumigations', 'date_month') or []
+        months = sorted((month for month in months if month != NO_DATE), reverse=True)
+        
+        return name_index.names('fields'), name_index.names('users'), name_index.names('stock'), months
+    
+    def display_fumigation_page(self, fumigations, start_index):
+        """Muestra las fumigaciones de una página recién cargada"""
+        if start_index == 0:
+            # Primera página: actualizar solo las filas que cambiaron
+            self.fumigation_table.update_items(fumigations, empty_text=self.fumigation_empty_text)
+        elif fumigations:
+            self.fumigation_table.append_items(fumigations)
+    
+    def refresh_rows(self, fumigation_ids):
+        """Vuelve a leer en segundo plano las fumigaciones indicadas y actualiza solo sus filas"""
+        get_task_runner().submit(
+            self,
+            lambda: [self.fumigation_controller.get_by_id(fumigation_id) for fumigation_id in fumigation_ids],
+            lambda fumigations: self.patch_rows([fumigation for fumigation in fumigations if fumigation])
+        )
+    
+    def patch_rows(self, changed, removed=()):
+        """Actualiza las filas de las fumigaciones cambiadas; recarga si alguna no estaba en la tabla"""
+        if not self.fumigation_table.patch(changed, removed, accept=self.matches_filters):
+            self.load_fumigations(refresh_names=False)
+    
+    def matches_filters(self, fumigation):
+        """Indica si la fumigación cumple los filtros de la consulta actual"""
+        filters = self.fumigation_filters
+        return ((filters["applicator_id"] is None or fumigation.applicator_id == filters["applicator_id"]) and
+                (filters["status"] is None or fumigation.status == filters["status"]) and
+                (filters["month"] is None or month_key(fumigation.date) == filters["month"]))
+    
+    def format_products(self, fumigation):
+        """Texto de la columna Productos con los nombres del índice compartido"""
+        product_names = [self.stock_map.get(product_id, "Desconocido") for product_id in fumigation.products]
+        return ", ".join(product_names) if product_names else "Ninguno"
+    
+    def show_add_fumigation(self):
+        """Obtiene en segundo plano los datos de los selectores y luego muestra el formulario"""
+        get_task_runner().submit(self, self.fetch_form_options, self.open_add_fumigation, key="form")
+    
+    def fetch_form_options(self):
+        """Retorna (campos, aplicadores, productos recibidos) para los selectores del formulario (en segundo plano)"""
         fields = self.field_controller.get_all()
-        for field in fields:
-            field_map[field.id] = field.name
         
-        # Cargar usuarios
-        users = self.user_controller.get_all()
-        for user in users:
-            user_map[user.get("id")] = user.get("username")
-        
-        # Cargar productos
-        stock_items = self.stock_controller.get_all()
-        for item in stock_items:
-            stock_map[item.id] = item.product_name
+        if self.is_admin:
+            applicators = self.user_controller.get_all()
+        else:
+            # Si no es admin, sólo se puede asignar a sí mismo
+            applicators = [{"id": self.current_user.get("id"), "username": self.current_user.get("username")}]
         
-        # Mostrar fumigaciones en la tabla
-        for i, fumigation in enumerate(fumigations):
-            row = i + 2  # +2 porque la fila 0 es la cabecera y la 1 es el separador
-            
-            # Campo
-            field_name = field_map.get(fumigation.field_id, "Desconocido")
-            field_label = ctk.CTkLabel(self.scrollable_frame, text=field_name, width=100)
-            field_label.grid(row=row, column=0, padx=10, pady=5, sticky="w")
-
-            # Aplicador
-            applicator_name = user_map.get(fumigation.applicator_id, "Desconocido")
-            applicator_label = ctk.CTkLabel(self.scrollable_frame, text=applicator_name, width=100)
-            applicator_label.grid(row=row, column=1, padx=10, pady=5, sticky="w")
-
-            # Fecha
-            date_text = fumigation.date.strftime("%d/%m/%Y") if fumigation.date else "No programada"
-            date_label = ctk.CTkLabel(self.scrollable_frame, text=date_text, width=100)
-            date_label.grid(row=row, column=2, padx=10, pady=5, sticky="w")
-
-            # Productos
-            product_names = []
-            for product_id in fumigation.products:
-                product_name = stock_map.get(product_id, "Desconocido")
-                product_names.append(product_name)
-
-            products_text = ", ".join(product_names) if product_names else "Ninguno"
-            if len(products_text) > 30:
-                products_text = products_text[:27] + "..."
-
-            products_label = ctk.CTkLabel(self.scrollable_frame, text=products_text, width=100)
-            products_label.grid(row=row, column=3, padx=10, pady=5, sticky="w")
-
-            # Estado (con colores)
-            status_text = self.status_labels.get(fumigation.status, "Desconocido")
-            status_colors = {
-                "scheduled": "#FFC107",  # Amarillo
-                "in_progress": "#2196F3",  # Azul
-                "completed": "#4CAF50",  # Verde
-                "cancelled": "#F44336"   # Rojo
-            }
-            status_color = status_colors.get(fumigation.status, "#9E9E9E")
-
-            status_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            status_frame.grid(row=row, column=4, padx=10, pady=5, sticky="w")
-
-            status_indicator = ctk.CTkFrame(status_frame, width=10, height=10, fg_color=status_color, corner_radius=5)
-            status_indicator.pack(side="left", padx=(0, 5))
-
-            status_label = ctk.CTkLabel(status_frame, text=status_text, width=100)
-            status_label.pack(side="left")
-
-            # Notas (truncadas si son muy largas)
-            notes_text = fumigation.notes or ""
-            if len(notes_text) > 30:
-                notes_text = notes_text[:27] + "..."
-
-            notes_label = ctk.CTkLabel(self.scrollable_frame, text=notes_text, width=100)
-            notes_label.grid(row=row, column=5, padx=10, pady=5, sticky="w")
-            
-            # Frame para botones de acción
-            action_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            action_frame.grid(row=row, column=6, padx=10, pady=5)
-            
-            # Botón para ver detalles
-            details_button = ctk.CTkButton(
-                action_frame,
-                text="Detalles",
-                width=70,
-                height=25,
-                command=lambda fid=fumigation.id: self.show_fumigation_details(fid)
-            )
-            details_button.pack(side="left", padx=(0, 5))
-            
-            # Según el estado, mostrar diferentes botones
-            if fumigation.status == "scheduled":
-                # Botón para iniciar fumigación
-                start_button = ctk.CTkButton(
-                    action_frame,
-                    text="Iniciar",
-                    width=70,
-                    height=25,
-                    fg_color="#2196F3",
-                    command=lambda fid=fumigation.id: self.start_fumigation(fid)
-                )
-                start_button.pack(side="left", padx=(0, 5))
-                
-                # Botón para cancelar
-                cancel_button = ctk.CTkButton(
-                    action_frame,
-                    text="Cancelar",
-                    width=70,
-                    height=25,
-                    fg_color="#F44336",
-                    command=lambda fid=fumigation.id: self.cancel_fumigation(fid)
-                )
-                cancel_button.pack(side="left")
-            
-            elif fumigation.status == "in_progress":
-                # Botón para completar
-                complete_button = ctk.CTkButton(
-                    action_frame,
-                    text="Completar",
-                    width=80,
-                    height=25,
-                    fg_color="#4CAF50",
-                    command=lambda fid=fumigation.id: self.complete_fumigation(fid)
-                )
-                complete_button.pack(side="left")
-            
-            elif fumigation.status == "completed" or fumigation.status == "cancelled":
-                # Para fumigaciones completadas o canceladas, solo permitir a admin editar
-                if self.is_admin:
-                    edit_button = ctk.CTkButton(
-                        action_frame,
-                        text="Editar",
-                        width=70,
-                        height=25,
-                        command=lambda fid=fumigation.id: self.show_edit_fumigation(fid)
-                    )
-                    edit_button.pack(side="left")
-            
-            # Agregar un separador después de cada fila
-            if i < len(fumigations) - 1:
-                row_separator = ctk.CTkFrame(self.scrollable_frame, height=1, fg_color="gray70")
-                row_separator.grid(row=row+1, column=0, columnspan=7, sticky="ew", padx=20)
+        # Solo los productos que están recibidos
+        available_products = [p for p in self.stock_controller.get_all() if p.status == "received"]
+        return fields, applicators, available_products
     
-    def show_add_fumigation(self):
+    def open_add_fumigation(self, form_options):
         """Muestra el formulario para agregar una nueva fumigación"""
+        fields, applicators, available_products = form_options
+        
         # Crear ventana de diálogo
         dialog = ctk.CTkToplevel(self)
         dialog.title("Programar Fumigación")
@@ -749,17 +413,6 @@ class FumigationManagementFrame(ctk.CTkFrame):
         )
         title_label.pack(pady=(0, 20), anchor="w")
         
-        # Obtener datos para los selectores
-        fields = self.field_controller.get_all()
-        fields_map = {field.id: field.name for field in fields}
-        
-        applicators = []
-        if self.is_admin:
-            applicators = self.user_controller.get_all()
-        else:
-            # Si no es admin, sólo se puede asignar a sí mismo
-            applicators = [{"id": self.current_user.get("id"), "username": self.current_user.get("username")}]
-        
         # Selección de campo
         field_label = ctk.CTkLabel(form_scroll, text="Campo *", anchor="w")
         field_label.pack(anchor="w", pady=(10, 0))
@@ -843,9 +496,6 @@ class FumigationManagementFrame(ctk.CTkFrame):
         products_label = ctk.CTkLabel(form_scroll, text="Productos *", anchor="w", font=ctk.CTkFont(weight="bold"))
         products_label.pack(anchor="w", pady=(20, 5))
         
-        # Obtener productos disponibles (solo los que están recibidos)
-        available_products = [p for p in self.stock_controller.get_all() if p.status == "received"]
-        
         # Frame para la lista de productos con scroll
         products_container = ctk.CTkFrame(form_scroll)
         products_container.pack(fill="x", pady=(5, 0))
@@ -961,14 +611,13 @@ class FumigationManagementFrame(ctk.CTkFrame):
                 notes=notes
             )
             
-            # Guardar en la base de datos
-            result = self.fumigation_controller.create(fumigation)
-            
-            if result["success"]:
+            def on_saved(result):
                 dialog.destroy()
                 self.load_fumigations()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al guardar"))
+            
+            # Guardar en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.fumigation_controller.create(fumigation), on_saved,
+                          button=save_button, error_label=error_label, error_text="Error al guardar")
         
         save_button = ctk.CTkButton(
             button_frame,
@@ -978,11 +627,20 @@ class FumigationManagementFrame(ctk.CTkFrame):
         save_button.pack(side="right")
     
     def show_fumigation_details(self, fumigation_id):
-        """Muestra los detalles de una fumigación"""
+        """Obtiene la fumigación y sus datos relacionados en segundo plano y luego muestra los detalles"""
+        get_task_runner().submit(
+            self,
+            lambda: self.fetch_fumigation_details(fumigation_id),
+            lambda details: self.open_fumigation_details(fumigation_id, details),
+            key="details"
+        )
+    
+    def fetch_fumigation_details(self, fumigation_id):
+        """Retorna (fumigación, campo, aplicador, productos) para el diálogo de detalles, o None (en segundo plano)"""
         # Obtener datos de la fumigación
         fumigation = self.fumigation_controller.get_by_id(fumigation_id)
         if not fumigation:
-            return
+            return None
         
         # Obtener datos adicionales
         field = self.field_controller.get_by_id(fumigation.field_id)
@@ -1000,6 +658,14 @@ class FumigationManagementFrame(ctk.CTkFrame):
             else:
                 product_details.append(f"Producto ID: {product_id}")
         
+        return fumigation, field_name, applicator_name, product_details
+    
+    def open_fumigation_details(self, fumigation_id, details):
+        """Muestra los detalles de una fumigación"""
+        if not details:
+            return
+        fumigation, field_name, applicator_name, product_details = details
+        
         # Crear ventana de diálogo
         dialog = ctk.CTkToplevel(self)
         dialog.title("Detalles de Fumigación")
@@ -1166,11 +832,19 @@ class FumigationManagementFrame(ctk.CTkFrame):
         close_button.pack(side="right")
     
     def show_edit_fumigation(self, fumigation_id):
+        """Obtiene la fumigación y los datos de los selectores en segundo plano y luego muestra el formulario de edición"""
+        get_task_runner().submit(
+            self,
+            lambda: (self.fumigation_controller.get_by_id(fumigation_id), self.fetch_form_options()),
+            lambda loaded: self.open_edit_fumigation(fumigation_id, *loaded),
+            key="edit"
+        )
+    
+    def open_edit_fumigation(self, fumigation_id, fumigation, form_options):
         """Muestra el formulario para editar una fumigación"""
-        # Obtener datos de la fumigación
-        fumigation = self.fumigation_controller.get_by_id(fumigation_id)
         if not fumigation:
             return
+        fields, applicators, available_products = form_options
         
         # Verificar permisos
         if not self.is_admin and self.current_user.get("id") != fumigation.applicator_id:
@@ -1233,17 +907,6 @@ class FumigationManagementFrame(ctk.CTkFrame):
         )
         title_label.pack(pady=(0, 20), anchor="w")
         
-        # Obtener datos para los selectores
-        fields = self.field_controller.get_all()
-        fields_map = {field.id: field.name for field in fields}
-        
-        applicators = []
-        if self.is_admin:
-            applicators = self.user_controller.get_all()
-        else:
-            # Si no es admin, sólo se puede asignar a sí mismo
-            applicators = [{"id": self.current_user.get("id"), "username": self.current_user.get("username")}]
-        
         # Información sobre estado actual
         status_frame = ctk.CTkFrame(form_scroll, fg_color="#F0F0F0")
         status_frame.pack(fill="x", pady=(0, 20))
@@ -1346,9 +1009,6 @@ class FumigationManagementFrame(ctk.CTkFrame):
         products_label = ctk.CTkLabel(form_scroll, text="Productos *", anchor="w", font=ctk.CTkFont(weight="bold"))
         products_label.pack(anchor="w", pady=(20, 5))
         
-        # Obtener productos disponibles (solo los que están recibidos)
-        available_products = [p for p in self.stock_controller.get_all() if p.status == "received"]
-        
         # Frame para la lista de productos con scroll
         products_container = ctk.CTkFrame(form_scroll)
         products_container.pack(fill="x", pady=(5, 0))
@@ -1466,14 +1126,13 @@ class FumigationManagementFrame(ctk.CTkFrame):
                 "notes": notes
             }
             
-            # Actualizar en la base de datos
-            result = self.fumigation_controller.update(fumigation.id, updated_data)
-            
-            if result["success"]:
+            def on_updated(result):
                 dialog.destroy()
-                self.load_fumigations()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al actualizar"))
+                self.refresh_rows([fumigation.id])  # Actualizar solo esta fila
+            
+            # Actualizar en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.fumigation_controller.update(fumigation.id, updated_data), on_updated,
+                          button=save_button, error_label=error_label, error_text="Error al actualizar")
         
         save_button = ctk.CTkButton(
             button_frame,
@@ -1532,13 +1191,10 @@ class FumigationManagementFrame(ctk.CTkFrame):
         
         # Botón iniciar
         def do_start_fumigation():
-            result = self.fumigation_controller.change_status(fumigation_id, "in_progress")
-            
-            if result["success"]:
-                dialog.destroy()
-                self.load_fumigations()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al iniciar la fumigación"))
+            # Cambiar el estado en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.fumigation_controller.change_status(fumigation_id, "in_progress"),
+                          lambda result: self.on_status_changed(dialog, fumigation_id),
+                          button=start_button, error_label=error_label, error_text="Error al iniciar la fumigación")
         
         start_button = ctk.CTkButton(
             button_frame,
@@ -1548,6 +1204,11 @@ class FumigationManagementFrame(ctk.CTkFrame):
         )
         start_button.pack(side="right")
     
+    def on_status_changed(self, dialog, fumigation_id):
+        """Cierra el diálogo de cambio de estado y actualiza la fila de la fumigación"""
+        dialog.destroy()
+        self.refresh_rows([fumigation_id])  # Actualizar solo esta fila
+    
     def complete_fumigation(self, fumigation_id):
         """Marca una fumigación como completada"""
         # Confirmar acción
@@ -1598,13 +1259,10 @@ class FumigationManagementFrame(ctk.CTkFrame):
         
         # Botón completar
         def do_complete_fumigation():
-            result = self.fumigation_controller.change_status(fumigation_id, "completed")
-            
-            if result["success"]:
-                dialog.destroy()
-                self.load_fumigations()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al completar la fumigación"))
+            # Cambiar el estado en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.fumigation_controller.change_status(fumigation_id, "completed"),
+                          lambda result: self.on_status_changed(dialog, fumigation_id),
+                          button=complete_button, error_label=error_label, error_text="Error al completar la fumigación")
         
         complete_button = ctk.CTkButton(
             button_frame,
@@ -1664,13 +1322,10 @@ class FumigationManagementFrame(ctk.CTkFrame):
         
         # Botón sí, cancelar
         def do_cancel_fumigation():
-            result = self.fumigation_controller.change_status(fumigation_id, "cancelled")
-            
-            if result["success"]:
-                dialog.destroy()
-                self.load_fumigations()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al cancelar la fumigación"))
+            # Cambiar el estado en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.fumigation_controller.change_status(fumigation_id, "cancelled"),
+                          lambda result: self.on_status_changed(dialog, fumigation_id),
+                          button=yes_button, error_label=error_label, error_text="Error al cancelar la fumigación")
         
         yes_button = ctk.CTkButton(
             button_frame,
@@ -1678,4 +1333,4 @@ class FumigationManagementFrame(ctk.CTkFrame):
             fg_color="#F44336",
             command=do_cancel_fumigation
         )
-        yes_button.pack(side="right")
+        yes_button.pack(side="right")
\ No newline at end of file
@@ -5,6 +5,11 @@ from datetime import datetime
 from controllers.fumigation_controller import FumigationController
 from controllers.field_controller import FieldController
 from controllers.stock_controller import StockController
+from utils.replica_store import get_replica_store
+from utils.name_index import get_name_index
+from utils.task_runner import get_task_runner
+from views.background_action import submit_action
+from views.virtual_table import VirtualTable
 
 class FumigatorDashboardView(ctk.CTkFrame):
     """Vista específica para usuarios con rol de fumigador"""
@@ -23,8 +28,13 @@ class FumigatorDashboardView(ctk.CTkFrame):
         # Obtener información del usuario actual
         self.current_user = self.auth_controller.get_current_user() or {}
         
-        # Lista de fumigaciones asignadas
+        # Lista de fumigaciones asignadas y su índice por estado (el filtro no recorre la lista)
         self.fumigations = []
+        self.fumigations_by_status = {}
+        
+        # Mapas de ID a nombre del índice compartido (sin consultas al filtrar)
+        self.field_map = {}
+        self.stock_map = {}
         
         # Lista de estados disponibles
         self.status_options = ["scheduled", "in_progress", "completed", "cancelled"]
@@ -40,6 +50,23 @@ class FumigatorDashboardView(ctk.CTkFrame):
         
         # Cargar datos
         self.load_fumigations()
+        
+        # Recargar cuando cambien los datos replicados (por ejemplo, ediciones de otros usuarios)
+        self.unsubscribe_changes = get_replica_store().subscribe(["fumigations", "fields", "stock"], self.on_data_changed)
+    
+    def on_data_changed(self, event):
+        """Recarga las tareas con los datos actualizados de la réplica"""
+        self.load_fumigations()
+    
+    def destroy(self):
+        # Dejar de recibir cambios de la réplica y descartar las cargas pendientes al cerrar la vista
+        self.unsubscribe_changes()
+        get_task_runner().cancel(self)
+        super().destroy()
+    
+    def reload(self):
+        """Vuelve a cargar las tareas si la carga se canceló al ocultar la vista"""
+        self.load_fumigations()
     
     def create_interface(self):
         # Configurar grid
@@ -119,38 +146,39 @@ class FumigatorDashboardView(ctk.CTkFrame):
         self.table_container.grid_columnconfigure(0, weight=1)
         self.table_container.grid_rowconfigure(0, weight=1)
         
-        # Crear scrollbar
-        self.scrollable_frame = ctk.CTkScrollableFrame(self.table_container)
-        self.scrollable_frame.grid(row=0, column=0, sticky="nsew")
-        
-        # Configurar grid del scrollable frame
-        self.scrollable_frame.grid_columnconfigure(0, weight=1)  # Campo
-        self.scrollable_frame.grid_columnconfigure(1, weight=1)  # Fecha
-        self.scrollable_frame.grid_columnconfigure(2, weight=1)  # Estado
-        self.scrollable_frame.grid_columnconfigure(3, weight=2)  # Productos
-        self.scrollable_frame.grid_columnconfigure(4, weight=0)  # Acciones
-        
-        # Cabecera de la tabla
-        headers = ["Campo", "Fecha", "Estado", "Productos", "Notas", "Acciones"]
-        for i, header in enumerate(headers):
-            if header == "Notas":
-                label = ctk.CTkLabel(
-                    self.scrollable_frame,
-                    text=header,
-                    font=ctk.CTkFont(weight="bold")
-                )
-                label.grid(row=0, column=i, padx=0, pady=10, sticky="w")
-            else:
-                label = ctk.CTkLabel(
-                    self.scrollable_frame,
-                    text=header,
-                    font=ctk.CTkFont(weight="bold")
-                )
-                label.grid(row=0, column=i, padx=5, pady=10, sticky="w")
-        
-        # Separador
-        separator = ctk.CTkFrame(self.scrollable_frame, height=1, fg_color="gray")
-        separator.grid(row=1, column=0, columnspan=5, sticky="ew", padx=5)
+        # Tabla virtualizada: solo se crean las filas visibles
+        status_colors = {
+            "scheduled": "#FFC107",  # Amarillo
+            "in_progress": "#2196F3",  # Azul
+            "completed": "#4CAF50",  # Verde
+            "cancelled": "#F44336"   # Rojo
+        }
+        columns = [
+            {"header": "Campo", "text": lambda fumigation: self.field_map.get(fumigation.field_id, "Desconocido")},
+            {"header": "Fecha",
+             "text": lambda fumigation: fumigation.date.strftime("%d/%m/%Y") if fumigation.date else "No programada",
+             "sort": lambda fumigation: fumigation.date},
+            {"header": "Estado",
+             "text": lambda fumigation: self.status_labels.get(fumigation.status, "Desconocido"),
+             "color": lambda fumigation: status_colors.get(fumigation.status, "#9E9E9E")},
+            # Productos y notas (truncados para mantener la altura de fila)
+            {"header": "Productos", "text": self.format_products, "weight": 2, "max_chars": 40},
+            {"header": "Notas", "text": lambda fumigation: fumigation.notes or "Sin notas", "weight": 2, "max_chars": 40}
+        ]
+        
+        # Según el estado, se muestran diferentes botones
+        actions = [
+            {"text": "Detalles", "command": lambda fumigation: self.show_fumigation_details(fumigation.id)},
+            {"text": "Iniciar", "fg_color": "#2196F3",
+             "command": lambda fumigation: self.start_fumigation(fumigation.id),
+             "visible": lambda fumigation: fumigation.status == "scheduled"},
+            {"text": "Completar", "fg_color": "#4CAF50",
+             "command": lambda fumigation: self.complete_fumigation(fumigation.id),
+             "visible": lambda fumigation: fumigation.status == "in_progress"}
+        ]
+        
+        self.fumigation_table = VirtualTable(self.table_container, columns, actions)
+        self.fumigation_table.grid(row=0, column=0, sticky="nsew")
     
     def create_summary_card(self, parent, title, value, color):
         """Crea una tarjeta de resumen para mostrar contadores de tareas"""
@@ -184,38 +212,53 @@ class FumigatorDashboardView(ctk.CTkFrame):
     
     def load_fumigations(self):
         """Carga las fumigaciones asignadas al fumigador actual"""
-        # Limpiar tabla existente (excepto cabecera y separador)
-        for widget in self.scrollable_frame.winfo_children():
-            if widget.grid_info()["row"] > 1:  # Solo eliminar filas de datos
-                widget.destroy()
-        
         # Obtener el ID del fumigador actual
         fumigator_id = self.current_user.get('id')
         if not fumigator_id:
             # Mostrar mensaje si no hay ID de usuario
-            no_data_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text="No se puede identificar al fumigador actual",
-                font=ctk.CTkFont(size=14)
-            )
-            no_data_label.grid(row=2, column=0, columnspan=5, padx=10, pady=20)
+            self.fumigation_table.set_items([], empty_text="No se puede identificar al fumigador actual")
             return
         
-        # Obtener fumigaciones asignadas a este fumigador
-        self.fumigations = self.fumigation_controller.get_all(applicator_id=fumigator_id)
+        # Obtener en segundo plano las fumigaciones asignadas a este fumigador
+        self.fumigation_table.set_loading(True)
+        get_task_runner().submit(
+            self,
+            lambda: self.fetch_fumigations(fumigator_id),
+            self.on_fumigations_loaded,
+            self.on_load_error,
+            key="load"
+        )
+    
+    def fetch_fumigations(self, fumigator_id):
+        """Obtiene las fumigaciones y los nombres a mostrar (en segundo plano)"""
+        fumigations = self.fumigation_controller.get_all(applicator_id=fumigator_id)
+        
+        # Traer los nombres de campos y productos modificados desde la última carga
+        name_index = get_name_index()
+        name_index.refresh('fields', 'stock')
+        return fumigations, name_index.names('fields'), name_index.names('stock')
+    
+    def on_load_error(self, error):
+        self.fumigation_table.set_loading(False)
+        self.fumigation_table.set_items([], empty_text=f"Error al cargar tareas: {str(error)}")
+    
+    def on_fumigations_loaded(self, result):
+        """Muestra las fumigaciones obtenidas y actualiza los contadores"""
+        self.fumigations, self.field_map, self.stock_map = result
+        self.fumigation_table.set_loading(False)
         
-        # Actualizar contadores en las tarjetas de resumen
-        counts = {
-            "scheduled": 0,
-            "in_progress": 0,
-            "completed": 0,
-            "cancelled": 0
-        }
+        # Ordenar fumigaciones por fecha (más reciente primero)
+        # Las fumigaciones sin fecha se toman como de hoy (la hora actual se calcula una sola vez)
+        now = datetime.now()
+        self.fumigations.sort(key=lambda x: x.date or now, reverse=True)
         
+        # Agrupar por estado, conservando el orden por fecha dentro de cada grupo
+        self.fumigations_by_status = {}
         for fumigation in self.fumigations:
-            status = fumigation.status or "scheduled"
-            if status in counts:
-                counts[status] += 1
+            self.fumigations_by_status.setdefault(fumigation.status or "scheduled", []).append(fumigation)
+        
+        # Actualizar contadores en las tarjetas de resumen
+        counts = {status: len(self.fumigations_by_status.get(status, [])) for status in self.status_options}
         
         # Actualizar tarjetas de resumen
         self.summary_scheduled.winfo_children()[1].winfo_children()[1].configure(text=str(counts["scheduled"]))
@@ -224,27 +267,14 @@ class FumigatorDashboardView(ctk.CTkFrame):
         
         if not self.fumigations:
             # Mostrar mensaje si no hay fumigaciones
-            no_data_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text="No tienes tareas de fumigación asignadas",
-                font=ctk.CTkFont(size=14)
-            )
-            no_data_label.grid(row=2, column=0, columnspan=5, padx=10, pady=20)
+            self.fumigation_table.set_items([], empty_text="No tienes tareas de fumigación asignadas")
             return
         
-        # Ordenar fumigaciones por fecha (más reciente primero)
-        self.fumigations.sort(key=lambda x: x.date if x.date else datetime.now(), reverse=True)
-        
-        # Mostrar fumigaciones en la tabla
-        self.display_fumigations(self.fumigations)
+        # Mostrar fumigaciones en la tabla (conservando el filtro seleccionado)
+        self.filter_fumigations()
     
     def filter_fumigations(self, *args):
         """Filtra las fumigaciones según el estado seleccionado"""
-        # Limpiar tabla existente (excepto cabecera y separador)
-        for widget in self.scrollable_frame.winfo_children():
-            if widget.grid_info()["row"] > 1:  # Solo eliminar filas de datos
-                widget.destroy()
-        
         # Obtener valor del filtro
         status_filter = self.status_filter_var.get()
         
@@ -255,9 +285,9 @@ class FumigatorDashboardView(ctk.CTkFrame):
                 status_value = key
                 break
         
-        # Filtrar fumigaciones
+        # Filtrar fumigaciones con el índice por estado
         if status_value:
-            filtered_fumigations = [f for f in self.fumigations if f.status == status_value]
+            filtered_fumigations = self.fumigations_by_status.get(status_value, [])
         else:
             filtered_fumigations = self.fumigations
         
@@ -266,130 +296,29 @@ class FumigatorDashboardView(ctk.CTkFrame):
     
     def display_fumigations(self, fumigations):
         """Muestra las fumigaciones en la tabla"""
-        if not fumigations:
-            # Mostrar mensaje si no hay fumigaciones
-            no_data_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text="No hay tareas que coincidan con los filtros",
-                font=ctk.CTkFont(size=14)
-            )
-            no_data_label.grid(row=2, column=0, columnspan=5, padx=10, pady=20)
-            return
-        
-        # Obtener datos adicionales
-        field_map = {}
-        stock_map = {}
-        
-        # Cargar campos
-        fields = self.field_controller.get_all()
-        for field in fields:
-            field_map[field.id] = field.name
-        
-        # Cargar productos
-        stock_items = self.stock_controller.get_all()
-        for item in stock_items:
-            stock_map[item.id] = item.product_name
-        
-        # Mostrar fumigaciones en la tabla
-        for i, fumigation in enumerate(fumigations):
-            row = i + 2  # +2 porque la fila 0 es la cabecera y la 1 es el separador
-            
-            # Campo
-            field_name = field_map.get(fumigation.field_id, "Desconocido")
-            field_label = ctk.CTkLabel(self.scrollable_frame, text=field_name)
-            field_label.grid(row=row, column=0, padx=10, pady=5, sticky="w")
-            
-            # Fecha
-            date_text = fumigation.date.strftime("%d/%m/%Y") if fumigation.date else "No programada"
-            date_label = ctk.CTkLabel(self.scrollable_frame, text=date_text)
-            date_label.grid(row=row, column=1, padx=10, pady=5, sticky="w")
-            
-            # Estado (con colores)
-            status_text = self.status_labels.get(fumigation.status, "Desconocido")
-            status_colors = {
-                "scheduled": "#FFC107",  # Amarillo
-                "in_progress": "#2196F3",  # Azul
-                "completed": "#4CAF50",  # Verde
-                "cancelled": "#F44336"   # Rojo
-            }
-            status_color = status_colors.get(fumigation.status, "#9E9E9E")
-            
-            status_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            status_frame.grid(row=row, column=2, padx=10, pady=5, sticky="w")
-            
-            status_indicator = ctk.CTkFrame(status_frame, width=10, height=10, fg_color=status_color, corner_radius=5)
-            status_indicator.pack(side="left", padx=(0, 5))
-            
-            status_label = ctk.CTkLabel(status_frame, text=status_text)
-            status_label.pack(side="left")
-            
-            # Productos y notas
-            product_names = []
-            for product_id in fumigation.products:
-                product_name = stock_map.get(product_id, "Desconocido")
-                product_names.append(product_name)
-            
-            products_text = ", ".join(product_names) if product_names else "Ninguno"
-            products_label = ctk.CTkLabel(self.scrollable_frame, text=products_text, wraplength=300)
-            products_label.grid(row=row, column=3, padx=10, pady=5, sticky="w")
-            
-            notes_text = fumigation.notes or "Sin notas"
-            notes_label = ctk.CTkLabel(self.scrollable_frame, text=f"Notas: {notes_text}", wraplength=300, anchor="w")
-            notes_label.grid(row=row, column=4, padx=0, pady=5, sticky="w")
-
-            # Frame para botones de acción
-            action_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            action_frame.grid(row=row, column=5, padx=5, pady=5)
-            
-            # Botón para ver detalles
-            details_button = ctk.CTkButton(
-                action_frame,
-                text="Detalles",
-                width=70,
-                height=25,
-                command=lambda fid=fumigation.id: self.show_fumigation_details(fid)
-            )
-            details_button.pack(side="top", padx=(0, 5), pady=(0, 5))
-            
-            # Según el estado, mostrar diferentes botones
-            if fumigation.status == "scheduled":
-                # Botón para iniciar fumigación
-                start_button = ctk.CTkButton(
-                    action_frame,
-                    text="Iniciar",
-                    width=70,
-                    height=25,
-                    fg_color="#2196F3",
-                    command=lambda fid=fumigation.id: self.start_fumigation(fid)
-                )
-                start_button.pack(side="top", padx=(0, 5), pady=(0, 5))
-            
-            elif fumigation.status == "in_progress":
-                # Botón para completar
-                complete_button = ctk.CTkButton(
-                    action_frame,
-                    text="Completar",
-                    width=70,
-                    height=25,
-                    fg_color="#4CAF50",
-                    command=lambda fid=fumigation.id: self.complete_fumigation(fid)
-                )
-                complete_button.pack(side="top", padx=(0, 5))
-            
-            # Agregar un separador después de cada fila
-            if i < len(fumigations) - 1:
-                row_separator = ctk.CTkFrame(self.scrollable_frame, height=1, fg_color="gray70")
-                row_separator.grid(row=row+1, column=0, columnspan=5, sticky="ew", padx=20)
+        # Solo se reconfiguran las filas cuyo contenido cambió
+        self.fumigation_table.update_items(fumigations, empty_text="No hay tareas que coincidan con los filtros")
+    
+    def format_products(self, fumigation):
+        """Texto de la columna Productos con los nombres del índice compartido"""
+        product_names = [self.stock_map.get(product_id, "Desconocido") for product_id in fumigation.products]
+        return ", ".join(product_names) if product_names else "Ninguno"
     
     def show_fumigation_details(self, fumigation_id):
-        """Muestra los detalles de una fumigación"""
-        # Aquí podemos reutilizar gran parte del código de la vista de fumigación regular
-        from views.fumigation_frames import FumigationManagementFrame
-        
+        """Obtiene la fumigación y sus datos relacionados en segundo plano y luego muestra los detalles"""
+        get_task_runner().submit(
+            self,
+            lambda: self.fetch_fumigation_details(fumigation_id),
+            lambda details: self.open_fumigation_details(fumigation_id, details),
+            key="details"
+        )
+    
+    def fetch_fumigation_details(self, fumigation_id):
+        """Retorna (fumigación, campo, productos) para el diálogo de detalles, o None (en segundo plano)"""
         # Obtener datos de la fumigación
         fumigation = self.fumigation_controller.get_by_id(fumigation_id)
         if not fumigation:
-            return
+            return None
         
         # Obtener datos adicionales
         field = self.field_controller.get_by_id(fumigation.field_id)
@@ -404,6 +333,14 @@ class FumigatorDashboardView(ctk.CTkFrame):
             else:
                 product_details.append(f"Producto ID: {product_id}")
         
+        return fumigation, field_name, product_details
+    
+    def open_fumigation_details(self, fumigation_id, details):
+        """Muestra los detalles de una fumigación"""
+        if not details:
+            return
+        fumigation, field_name, product_details = details
+        
         # Crear ventana de diálogo
         dialog = ctk.CTkToplevel(self)
         dialog.title("Detalles de Fumigación")
@@ -594,13 +531,13 @@ class FumigatorDashboardView(ctk.CTkFrame):
         
         # Botón iniciar
         def do_start_fumigation():
-            result = self.fumigation_controller.change_status(fumigation_id, "in_progress")
-            
-            if result["success"]:
+            def on_changed(result):
                 dialog.destroy()
                 self.load_fumigations()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al iniciar la fumigación"))
+            
+            # Cambiar el estado en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.fumigation_controller.change_status(fumigation_id, "in_progress"),
+                          on_changed, button=start_button, error_label=error_label, error_text="Error al iniciar la fumigación")
         
         start_button = ctk.CTkButton(
             button_frame,
@@ -660,13 +597,13 @@ class FumigatorDashboardView(ctk.CTkFrame):
         
         # Botón completar
         def do_complete_fumigation():
-            result = self.fumigation_controller.change_status(fumigation_id, "completed")
-            
-            if result["success"]:
+            def on_changed(result):
                 dialog.destroy()
                 self.load_fumigations()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al completar la fumigación"))
+            
+            # Cambiar el estado en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.fumigation_controller.change_status(fumigation_id, "completed"),
+                          on_changed, button=complete_button, error_label=error_label, error_text="Error al completar la fumigación")
         
         complete_button = ctk.CTkButton(
             button_frame,
@@ -674,4 +611,4 @@ class FumigatorDashboardView(ctk.CTkFrame):
             fg_color="#4CAF50",
             command=do_complete_fumigation
         )
-        complete_button.pack(side="right")
+        complete_button.pack(side="right")
\ No newline at end of file
@@ -0,0 +1,207 @@
+# views/main_panel.py
+import customtkinter as ctk
+from datetime import datetime
+from utils.dashboard_stats import get_dashboard_stats, SCHEDULED_DAYS, EXPIRING_DAYS
+from utils.replica_store import get_replica_store
+from utils.task_runner import get_task_runner
+
+class MainPanelFrame(ctk.CTkFrame):
+    """Panel principal con los contadores y alertas del sistema"""
+    
+    def __init__(self, master, auth_controller):
+        super().__init__(master)
+        self.master = master
+        self.auth_controller = auth_controller
+        self.stats = get_dashboard_stats()
+        
+        # Etiquetas de valor de cada tarjeta (se actualizan sin recrear la tarjeta)
+        self.card_values = {}
+        self.alerts = None
+        self.refresh_job = None
+        
+        # Crear interfaz
+        self.create_interface()
+        
+        # Mostrar al instante los últimos contadores y recalcularlos si vencieron
+        cached = self.stats.cached()
+        if cached is not None:
+            self.show_counts(cached)
+        self.refresh_if_stale()
+        
+        # Recalcular cuando cambien los datos replicados o al volver a mostrar el panel
+        self.unsubscribe_changes = get_replica_store().subscribe(
+            ["fields", "warehouses", "stock", "fumigations"], self.on_data_changed)
+        self.bind("<Map>", lambda event: self.refresh_if_stale())
+    
+    def on_data_changed(self, event):
+        """Marca los contadores como vencidos y los recalcula en segundo plano"""
+        self.stats.invalidate()
+        self.refresh_if_stale()
+    
+    def destroy(self):
+        # Dejar de recibir cambios de la réplica y descartar las cargas pendientes al cerrar la vista
+        self.unsubscribe_changes()
+        if self.refresh_job is not None:
+            self.after_cancel(self.refresh_job)
+        get_task_runner().cancel(self)
+        super().destroy()
+    
+    def on_hide(self):
+        # Oculto no se recalcula; el evento <Map> lo retoma al volver a mostrarlo
+        if self.refresh_job is not None:
+            self.after_cancel(self.refresh_job)
+            self.refresh_job = None
+    
+    def create_interface(self):
+        # Configurar grid
+        self.grid_columnconfigure((0, 1, 2), weight=1)
+        self.grid_rowconfigure(3, weight=1)
+        
+        # Título
+        title_label = ctk.CTkLabel(
+            self,
+            text="Panel Principal",
+            font=ctk.CTkFont(size=20, weight="bold")
+        )
+        title_label.grid(row=0, column=0, columnspan=2, padx=20, pady=20, sticky="w")
+        
+        # Hora de la última actualización
+        self.updated_label = ctk.CTkLabel(self, text="Actualizando...", text_color="gray")
+        self.updated_label.grid(row=0, column=2, padx=20, pady=20, sticky="e")
+        
+        # Tarjetas de resumen
+        self.create_summary_card(1, 0, "fields", "Campos Registrados", "green")
+        self.create_summary_card(1, 1, "warehouses", "Almacenes", "blue")
+        self.create_summary_card(1, 2, "stock", "Productos en Stock", "purple")
+        self.create_summary_card(2, 0, "scheduled_week", f"Fumigaciones próximos {SCHEDULED_DAYS} días", "orange")
+        self.create_summary_card(2, 1, "expiring_soon", f"Productos por vencer ({EXPIRING_DAYS} días)", "orange")
+        
+        # Panel de alertas
+        alerts_frame = ctk.CTkFrame(self)
+        alerts_frame.grid(row=3, column=0, columnspan=3, padx=10, pady=10, sticky="nsew")
+        
+        alerts_title = ctk.CTkLabel(
+            alerts_frame,
+            text="Alertas",
+            font=ctk.CTkFont(size=16, weight="bold")
+        )
+        alerts_title.pack(anchor="w", padx=15, pady=15)
+        
+        # Las alertas se arman con los contadores
+        self.alerts_container = ctk.CTkFrame(alerts_frame, fg_color="transparent")
+        self.alerts_container.pack(fill="both", expand=True)
+    
+    def create_summary_card(self, row, column, key, title, color):
+        """Crea una tarjeta de resumen y guarda su etiqueta de valor"""
+        # Colores según el tema
+        colors = {
+            "green": ("#E5F5E5", "#1F5B1F"),
+            "blue": ("#E5F0FF", "#1F3D7A"),
+            "purple": ("#F0E5FF", "#5F1F7A"),
+            "orange": ("#FFF2E5", "#7A4B1F")
+        }
+        
+        card = ctk.CTkFrame(self, fg_color=colors[color])
+        card.grid(row=row, column=column, padx=10, pady=10, sticky="nsew")
+        
+        # Título de la tarjeta
+        card_title = ctk.CTkLabel(
+            card,
+            text=title,
+            font=ctk.CTkFont(size=14)
+        )
+        card_title.pack(anchor="w", padx=15, pady=(15, 5))
+        
+        # Valor (hasta tener los contadores)
+        card_value = ctk.CTkLabel(
+            card,
+            text="...",
+            font=ctk.CTkFont(size=28, weight="bold")
+        )
+        card_value.pack(anchor="w", padx=15, pady=(5, 15))
+        self.card_values[key] = card_value
+    
+    def refresh_if_stale(self):
+        """Recalcula los contadores en segundo plano si vencieron y el panel está visible"""
+        if self.refresh_job is not None:
+            self.after_cancel(self.refresh_job)
+        
+        if self.stats.is_fresh():
+            # Volver a revisar cuando venzan
+            self.refresh_job = self.after(int(self.stats.ttl * 1000), self.refresh_if_stale)
+            return
+        
+        self.refresh_job = None
+        if not self.winfo_ismapped():
+            # Oculto (otra pestaña): se recalcula al volver a mostrarlo
+            return
+        
+        get_task_runner().submit(self, self.stats.refresh, self.on_counts_loaded, self.on_counts_error, key="stats")
+    
+    def on_counts_loaded(self, counts):
+        self.show_counts(counts)
+        self.updated_label.configure(text=f"Actualizado: {datetime.now().strftime('%H:%M:%S')}")
+        self.refresh_job = self.after(int(self.stats.ttl * 1000), self.refresh_if_stale)
+    
+    def on_counts_error(self, error):
+        print(f"Error al calcular contadores del panel: {str(error)}")
+        self.updated_label.configure(text="No se pudieron actualizar los datos")
+        self.refresh_job = self.after(int(self.stats.ttl * 1000), self.refresh_if_stale)
+    
+    def show_counts(self, counts):
+        """Actualiza los valores de las tarjetas y las alertas"""
+        for key, label in self.card_values.items():
+            label.configure(text=str(counts.get(key, 0)))
+        self.show_alerts(self.build_alerts(counts))
+    
+    def build_alerts(self, counts):
+        """Arma las alertas (mensaje, prioridad) a partir de los contadores"""
+        alerts = []
+        if counts.get("overdue"):
+            alerts.append((f"{counts['overdue']} fumigaciones programadas están atrasadas", "high"))
+        if counts.get("expired"):
+            alerts.append((f"{counts['expired']} productos en stock están vencidos", "high"))
+        if counts.get("expiring_soon"):
+            alerts.append((f"{counts['expiring_soon']} productos vencen en los próximos {EXPIRING_DAYS} días", "medium"))
+        if counts.get("scheduled_week"):
+            alerts.append((f"{counts['scheduled_week']} fumigaciones programadas para los próximos {SCHEDULED_DAYS} días", "low"))
+        if not counts.get("fields") or not counts.get("warehouses"):
+            alerts.append(("Configure sus campos y almacenes", "medium"))
+        if not alerts:
+            alerts.append(("No hay alertas pendientes", "low"))
+        return alerts
+    
+    def show_alerts(self, alerts):
+        """Vuelve a crear las alertas solo si cambiaron"""
+        if alerts == self.alerts:
+            return
+        self.alerts = alerts
+        
+        for widget in self.alerts_container.winfo_children():
+            widget.destroy()
+        for message, priority in alerts:
+            self.create_alert(message, priority)
+    
+    def create_alert(self, message, priority):
+        # Colores según prioridad
+        colors = {
+            "high": "#FF5252",
+            "medium": "#FFB74D",
+            "low": "#4CAF50"
+        }
+        
+        alert_frame = ctk.CTkFrame(self.alerts_container)
+        alert_frame.pack(fill="x", padx=15, pady=5)
+        
+        # Indicador de prioridad
+        priority_indicator = ctk.CTkFrame(alert_frame, width=5, fg_color=colors[priority])
+        priority_indicator.pack(side="left", fill="y")
+        
+        # Mensaje
+        alert_message = ctk.CTkLabel(
+            alert_frame,
+            text=message,
+            font=ctk.CTkFont(size=12),
+            anchor="w"
+        )
+        alert_message.pack(side="left", padx=10, pady=10, fill="x", expand=True)
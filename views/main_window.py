@@ -2,6 +2,12 @@
 import customtkinter as ctk
 from views.auth.login_frame import LoginFrame
 from views.dashboard_frame import DashboardFrame
+from utils.replica_store import get_replica_store
+from utils.cache_manager import get_cache_manager
+from utils.name_index import get_name_index
+from utils.lot_allocator import get_lot_allocator
+from utils.dashboard_stats import get_dashboard_stats
+from utils.task_runner import get_task_runner
 
 class MainWindow(ctk.CTkFrame):
     def __init__(self, master, auth_controller):
@@ -13,6 +19,9 @@ class MainWindow(ctk.CTkFrame):
         self.content_frame = ctk.CTkFrame(self)
         self.content_frame.pack(fill="both", expand=True)
         
+        # Entregar en el hilo de la interfaz los resultados de las tareas en segundo plano
+        get_task_runner().pump(self)
+        
         # Estado inicial - mostrar login si no está autenticado
         if self.auth_controller.is_authenticated():
             self.show_dashboard()
@@ -35,8 +44,14 @@ class MainWindow(ctk.CTkFrame):
     
         # Mostrar dashboard
         try:
-            # Verificar si el usuario es fumigador
             current_user = self.auth_controller.get_current_user() or {}
+            
+            # Iniciar la réplica local (con el mirror en disco del usuario) y entregar sus cambios en el hilo de la interfaz
+            replica = get_replica_store()
+            replica.start(scope=current_user.get('id'))
+            replica.pump(self)
+            
+            # Verificar si el usuario es fumigador
             is_fumigator = current_user.get('role') == 'fumigator'
             
             if is_fumigator:
@@ -62,4 +77,9 @@ class MainWindow(ctk.CTkFrame):
     
     def on_logout(self):
         self.auth_controller.logout()
+        get_replica_store().stop()
+        get_cache_manager().clear()
+        get_name_index().clear()
+        get_dashboard_stats().clear()
+        get_lot_allocator().clear()
         self.show_login()
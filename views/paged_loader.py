@@ -0,0 +1,108 @@
+# views/paged_loader.py
+from utils.task_runner import get_task_runner
+
+class PagedLoader:
+    """
+    Carga incremental de una lista paginada dentro de un VirtualTable (o de un
+    CTkScrollableFrame).
+
+    fetch_page(cursor) debe retornar {"items", "next_cursor", "has_more"} (ver
+    utils/pagination.py) y on_page(items, start_index) dibuja las filas nuevas.
+    Al acercarse el scroll al final de la tabla se pide la página siguiente.
+
+    fetch_page se ejecuta en segundo plano (utils/task_runner.py), así que no
+    debe leer widgets ni variables de Tk; on_page se llama en el hilo de Tk.
+    Si se llama a reset() mientras se carga una página, esa página se descarta.
+    """
+
+    def __init__(self, scrollable_frame, fetch_page, on_page, threshold=0.9):
+        self.scrollable_frame = scrollable_frame
+        self.fetch_page = fetch_page
+        self.on_page = on_page
+        self.threshold = threshold
+
+        self.items = []
+        self.cursor = None
+        self.has_more = False
+        self.loading = False
+        self.paused = False  # Por ejemplo mientras se muestra un resultado de búsqueda
+        self._scheduled = False
+
+        self._bind_scroll()
+
+    def reset(self):
+        """Descarta lo cargado y pide la primera página"""
+        self.items = []
+        self.cursor = None
+        self.has_more = True
+        self.paused = False
+        self.loading = False  # La página en curso, si la hay, queda descartada
+        self.load_more()
+
+    def load_more(self):
+        """Pide en segundo plano la página siguiente si hay más resultados"""
+        self._scheduled = False
+        if self.loading or self.paused or not self.has_more:
+            return
+
+        self.loading = True
+        self._set_loading(True)
+        cursor = self.cursor
+        get_task_runner().submit(
+            self.scrollable_frame,
+            lambda: self.fetch_page(cursor),
+            self._on_page_loaded,
+            self._on_page_error,
+            key="page"
+        )
+
+    def _on_page_loaded(self, page):
+        self.loading = False
+        self._set_loading(False)
+        if self.paused:
+            # Mientras se muestra otra cosa (por ejemplo, una búsqueda) la página no se agrega
+            return
+
+        start_index = len(self.items)
+        self.items.extend(page["items"])
+        self.cursor = page["next_cursor"]
+        self.has_more = page["has_more"]
+
+        self.on_page(page["items"], start_index)
+
+    def _on_page_error(self, error):
+        # Se puede reintentar al volver a hacer scroll
+        self.loading = False
+        self._set_loading(False)
+        print(f"Error al cargar página: {str(error)}")
+
+    def _set_loading(self, loading):
+        if hasattr(self.scrollable_frame, "set_loading"):
+            self.scrollable_frame.set_loading(loading)
+
+    def _bind_scroll(self):
+        """Intercepta la posición del scroll del canvas interno del CTkScrollableFrame"""
+        if hasattr(self.scrollable_frame, "set_near_end_callback"):
+            # VirtualTable avisa por sí misma cuando el scroll se acerca al final
+            self.scrollable_frame.set_near_end_callback(self._schedule_load_more, self.threshold)
+            return
+
+        canvas = getattr(self.scrollable_frame, "_parent_canvas", None)
+        scrollbar = getattr(self.scrollable_frame, "_scrollbar", None)
+        if canvas is None or scrollbar is None:
+            return
+
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            # Si el contenido no llena la vista, last es 1.0 y también se carga más
+            if float(last) >= self.threshold:
+                self._schedule_load_more()
+
+        canvas.configure(yscrollcommand=on_scroll)
+
+    def _schedule_load_more(self):
+        """Pide la página siguiente fuera del callback de scroll, una sola vez"""
+        if self._scheduled or self.loading or self.paused or not self.has_more:
+            return
+        self._scheduled = True
+        self.scrollable_frame.after_idle(self.load_more)
\ No newline at end of file
@@ -4,6 +4,11 @@ from datetime import datetime
 from controllers.stock_controller import StockController
 from controllers.warehouse_controller import WarehouseController
 from models.stock import Stock
+from views.background_action import submit_action
+from views.paged_loader import PagedLoader
+from views.virtual_table import VirtualTable
+from utils.replica_store import get_replica_store
+from utils.task_runner import get_task_runner
 
 class StockManagementFrame(ctk.CTkFrame):
     def __init__(self, master, auth_controller):
@@ -22,22 +27,95 @@ class StockManagementFrame(ctk.CTkFrame):
         # Lista de estados
         self.status_options = ["purchased", "received"]
         
-        # Obtener lista de almacenes
+        # Lista de almacenes (se carga en segundo plano)
         self.warehouses = []
-        self.load_warehouses()
+        self.warehouse_map = {}
+        self.warehouse_ids = {}  # Nombre -> ID, para resolver el filtro sin recorrer la lista
         
         # Lista de productos en stock
         self.stock_items = []
         
+        # Filtros de la consulta, tomados de la interfaz al recargar
+        self.stock_filters = {"warehouse_id": None, "status": None, "category": None}
+        
         # Crear interfaz
         self.create_interface()
         
+        # Obtener lista de almacenes
+        self.load_warehouses()
+        
+        # Carga por páginas a medida que se hace scroll
+        self.stock_loader = PagedLoader(self.stock_table, self.fetch_stock_page, self.display_stock_page)
+        
         # Cargar datos
         self.load_stock()
+        
+        # Recargar cuando cambien los datos replicados (por ejemplo, ediciones de otros usuarios)
+        self.unsubscribe_changes = get_replica_store().subscribe(["stock", "warehouses"], self.on_data_changed)
+    
+    def on_data_changed(self, event):
+        """Recarga la tabla con los datos actualizados de la réplica"""
+        if event["collection"] == "warehouses":
+            self.load_warehouses()
+            return
+        
+        # Las modificaciones y bajas se aplican fila por fila; las altas requieren recargar
+        replica = get_replica_store()
+        if event["added"] or not replica.is_synced("stock"):
+            self.load_stock()
+            return
+        
+        changed = []
+        for stock_id in event["modified"]:
+            data = replica.get("stock", stock_id)
+            if data is not None:
+                changed.append(Stock.from_dict(stock_id, data))
+        self.patch_rows(changed, event["removed"])
+    
+    def destroy(self):
+        # Dejar de recibir cambios de la réplica y descartar las cargas pendientes al cerrar la vista
+        self.unsubscribe_changes()
+        get_task_runner().cancel(self)
+        super().destroy()
+    
+    def reload(self):
+        """Vuelve a cargar almacenes y stock si la carga se canceló al ocultar la vista"""
+        self.load_warehouses()
+        self.load_stock()
     
     def load_warehouses(self):
-        """Carga la lista de almacenes disponibles"""
-        self.warehouses = self.warehouse_controller.get_all()
+        """Carga en segundo plano la lista de almacenes disponibles"""
+        get_task_runner().submit(self, self.warehouse_controller.get_all, self.on_warehouses_loaded, key="warehouses")
+    
+    def refresh_rows(self, stock_ids):
+        """Vuelve a leer en segundo plano los productos indicados y actualiza solo sus filas"""
+        get_task_runner().submit(
+            self,
+            lambda: [self.stock_controller.get_by_id(stock_id) for stock_id in stock_ids],
+            lambda items: self.patch_rows([item for item in items if item])
+        )
+    
+    def patch_rows(self, changed, removed=()):
+        """Actualiza las filas de los productos cambiados; recarga si alguno no estaba en la tabla"""
+        if not self.stock_table.patch(changed, removed, accept=self.matches_filters):
+            self.load_stock()
+    
+    def matches_filters(self, item):
+        """Indica si el producto cumple los filtros de la consulta actual"""
+        filters = self.stock_filters
+        return ((filters["warehouse_id"] is None or item.warehouse_id == filters["warehouse_id"]) and
+                (filters["status"] is None or item.status == filters["status"]) and
+                (filters["category"] is None or item.category == filters["category"]))
+    
+    def on_warehouses_loaded(self, warehouses):
+        self.warehouses = warehouses
+        self.warehouse_map = {w.id: w.name for w in self.warehouses}
+        self.warehouse_ids = {w.name: w.id for w in self.warehouses}
+        
+        # Actualizar opciones del filtro de almacén y los nombres de la tabla
+        warehouse_options = ["Todos los almacenes"] + [w.name for w in self.warehouses]
+        self.warehouse_filter.configure(values=warehouse_options)
+        self.stock_table.refresh()
     
     def create_interface(self):
         # Configurar grid
@@ -115,7 +193,17 @@ class StockManagementFrame(ctk.CTkFrame):
             variable=self.status_filter_var,
             command=self.filter_stock
         )
-        self.status_filter.pack(side="left")
+        self.status_filter.pack(side="left", padx=(0, 10))
+        
+        # Filtro por categoría
+        self.category_filter_var = ctk.StringVar(value="Todas las categorías")
+        self.category_filter = ctk.CTkOptionMenu(
+            self.filter_frame,
+            values=["Todas las categorías"] + self.categories,
+            variable=self.category_filter_var,
+            command=self.filter_stock
+        )
+        self.category_filter.pack(side="left")
         
         # Frame para la tabla con scroll
         self.table_container = ctk.CTkFrame(self)
@@ -125,167 +213,67 @@ class StockManagementFrame(ctk.CTkFrame):
         self.table_container.grid_columnconfigure(0, weight=1)
         self.table_container.grid_rowconfigure(0, weight=1)
         
-        # Crear scrollbar
-        self.scrollable_frame = ctk.CTkScrollableFrame(self.table_container)
-        self.scrollable_frame.grid(row=0, column=0, sticky="nsew")
-        
-        # Configurar grid del scrollable frame
-        self.scrollable_frame.grid_columnconfigure((0, 1, 2, 3, 4, 5), weight=1)
-        self.scrollable_frame.grid_columnconfigure(6, weight=0)
-        
-        # Cabecera de la tabla
-        headers = ["Producto", "Cantidad", "Unidad", "Almacén", "Estado", "Categoría", "Acciones"]
-        for i, header in enumerate(headers):
-            label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text=header,
-                font=ctk.CTkFont(weight="bold")
-            )
-            label.grid(row=0, column=i, padx=10, pady=10, sticky="w")
-        
-        # Separador
-        separator = ctk.CTkFrame(self.scrollable_frame, height=1, fg_color="gray")
-        separator.grid(row=1, column=0, columnspan=7, sticky="ew", padx=5)
+        # Tabla virtualizada: solo se crean las filas visibles
+        columns = [
+            {"header": "Producto", "text": lambda item: item.product_name},
+            {"header": "Cantidad", "text": lambda item: item.quantity or ""},
+            {"header": "Unidad", "text": lambda item: item.unit},
+            {"header": "Almacén", "text": lambda item: self.warehouse_map.get(item.warehouse_id, "Sin asignar")},
+            {"header": "Estado",
+             "text": lambda item: "Recibido" if item.status == "received" else "Comprado",
+             "color": lambda item: "#4CAF50" if item.status == "received" else "#FFC107"},
+            {"header": "Categoría", "text": lambda item: item.category or "Sin categoría"}
+        ]
+        actions = [
+            {"text": "Editar", "command": lambda item: self.show_edit_stock(item.id)},
+            {"text": "Eliminar", "fg_color": "#FF5252", "command": lambda item: self.confirm_delete(item.id)}
+        ]
+        self.stock_table = VirtualTable(self.table_container, columns, actions)
+        self.stock_table.grid(row=0, column=0, sticky="nsew")
     
     def load_stock(self):
-        """Carga todos los productos en stock"""
-        # Limpiar tabla existente (excepto cabecera y separador)
-        for widget in self.scrollable_frame.winfo_children():
-            if widget.grid_info()["row"] > 1:  # Solo eliminar filas de datos
-                widget.destroy()
+        """Carga la primera página de productos en stock según los filtros seleccionados"""
+        filtered = (self.warehouse_filter_var.get() != "Todos los almacenes" or
+                    self.status_filter_var.get() != "Todos los estados" or
+                    self.category_filter_var.get() != "Todas las categorías")
+        self.stock_empty_text = "No hay productos que coincidan con los filtros" if filtered else "No hay productos en inventario"
         
-        # Obtener productos en stock
-        self.stock_items = self.stock_controller.get_all()
+        # Encontrar ID del almacén
+        warehouse_id = self.warehouse_ids.get(self.warehouse_filter_var.get())
         
-        if not self.stock_items:
-            # Mostrar mensaje si no hay productos
-            no_data_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text="No hay productos en inventario",
-                font=ctk.CTkFont(size=14)
-            )
-            no_data_label.grid(row=2, column=0, columnspan=7, padx=10, pady=20)
-            return
+        # Convertir estado a valor interno
+        status_map = {"Comprado": "purchased", "Recibido": "received"}
+        status_value = status_map.get(self.status_filter_var.get())
         
-        # Mostrar productos en la tabla
-        self.display_stock_items(self.stock_items)
-    
-    def display_stock_items(self, items):
-        """Muestra los elementos de stock en la tabla"""
-        if not items:
-            # Mostrar mensaje si no hay productos
-            no_data_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text="No hay productos que coincidan con los filtros",
-                font=ctk.CTkFont(size=14)
-            )
-            no_data_label.grid(row=2, column=0, columnspan=7, padx=10, pady=20)
-            return
+        category = self.category_filter_var.get()
+        if category not in self.categories:
+            category = None
         
-        # Crear mapa de ID de almacén a nombre
-        warehouse_map = {w.id: w.name for w in self.warehouses}
+        # Las páginas se piden en segundo plano, así que los filtros se leen aquí.
+        # Con la réplica sincronizada se resuelven con los índices en memoria, sin red
+        self.stock_filters = {"warehouse_id": warehouse_id, "status": status_value, "category": category}
         
-        # Mostrar productos en la tabla
-        for i, item in enumerate(items):
-            row = i + 2  # +2 porque la fila 0 es la cabecera y la 1 es el separador
-            
-            # Producto
-            product_label = ctk.CTkLabel(self.scrollable_frame, text=item.product_name or "")
-            product_label.grid(row=row, column=0, padx=10, pady=5, sticky="w")
-            
-            # Cantidad
-            quantity_label = ctk.CTkLabel(self.scrollable_frame, text=str(item.quantity or ""))
-            quantity_label.grid(row=row, column=1, padx=10, pady=5, sticky="w")
-            
-            # Unidad
-            unit_label = ctk.CTkLabel(self.scrollable_frame, text=item.unit or "")
-            unit_label.grid(row=row, column=2, padx=10, pady=5, sticky="w")
-            
-            # Almacén
-            warehouse_name = warehouse_map.get(item.warehouse_id, "Sin asignar")
-            warehouse_label = ctk.CTkLabel(self.scrollable_frame, text=warehouse_name)
-            warehouse_label.grid(row=row, column=3, padx=10, pady=5, sticky="w")
-            
-            # Estado
-            status_text = "Recibido" if item.status == "received" else "Comprado"
-            status_color = "#4CAF50" if item.status == "received" else "#FFC107"
-            
-            status_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            status_frame.grid(row=row, column=4, padx=10, pady=5, sticky="w")
-            
-            status_indicator = ctk.CTkFrame(status_frame, width=10, height=10, fg_color=status_color, corner_radius=5)
-            status_indicator.pack(side="left", padx=(0, 5))
-            
-            status_label = ctk.CTkLabel(status_frame, text=status_text)
-            status_label.pack(side="left")
-            
-            # Categoría
-            category_label = ctk.CTkLabel(self.scrollable_frame, text=item.category or "Sin categoría")
-            category_label.grid(row=row, column=5, padx=10, pady=5, sticky="w")
-            
-            # Frame para botones de acción
-            action_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            action_frame.grid(row=row, column=6, padx=10, pady=5)
-            
-            # Botón editar
-            edit_button = ctk.CTkButton(
-                action_frame,
-                text="Editar",
-                width=70,
-                height=25,
-                command=lambda sid=item.id: self.show_edit_stock(sid)
-            )
-            edit_button.pack(side="left", padx=(0, 5))
-            
-            # Botón eliminar
-            delete_button = ctk.CTkButton(
-                action_frame,
-                text="Eliminar",
-                width=70,
-                height=25,
-                fg_color="#FF5252",
-                command=lambda sid=item.id: self.confirm_delete(sid)
-            )
-            delete_button.pack(side="left")
-            
-            # Agregar un separador después de cada fila
-            if i < len(items) - 1:
-                row_separator = ctk.CTkFrame(self.scrollable_frame, height=1, fg_color="gray70")
-                row_separator.grid(row=row+1, column=0, columnspan=7, sticky="ew", padx=20)
+        # Obtener la primera página; las siguientes se cargan al hacer scroll.
+        # Las filas actuales se mantienen hasta que llega la página y se concilian con ella
+        self.stock_loader.reset()
+        self.stock_items = self.stock_loader.items
+    
+    def fetch_stock_page(self, cursor):
+        """Obtiene una página de productos aplicando los filtros en la consulta (en segundo plano)"""
+        return self.stock_controller.get_page(cursor=cursor, **self.stock_filters)
+    
+    def display_stock_page(self, items, start_index):
+        """Muestra los productos de una página recién cargada"""
+        if start_index == 0:
+            # Primera página: actualizar solo las filas que cambiaron
+            self.stock_table.update_items(items, empty_text=self.stock_empty_text)
+        elif items:
+            self.stock_table.append_items(items)
     
     def filter_stock(self, *args):
         """Filtra los productos en stock según los criterios seleccionados"""
-        # Limpiar tabla existente (excepto cabecera y separador)
-        for widget in self.scrollable_frame.winfo_children():
-            if widget.grid_info()["row"] > 1:  # Solo eliminar filas de datos
-                widget.destroy()
-        
-        # Obtener valores de filtros
-        warehouse_filter = self.warehouse_filter_var.get()
-        status_filter = self.status_filter_var.get()
-        
-        # Filtrar por almacén
-        filtered_items = self.stock_items
-        if warehouse_filter != "Todos los almacenes":
-            # Encontrar ID del almacén
-            warehouse_id = None
-            for w in self.warehouses:
-                if w.name == warehouse_filter:
-                    warehouse_id = w.id
-                    break
-            
-            if warehouse_id:
-                filtered_items = [item for item in filtered_items if item.warehouse_id == warehouse_id]
-        
-        # Filtrar por estado
-        if status_filter != "Todos los estados":
-            status_map = {"Comprado": "purchased", "Recibido": "received"}
-            status_value = status_map.get(status_filter)
-            if status_value:
-                filtered_items = [item for item in filtered_items if item.status == status_value]
-        
-        # Mostrar productos filtrados
-        self.display_stock_items(filtered_items)
+        # Los filtros se aplican en la consulta, así que se recarga desde la primera página
+        self.load_stock()
     
     def show_add_stock(self):
         """Muestra el formulario para agregar un nuevo producto al stock"""
@@ -592,14 +580,13 @@ class StockManagementFrame(ctk.CTkFrame):
                 expiry_date=expiry_date
             )
 
-            # Guardar en la base de datos
-            result = self.stock_controller.create(stock_item)
-           
-            if result["success"]:
+            def on_saved(result):
                 dialog.destroy()
                 self.load_stock()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al guardar el producto"))
+            
+            # Guardar en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.stock_controller.create(stock_item), on_saved,
+                          button=save_button, error_label=error_label, error_text="Error al guardar el producto")
        
         save_button = ctk.CTkButton(
             button_frame,
@@ -625,9 +612,16 @@ class StockManagementFrame(ctk.CTkFrame):
         year_option.configure(state=state)
    
     def show_edit_stock(self, stock_id):
+        """Obtiene el producto en segundo plano y luego muestra el formulario de edición"""
+        get_task_runner().submit(
+            self,
+            lambda: self.stock_controller.get_by_id(stock_id),
+            lambda stock_item: self.open_edit_stock(stock_id, stock_item),
+            key="edit"
+        )
+    
+    def open_edit_stock(self, stock_id, stock_item):
         """Muestra el formulario para editar un producto existente"""
-        # Obtener datos del producto
-        stock_item = self.stock_controller.get_by_id(stock_id)
         if not stock_item:
             return
         
@@ -821,14 +815,13 @@ class StockManagementFrame(ctk.CTkFrame):
                 "status": status,
                 "category": category
             }
-            # Actualizar en la base de datos
-            result = self.stock_controller.update(stock_item.id, updated_data)
-           
-            if result["success"]:
+            def on_updated(result):
                 dialog.destroy()
-                self.load_stock()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al actualizar el producto"))
+                self.refresh_rows([stock_item.id])  # Actualizar solo esta fila
+            
+            # Actualizar en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.stock_controller.update(stock_item.id, updated_data), on_updated,
+                          button=save_button, error_label=error_label, error_text="Error al actualizar el producto")
        
         save_button = ctk.CTkButton(
             button_frame,
@@ -878,9 +871,16 @@ class StockManagementFrame(ctk.CTkFrame):
            
             return
         
-        # Filtrar productos recibidos y con almacén asignado
-        transfer_items = [item for item in self.stock_items if item.status == "received" and item.warehouse_id]
-
+        # Obtener en segundo plano los productos recibidos y con almacén asignado (no solo las páginas cargadas)
+        get_task_runner().submit(
+            self,
+            lambda: [item for item in self.stock_controller.get_all(status="received") if item.warehouse_id],
+            self.open_transfer_stock,
+            key="transfer"
+        )
+    
+    def open_transfer_stock(self, transfer_items):
+        """Muestra el formulario de transferencia con los productos disponibles"""
         if not transfer_items:
             # Mostrar mensaje de error
             dialog = ctk.CTkToplevel(self)
@@ -1076,18 +1076,15 @@ class StockManagementFrame(ctk.CTkFrame):
                 error_label.configure(text="Almacén destino no encontrado")
                 return
             
-            # Realizar la transferencia
-            result = self.stock_controller.transfer(
-                self.selected_stock_item.id,
-                target_warehouse_id,
-                quantity
-            )
-           
-            if result["success"]:
+            def on_transferred(result):
                 dialog.destroy()
                 self.load_stock()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al transferir el producto"))
+            
+            # Realizar la transferencia en segundo plano (el botón queda deshabilitado hasta que responda)
+            stock_id = self.selected_stock_item.id
+            submit_action(dialog, lambda: self.stock_controller.transfer(stock_id, target_warehouse_id, quantity),
+                          on_transferred, button=transfer_button, error_label=error_label,
+                          error_text="Error al transferir el producto")
        
         transfer_button = ctk.CTkButton(
             button_frame,
@@ -1097,9 +1094,16 @@ class StockManagementFrame(ctk.CTkFrame):
         transfer_button.pack(side="right")
 
     def confirm_delete(self, stock_id):
+        """Obtiene el producto en segundo plano y luego pide confirmación para eliminarlo"""
+        get_task_runner().submit(
+            self,
+            lambda: self.stock_controller.get_by_id(stock_id),
+            lambda stock_item: self.open_confirm_delete(stock_id, stock_item),
+            key="delete"
+        )
+    
+    def open_confirm_delete(self, stock_id, stock_item):
         """Muestra un diálogo de confirmación para eliminar un producto"""
-        # Obtener datos del producto
-        stock_item = self.stock_controller.get_by_id(stock_id)
         if not stock_item:
             return
         
@@ -1158,13 +1162,13 @@ class StockManagementFrame(ctk.CTkFrame):
 
         # Botón eliminar
         def delete_stock():
-            result = self.stock_controller.delete(stock_id)
-           
-            if result["success"]:
+            def on_deleted(result):
                 dialog.destroy()
-                self.load_stock()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al eliminar el producto"))
+                self.stock_table.patch(removed=[stock_id])  # Quitar solo esta fila
+            
+            # Eliminar en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.stock_controller.delete(stock_id), on_deleted,
+                          button=delete_button, error_label=error_label, error_text="Error al eliminar el producto")
        
         delete_button = ctk.CTkButton(
             button_frame,
@@ -1172,4 +1176,4 @@ class StockManagementFrame(ctk.CTkFrame):
             fg_color="#FF5252",
             command=delete_stock
         )
-        delete_button.pack(side="right")
+        delete_button.pack(side="right")
\ No newline at end of file
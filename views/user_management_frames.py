@@ -2,6 +2,11 @@
 import customtkinter as ctk
 from datetime import datetime
 from controllers.user_controller import UserController
+from utils.replica_store import get_replica_store
+from utils.search_index import SearchIndex, SEARCH_DELAY_MS
+from utils.task_runner import get_task_runner
+from views.background_action import submit_action
+from views.virtual_table import VirtualTable
 
 class UserManagementFrame(ctk.CTkFrame):
     def __init__(self, master, auth_controller):
@@ -35,11 +40,40 @@ class UserManagementFrame(ctk.CTkFrame):
         # Lista de usuarios
         self.users = []
         
+        # Índice de búsqueda; se reconstruye cada vez que se cargan los usuarios
+        self.search_index = SearchIndex(lambda user: [user.get("username", ""), user.get("role", "")])
+        self.search_job = None
+        
         # Crear interfaz
         self.create_interface()
         
         # Cargar datos
         self.load_users()
+        
+        # Recargar cuando cambien los datos replicados (por ejemplo, ediciones de otros usuarios)
+        self.unsubscribe_changes = get_replica_store().subscribe(["users"], self.on_data_changed)
+    
+    def on_data_changed(self, event):
+        """Recarga la tabla (o la búsqueda activa) con los datos actualizados de la réplica"""
+        self.load_users()
+    
+    def destroy(self):
+        # Dejar de recibir cambios de la réplica y descartar las cargas pendientes al cerrar la vista
+        self.unsubscribe_changes()
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        get_task_runner().cancel(self)
+        super().destroy()
+    
+    def on_hide(self):
+        # La búsqueda pendiente se aplica en reload() al volver a mostrar la vista
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+            self.search_job = None
+    
+    def reload(self):
+        """Vuelve a cargar los usuarios si la carga se canceló al ocultar la vista"""
+        self.load_users()
     
     def create_interface(self):
         # Configurar grid
@@ -100,6 +134,9 @@ class UserManagementFrame(ctk.CTkFrame):
         )
         self.search_entry.pack(side="right")
         
+        # Buscar mientras se escribe, cuando se deja de teclear
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+        
         # Botón de búsqueda
         self.search_button = ctk.CTkButton(
             self.controls_frame,
@@ -117,168 +154,101 @@ class UserManagementFrame(ctk.CTkFrame):
         self.table_container.grid_columnconfigure(0, weight=1)
         self.table_container.grid_rowconfigure(0, weight=1)
         
-        # Crear scrollbar
-        self.scrollable_frame = ctk.CTkScrollableFrame(self.table_container)
-        self.scrollable_frame.grid(row=0, column=0, sticky="nsew")
-        
-        # Configurar grid del scrollable frame
-        self.scrollable_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
-        self.scrollable_frame.grid_columnconfigure(4, weight=0)
-        
-        # Cabecera de la tabla
-        headers = ["Usuario", "Rol", "Permisos", "Último Acceso", "Acciones"]
-        for i, header in enumerate(headers):
-            label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text=header,
-                font=ctk.CTkFont(weight="bold")
-            )
-            label.grid(row=0, column=i, padx=10, pady=10, sticky="w")
+        # Tabla virtualizada: solo se crean las filas visibles
+        role_colors = {
+            "admin": "#FF5252",
+            "manager": "#FFB74D",
+            "basic": "#4CAF50",
+            "fumigator": "#2196F3"
+        }
+        columns = [
+            {"header": "Usuario", "text": lambda user: user.get("username", "")},
+            {"header": "Rol",
+             "text": lambda user: user.get("role", "basic").capitalize(),
+             "color": lambda user: role_colors.get(user.get("role", "basic"), "#4CAF50")},
+            {"header": "Permisos", "text": self.format_permissions},
+            {"header": "Último Acceso", "text": self.format_last_login, "sort": lambda user: user.get("last_login")}
+        ]
         
-        # Separador
-        separator = ctk.CTkFrame(self.scrollable_frame, height=1, fg_color="gray")
-        separator.grid(row=1, column=0, columnspan=5, sticky="ew", padx=5)
+        # Solo quien puede gestionar usuarios ve los botones de acción
+        actions = []
+        if self.auth_controller.has_permission("manage_users"):
+            actions = [
+                {"text": "Editar", "command": lambda user: self.show_edit_user(user["id"])},
+                # No mostrar eliminar para el usuario actual
+                {"text": "Eliminar", "fg_color": "#FF5252",
+                 "command": lambda user: self.confirm_delete(user["id"]),
+                 "visible": lambda user: user["id"] != self.current_user.get("id")},
+                {"text": "Contraseña", "width": 80, "fg_color": "#2196F3",
+                 "command": lambda user: self.show_change_password(user["id"])}
+            ]
+        
+        self.user_table = VirtualTable(self.table_container, columns, actions)
+        self.user_table.grid(row=0, column=0, sticky="nsew")
+        
+        # Ordenar por nombre de usuario hasta que se elija otra columna
+        self.user_table.sort_by(0)
+    
+    def format_permissions(self, user):
+        """Texto de la columna Permisos"""
+        permissions = user.get("permissions", [])
+        if "*" in permissions:
+            return "Todos los permisos"
+        return ", ".join(permissions) if permissions else "Ninguno"
+    
+    def format_last_login(self, user):
+        """Texto de la columna Último Acceso"""
+        last_login = user.get("last_login")
+        return last_login.strftime("%d/%m/%Y %H:%M") if last_login else "Nunca"
     
     def load_users(self):
-        # Limpiar tabla existente (excepto cabecera y separador)
-        for widget in self.scrollable_frame.winfo_children():
-            if widget.grid_info()["row"] > 1:  # Solo eliminar filas de datos
-                widget.destroy()
-        
-        # Obtener usuarios
+        # Obtener usuarios en segundo plano
         include_admins = self.is_admin and getattr(self, 'show_admins_var', ctk.BooleanVar(value=False)).get()
-        self.users = self.user_controller.get_all(include_admins=include_admins)
-        
-        if not self.users:
-            # Mostrar mensaje si no hay usuarios
-            no_data_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text="No hay usuarios registrados",
-                font=ctk.CTkFont(size=14)
-            )
-            no_data_label.grid(row=2, column=0, columnspan=5, padx=10, pady=20)
-            return
-        
-        # Mostrar usuarios en la tabla
-        for i, user in enumerate(self.users):
-            row = i + 2  # +2 porque la fila 0 es la cabecera y la 1 es el separador
-            
-            # Nombre de usuario
-            username_label = ctk.CTkLabel(self.scrollable_frame, text=user.get("username", ""))
-            username_label.grid(row=row, column=0, padx=10, pady=5, sticky="w")
-            
-            # Rol (con colores)
-            role = user.get("role", "basic")
-            role_colors = {
-                "admin": "#FF5252",
-                "manager": "#FFB74D",
-                "basic": "#4CAF50",
-                "fumigator": "#2196F3"
-            }
-            role_color = role_colors.get(role, "#4CAF50")
-            
-            role_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            role_frame.grid(row=row, column=1, padx=10, pady=5, sticky="w")
-            
-            role_indicator = ctk.CTkFrame(role_frame, width=10, height=10, fg_color=role_color, corner_radius=5)
-            role_indicator.pack(side="left", padx=(0, 5))
-            
-            role_label = ctk.CTkLabel(role_frame, text=role.capitalize())
-            role_label.pack(side="left")
-            
-            # Permisos
-            permissions = user.get("permissions", [])
-            permissions_text = ", ".join(permissions) if permissions else "Ninguno"
-            if "*" in permissions:
-                permissions_text = "Todos los permisos"
-                
-            permissions_label = ctk.CTkLabel(self.scrollable_frame, text=permissions_text)
-            permissions_label.grid(row=row, column=2, padx=10, pady=5, sticky="w")
-            
-            # Último acceso
-            last_login = user.get("last_login")
-            last_login_text = last_login.strftime("%d/%m/%Y %H:%M") if last_login else "Nunca"
-            
-            last_login_label = ctk.CTkLabel(self.scrollable_frame, text=last_login_text)
-            last_login_label.grid(row=row, column=3, padx=10, pady=5, sticky="w")
-            
-            # Frame para botones de acción
-            action_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
-            action_frame.grid(row=row, column=4, padx=10, pady=5)
-            
-            # Verificar si tiene permiso para gestionar usuarios
-            if self.auth_controller.has_permission("manage_users"):
-                # Botón editar
-                edit_button = ctk.CTkButton(
-                    action_frame,
-                    text="Editar",
-                    width=70,
-                    height=25,
-                    command=lambda uid=user["id"]: self.show_edit_user(uid)
-                )
-                edit_button.pack(side="left", padx=(0, 5))
-                
-                # Botón eliminar (no mostrar para el usuario actual)
-                if user["id"] != self.current_user.get("id"):
-                    delete_button = ctk.CTkButton(
-                        action_frame,
-                        text="Eliminar",
-                        width=70,
-                        height=25,
-                        fg_color="#FF5252",
-                        command=lambda uid=user["id"]: self.confirm_delete(uid)
-                    )
-                    delete_button.pack(side="left", padx=(0, 5))
-                
-                # Botón cambiar contraseña
-                password_button = ctk.CTkButton(
-                    action_frame,
-                    text="Contraseña",
-                    width=80,
-                    height=25,
-                    fg_color="#2196F3",
-                    command=lambda uid=user["id"]: self.show_change_password(uid)
-                )
-                password_button.pack(side="left")
-            
-            # Agregar un separador después de cada fila
-            if i < len(self.users) - 1:
-                row_separator = ctk.CTkFrame(self.scrollable_frame, height=1, fg_color="gray70")
-                row_separator.grid(row=row+1, column=0, columnspan=5, sticky="ew", padx=20)
+        self.user_table.set_loading(True)
+        get_task_runner().submit(
+            self,
+            lambda: self.user_controller.get_all(include_admins=include_admins),
+            self.on_users_loaded,
+            self.on_load_error,
+            key="load"
+        )
+    
+    def on_users_loaded(self, users):
+        self.users = users
+        self.search_index.rebuild(users)
+        self.user_table.set_loading(False)
+        
+        # Mantener la búsqueda activa, si la hay
+        if self.search_var.get().strip():
+            self.search_users()
+        else:
+            # Solo se reconfiguran las filas cuyo contenido cambió
+            self.user_table.update_items(self.users, empty_text="No hay usuarios registrados")
+    
+    def on_load_error(self, error):
+        self.user_table.set_loading(False)
+        self.user_table.set_items([], empty_text=f"Error al cargar usuarios: {str(error)}")
+    
+    def schedule_search(self, event=None):
+        """Busca cuando se deja de escribir, en lugar de en cada tecla"""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(SEARCH_DELAY_MS, self.search_users)
     
     def search_users(self):
-        search_text = self.search_var.get().lower().strip()
+        self.search_job = None
+        search_text = self.search_var.get().strip()
         
-        # Si no hay texto de búsqueda, mostrar todos
+        # Si no hay texto de búsqueda, mostrar todos los usuarios ya cargados
         if not search_text:
-            self.load_users()
+            self.user_table.update_items(self.users, empty_text="No hay usuarios registrados")
             return
         
-        # Filtrar usuarios
-        filtered_users = [
-            user for user in self.users 
-            if (search_text in user.get("username", "").lower() or 
-                search_text in user.get("role", "").lower())
-        ]
-        
-        # Limpiar tabla existente (excepto cabecera y separador)
-        for widget in self.scrollable_frame.winfo_children():
-            if widget.grid_info()["row"] > 1:  # Solo eliminar filas de datos
-                widget.destroy()
-        
-        if not filtered_users:
-            # Mostrar mensaje si no hay resultados
-            no_data_label = ctk.CTkLabel(
-                self.scrollable_frame,
-                text=f"No se encontraron usuarios con '{search_text}'",
-                font=ctk.CTkFont(size=14)
-            )
-            no_data_label.grid(row=2, column=0, columnspan=5, padx=10, pady=20)
-            return
+        # Filtrar usuarios con el índice (palabras que empiezan con cada término)
+        filtered_users = self.search_index.search(search_text)
         
-        # Mostrar usuarios filtrados (reutilizando el código)
-        self.users = filtered_users
-        self.load_users()
+        # Mostrar usuarios filtrados (self.users conserva la lista completa)
+        self.user_table.update_items(filtered_users, empty_text=f"No se encontraron usuarios con '{search_text}'")
     
     def validate_min_permissions(self, permissions_vars, error_label):
         """Verifica que al menos un permiso esté seleccionado y muestra una indicación visual"""
@@ -432,14 +402,13 @@ class UserManagementFrame(ctk.CTkFrame):
                 error_label.configure(text="El usuario debe tener como mínimo un permiso")
                 return
             
-            # Crear usuario
-            result = self.user_controller.create(username, password, role, permissions)
-
-            if result["success"]:
+            def on_saved(result):
                 dialog.destroy()
                 self.load_users()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al guardar"))
+
+            # Crear usuario en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.user_controller.create(username, password, role, permissions), on_saved,
+                          button=save_button, error_label=error_label, error_text="Error al guardar")
         
         save_button = ctk.CTkButton(
             button_frame,
@@ -449,8 +418,16 @@ class UserManagementFrame(ctk.CTkFrame):
         save_button.pack(side="right")
     
     def show_edit_user(self, user_id):
-        # Obtener datos del usuario
-        user = self.user_controller.get_by_id(user_id)
+        # Obtener datos del usuario en segundo plano
+        get_task_runner().submit(
+            self,
+            lambda: self.user_controller.get_by_id(user_id),
+            lambda user: self.open_edit_user(user_id, user),
+            key="edit"
+        )
+    
+    def open_edit_user(self, user_id, user):
+        """Muestra el formulario para editar el usuario obtenido"""
         if not user:
             return
         
@@ -585,14 +562,13 @@ class UserManagementFrame(ctk.CTkFrame):
                 "permissions": permissions
             }
            
-            # Actualizar usuario
-            result = self.user_controller.update(user["id"], update_data)
-           
-            if result["success"]:
+            def on_updated(result):
                 dialog.destroy()
                 self.load_users()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al actualizar"))
+           
+            # Actualizar usuario en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.user_controller.update(user["id"], update_data), on_updated,
+                          button=save_button, error_label=error_label, error_text="Error al actualizar")
        
         save_button = ctk.CTkButton(
            button_frame,
@@ -602,8 +578,15 @@ class UserManagementFrame(ctk.CTkFrame):
         save_button.pack(side="right")
    
     def show_change_password(self, user_id):
-       # Obtener datos del usuario
-       user = self.user_controller.get_by_id(user_id)
+        """Obtiene el usuario en segundo plano y luego muestra el formulario para cambiar su contraseña"""
+        get_task_runner().submit(
+            self,
+            lambda: self.user_controller.get_by_id(user_id),
+            self.open_change_password,
+            key="password"
+        )
+    
+    def open_change_password(self, user):
        if not user:
            return
        
@@ -680,13 +663,10 @@ class UserManagementFrame(ctk.CTkFrame):
                error_label.configure(text="Las contraseñas no coinciden")
                return
            
-           # Cambiar contraseña
-           result = self.user_controller.change_password(user["id"], password)
-           
-           if result["success"]:
-               dialog.destroy()
-           else:
-               error_label.configure(text=result.get("error", "Error al cambiar la contraseña"))
+           # Cambiar contraseña en segundo plano (el botón queda deshabilitado hasta que responda)
+           submit_action(dialog, lambda: self.user_controller.change_password(user["id"], password),
+                         lambda result: dialog.destroy(),
+                         button=save_button, error_label=error_label, error_text="Error al cambiar la contraseña")
        
        save_button = ctk.CTkButton(
            button_frame,
@@ -696,8 +676,15 @@ class UserManagementFrame(ctk.CTkFrame):
        save_button.pack(side="right")
    
     def confirm_delete(self, user_id):
-        # Obtener datos del usuario
-        user = self.user_controller.get_by_id(user_id)
+        """Obtiene el usuario en segundo plano y luego pide confirmación para eliminarlo"""
+        get_task_runner().submit(
+            self,
+            lambda: self.user_controller.get_by_id(user_id),
+            lambda user: self.open_confirm_delete(user_id, user),
+            key="delete"
+        )
+    
+    def open_confirm_delete(self, user_id, user):
         if not user:
             return
         
@@ -756,13 +743,13 @@ class UserManagementFrame(ctk.CTkFrame):
         
         # Botón eliminar
         def delete_user():
-            result = self.user_controller.delete(user_id)
-            
-            if result["success"]:
+            def on_deleted(result):
                 dialog.destroy()
                 self.load_users()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al eliminar"))
+            
+            # Eliminar en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.user_controller.delete(user_id), on_deleted,
+                          button=delete_button, error_label=error_label, error_text="Error al eliminar")
         
         delete_button = ctk.CTkButton(
             button_frame,
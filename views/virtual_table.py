@@ -0,0 +1,506 @@
+# views/virtual_table.py
+import datetime
+import math
+import tkinter
+import customtkinter as ctk
+from utils.search_index import normalize
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+class VirtualTable(ctk.CTkFrame):
+    """
+    Tabla con filas de altura fija que solo crea los widgets necesarios para
+    llenar el área visible. Al hacer scroll las mismas filas se vuelven a
+    asociar a otros elementos (se cambia el texto, el color y los botones
+    visibles), así que la cantidad de widgets no depende de la cantidad de datos.
+
+    columns es una lista de diccionarios:
+        {"header": "Producto", "text": lambda item: item.product_name,
+         "width": 120, "weight": 1, "max_chars": 30, "color": lambda item: "#4CAF50"}
+    "color" (opcional) agrega un indicador de color antes del texto.
+    "sort" (opcional) retorna el valor por el que se ordena la columna (por
+    defecto, el texto); "sortable": False desactiva el orden por esa columna.
+
+    actions es una lista de botones por fila:
+        {"text": "Editar", "command": lambda item: ..., "width": 70,
+         "fg_color": "#FF5252", "visible": lambda item: True}
+
+    Los elementos se identifican con key(item) (por defecto su ID), lo que
+    permite actualizar la tabla sin redibujarla: update_items() concilia una
+    lista nueva manteniendo la posición del scroll y patch() cambia o quita
+    solo los elementos indicados. Las filas cuyos textos no cambiaron no se
+    reconfiguran.
+
+    Un clic en la cabecera ordena por esa columna (otro clic invierte el
+    sentido) y Shift+clic la agrega como criterio secundario. Las claves de
+    orden se normalizan por tipo (números, fechas, textos sin acentos; los
+    vacíos siempre al final) y se guardan por columna y elemento, así que
+    reordenar solo ordena claves ya calculadas y vuelve a asociar las filas
+    visibles, sin crear widgets. El orden se mantiene al actualizar los datos.
+
+    Uso:
+        table = VirtualTable(parent, columns, actions, empty_text="No hay productos")
+        table.set_items(items)
+        table.patch([edited_item])
+    """
+
+    def __init__(self, master, columns, actions=None, row_height=40, empty_text="No hay datos", key=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.columns = columns
+        self.actions = actions or []
+        self.row_height = row_height
+        self.empty_text = empty_text
+        self.key = key or _item_key
+
+        self.items = []
+        self._positions = {}  # clave -> índice en items
+        self._top = 0  # Índice del primer elemento visible
+        self._visible_rows = 0
+        self._rows = []  # Filas reutilizables
+        self._near_end_callback = None
+        self._near_end_threshold = 0.9
+        self._loading = False
+        self._sort = []  # [(índice de columna, descendente)] en orden de prioridad
+        self._sort_cache = {}  # columna -> {clave: (elemento, clave de orden)}
+        self._header_labels = []
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(2, weight=1)
+
+        # Cabecera
+        self.header = ctk.CTkFrame(self, fg_color="transparent")
+        self.header.grid(row=0, column=0, sticky="ew")
+        self._configure_columns(self.header)
+
+        for i, column in enumerate(self.columns):
+            sortable = column.get("sortable", True)
+            label = ctk.CTkLabel(
+                self.header,
+                text=column["header"],
+                font=ctk.CTkFont(weight="bold"),
+                width=column.get("width", 100),
+                anchor="w",
+                cursor="hand2" if sortable else ""
+            )
+            label.grid(row=0, column=i, padx=10, pady=10, sticky="w")
+            if sortable:
+                label.bind("<Button-1>", lambda event, i=i: self.sort_by(i))
+                label.bind("<Shift-Button-1>", lambda event, i=i: self.sort_by(i, add=True))
+            self._header_labels.append(label)
+
+        if self.actions:
+            label = ctk.CTkLabel(self.header, text="Acciones", font=ctk.CTkFont(weight="bold"))
+            label.grid(row=0, column=len(self.columns), padx=10, pady=10, sticky="w")
+
+        # Separador
+        separator = ctk.CTkFrame(self, height=1, fg_color="gray")
+        separator.grid(row=1, column=0, columnspan=2, sticky="ew", padx=5)
+
+        # Área de filas (las filas se ubican con place según su posición en la vista)
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=2, column=0, sticky="nsew")
+        self.body.bind("<Configure>", self._on_resize)
+        self._bind_mouse_wheel(self.body)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=2, column=1, sticky="ns")
+
+        self.empty_label = ctk.CTkLabel(self.body, text=self.empty_text, font=ctk.CTkFont(size=14))
+        self.loading_label = ctk.CTkLabel(self.body, text="Cargando...", text_color="gray")
+
+    def set_items(self, items, empty_text=None):
+        """Reemplaza los elementos de la tabla y vuelve al principio"""
+        self.items = list(items)
+        self._apply_sort()
+        self._top = 0
+        if empty_text is not None:
+            self.empty_text = empty_text
+        self._render()
+
+    def update_items(self, items, empty_text=None):
+        """
+        Reemplaza los elementos conservando el scroll: el primer elemento visible
+        sigue arriba si está en la lista nueva. Solo se reconfiguran las filas
+        visibles cuyo contenido cambió.
+        """
+        anchor = self.items[self._top] if self._top < len(self.items) else None
+
+        self.items = list(items)
+        self._apply_sort()
+        if anchor is not None:
+            self._top = self._positions.get(self.key(anchor), self._top)
+        if empty_text is not None:
+            self.empty_text = empty_text
+        self._render()
+
+    def append_items(self, items):
+        """Agrega elementos al final sin mover el scroll (por ejemplo, la página siguiente)"""
+        if self._sort:
+            # Con un orden activo los elementos nuevos se ubican en su lugar
+            anchor = self.items[self._top] if self._top < len(self.items) else None
+            self.items.extend(items)
+            self._apply_sort()
+            if anchor is not None:
+                self._top = self._positions.get(self.key(anchor), self._top)
+            self._render()
+            return
+
+        for item in items:
+            self._positions[self.key(item)] = len(self.items)
+            self.items.append(item)
+        self._render()
+
+    def patch(self, changed=(), removed=(), accept=None):
+        """
+        Reemplaza los elementos cambiados (por clave) y quita los de las claves
+        removidas, o los cambiados que ya no cumplen accept(item) (por ejemplo,
+        un filtro activo). Solo se vuelven a asociar las filas afectadas.
+
+        Retorna False si algún elemento cambiado no estaba en la tabla y cumple
+        accept, es decir, si hace falta recargar para ubicarlo.
+        """
+        complete = True
+        removed = set(removed)
+        for item in changed:
+            key = self.key(item)
+            if accept is not None and not accept(item):
+                removed.add(key)
+            elif key in self._positions:
+                self.items[self._positions[key]] = item
+            else:
+                complete = False
+
+        removed &= set(self._positions)
+        if removed or (self._sort and changed):
+            # Las bajas (o un cambio en el orden) mueven las filas: se vuelve a asociar lo visible
+            self.items = [item for item in self.items if self.key(item) not in removed]
+            self._apply_sort()
+            self._render()
+        else:
+            self._rebind_changed()
+        return complete
+
+    def refresh(self):
+        """Vuelve a dibujar las filas visibles (por ejemplo, si cambiaron los datos de los elementos)"""
+        # Los textos pueden depender de datos externos (por ejemplo, nombres): recalcular el orden
+        self._sort_cache = {}
+        if self._sort:
+            self._apply_sort()
+        for row in self._rows:
+            row["item"] = None
+        self._render()
+
+    def sort_by(self, column, descending=None, add=False):
+        """
+        Ordena por la columna (índice). Si ya se ordenaba por ella y no se indica
+        descending, invierte el sentido. add=True la agrega (o invierte) como
+        criterio secundario, conservando los anteriores.
+        """
+        current = dict(self._sort)
+        if descending is None:
+            descending = not current[column] if column in current else False
+
+        if add:
+            if column in current:
+                self._sort = [(index, descending if index == column else desc) for index, desc in self._sort]
+            else:
+                self._sort.append((column, descending))
+        else:
+            self._sort = [(column, descending)]
+
+        self._apply_sort()
+        self._update_headers()
+        self._top = 0
+        self._render()
+
+    def clear_sort(self):
+        """Quita el orden por columnas (los elementos quedan en su orden actual)"""
+        self._sort = []
+        self._update_headers()
+
+    def scroll_to(self, index):
+        """Muestra el elemento index como primera fila visible"""
+        max_top = max(0, len(self.items) - self._visible_rows)
+        self._top = min(max(0, int(index)), max_top)
+        self._render()
+
+    def set_loading(self, loading):
+        """Muestra u oculta el indicador de carga (en lugar del mensaje de tabla vacía)"""
+        self._loading = loading
+        self._render()
+
+    def set_near_end_callback(self, callback, threshold=0.9):
+        """Registra callback() para cuando el scroll se acerque al final (ver PagedLoader)"""
+        self._near_end_callback = callback
+        self._near_end_threshold = threshold
+
+    def _configure_columns(self, frame):
+        """Configura las columnas del frame igual en la cabecera y en todas las filas"""
+        for i, column in enumerate(self.columns):
+            frame.grid_columnconfigure(i, weight=column.get("weight", 1), minsize=column.get("width", 100) + 20)
+        if self.actions:
+            frame.grid_columnconfigure(len(self.columns), weight=0)
+
+    def _create_row(self):
+        """Crea los widgets de una fila reutilizable"""
+        # La altura se fija en el constructor (CTk no acepta width/height en place)
+        frame = ctk.CTkFrame(self.body, fg_color="transparent", corner_radius=0, height=self.row_height)
+        frame.grid_propagate(False)
+        self._configure_columns(frame)
+        frame.grid_rowconfigure(0, weight=1)
+
+        cells = []
+        for i, column in enumerate(self.columns):
+            if column.get("color"):
+                cell_frame = ctk.CTkFrame(frame, fg_color="transparent")
+                cell_frame.grid(row=0, column=i, padx=10, pady=5, sticky="w")
+                indicator = ctk.CTkFrame(cell_frame, width=10, height=10, corner_radius=5)
+                indicator.pack(side="left", padx=(0, 5))
+                label = ctk.CTkLabel(cell_frame, text="", anchor="w")
+                label.pack(side="left")
+            else:
+                indicator = None
+                label = ctk.CTkLabel(frame, text="", width=column.get("width", 100), anchor="w")
+                label.grid(row=0, column=i, padx=10, pady=5, sticky="w")
+            cells.append({"label": label, "indicator": indicator, "text": None, "color": None})
+
+        buttons = []
+        if self.actions:
+            action_frame = ctk.CTkFrame(frame, fg_color="transparent")
+            action_frame.grid(row=0, column=len(self.columns), padx=10, pady=5)
+            slot = len(self._rows)
+            for j, action in enumerate(self.actions):
+                options = {"fg_color": action["fg_color"]} if action.get("fg_color") else {}
+                button = ctk.CTkButton(
+                    action_frame,
+                    text=action["text"],
+                    width=action.get("width", 70),
+                    height=25,
+                    command=lambda slot=slot, action=action: self._run_action(slot, action),
+                    **options
+                )
+                button.grid(row=0, column=j, padx=(0, 5))
+                buttons.append(button)
+
+        row_separator = ctk.CTkFrame(frame, height=1, fg_color="gray70")
+        row_separator.grid(row=1, column=0, columnspan=len(self.columns) + 1, sticky="ew", padx=20)
+
+        self._bind_mouse_wheel(frame)
+        return {"frame": frame, "cells": cells, "buttons": buttons, "separator": row_separator,
+                "item": None, "is_last": None, "placed": False}
+
+    def _bind_row(self, row, item, is_last):
+        """Asocia una fila reutilizable a un elemento"""
+        if row["item"] is item and row["is_last"] == is_last:
+            # La fila ya muestra este mismo elemento
+            return
+        row["item"] = item
+        row["is_last"] = is_last
+
+        for column, cell in zip(self.columns, row["cells"]):
+            text = column["text"](item)
+            text = "" if text is None else str(text)
+            max_chars = column.get("max_chars")
+            if max_chars and len(text) > max_chars:
+                text = text[:max_chars - 3] + "..."
+            # Reconfigurar solo lo que cambió evita redibujar los widgets
+            if text != cell["text"]:
+                cell["label"].configure(text=text)
+                cell["text"] = text
+
+            if cell["indicator"] is not None:
+                color = column["color"](item)
+                if color != cell["color"]:
+                    cell["indicator"].configure(fg_color=color)
+                    cell["color"] = color
+
+        for action, button in zip(self.actions, row["buttons"]):
+            visible = action.get("visible")
+            if visible is None or visible(item):
+                button.grid()
+            else:
+                button.grid_remove()
+
+        if is_last:
+            row["separator"].grid_remove()
+        else:
+            row["separator"].grid()
+
+    def _run_action(self, slot, action):
+        """Ejecuta la acción sobre el elemento que muestra la fila en este momento"""
+        item = self._rows[slot]["item"]
+        if item is not None:
+            action["command"](item)
+
+    def _render(self):
+        """Dibuja los elementos visibles en las filas reutilizables"""
+        max_top = max(0, len(self.items) - self._visible_rows)
+        self._top = min(self._top, max_top)
+
+        if not self.items:
+            self.empty_label.configure(text="Cargando..." if self._loading else self.empty_text)
+            self.empty_label.place(relx=0.5, y=20, anchor="n")
+        else:
+            self.empty_label.place_forget()
+
+        # Con filas ya visibles, la carga se indica al pie de la tabla
+        if self._loading and self.items:
+            self.loading_label.place(relx=1.0, rely=1.0, x=-10, anchor="se")
+            self.loading_label.lift()
+        else:
+            self.loading_label.place_forget()
+
+        for slot, row in enumerate(self._rows):
+            index = self._top + slot
+            if slot < self._visible_rows and index < len(self.items):
+                self._bind_row(row, self.items[index], index == len(self.items) - 1)
+                # Cada fila ocupa siempre la misma posición; solo se ubica al mostrarla
+                if not row["placed"]:
+                    row["frame"].place(x=0, y=slot * self.row_height, relwidth=1.0)
+                    row["placed"] = True
+            elif row["placed"]:
+                row["frame"].place_forget()
+                row["placed"] = False
+
+        self._update_scrollbar()
+        self._check_near_end()
+
+    def _rebind_changed(self):
+        """Vuelve a asociar solo las filas visibles cuyo elemento fue reemplazado"""
+        for slot, row in enumerate(self._rows[:self._visible_rows]):
+            index = self._top + slot
+            if index < len(self.items) and row["item"] is not self.items[index]:
+                self._bind_row(row, self.items[index], index == len(self.items) - 1)
+
+    def _reindex(self):
+        self._positions = {self.key(item): index for index, item in enumerate(self.items)}
+
+    def _apply_sort(self):
+        """Ordena items según los criterios activos (orden estable) y reindexa"""
+        # Se ordena por el último criterio primero; como el orden es estable,
+        # el primer criterio termina siendo el principal
+        for column, descending in reversed(self._sort):
+            keys = self._sort_keys(column)
+            self.items.sort(key=lambda item: keys[self.key(item)][1], reverse=descending)
+            # Los valores vacíos van al final en ambos sentidos
+            self.items.sort(key=lambda item: keys[self.key(item)][0])
+        self._reindex()
+
+    def _sort_keys(self, column):
+        """Claves de orden de la columna para los elementos actuales, calculadas una vez por elemento"""
+        spec = self.columns[column]
+        value_of = spec.get("sort") or spec["text"]
+        cache = self._sort_cache.setdefault(column, {})
+
+        keys = {}
+        for item in self.items:
+            key = self.key(item)
+            cached = cache.get(key)
+            if cached is None or cached[0] is not item:
+                # Elemento nuevo o reemplazado: calcular su clave
+                cached = (item, _sort_key(value_of(item)))
+                cache[key] = cached
+            keys[key] = cached[1]
+
+        # No conservar claves de elementos que ya no están
+        if len(cache) > len(keys):
+            for key in [key for key in cache if key not in keys]:
+                del cache[key]
+        return keys
+
+    def _update_headers(self):
+        """Muestra en la cabecera el sentido (y la prioridad) de cada columna ordenada"""
+        priorities = {column: (position, descending) for position, (column, descending) in enumerate(self._sort)}
+        for i, (column, label) in enumerate(zip(self.columns, self._header_labels)):
+            text = column["header"]
+            if i in priorities:
+                position, descending = priorities[i]
+                text += " ▼" if descending else " ▲"
+                if len(self._sort) > 1:
+                    text += str(position + 1)
+            label.configure(text=text)
+
+    def _update_scrollbar(self):
+        total = len(self.items)
+        if total == 0 or total <= self._visible_rows:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self._top / total, min(1.0, (self._top + self._visible_rows) / total))
+
+    def _check_near_end(self):
+        """Avisa cuando el final de la vista está cerca del final de los datos"""
+        if self._near_end_callback is None or self._visible_rows == 0:
+            return
+        # Si los datos no llenan la vista también se piden más
+        if (self._top + self._visible_rows) >= self._near_end_threshold * len(self.items):
+            self._near_end_callback()
+
+    def _on_resize(self, event):
+        """Crea las filas que falten para llenar la nueva altura"""
+        self._visible_rows = max(1, math.ceil(event.height / self.row_height))
+        while len(self._rows) < self._visible_rows:
+            self._rows.append(self._create_row())
+        self._render()
+
+    def _on_scrollbar(self, *args):
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * len(self.items))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if len(args) > 2 and args[2] == "pages":
+                step *= max(1, self._visible_rows - 1)
+            self.scroll_to(self._top + step)
+
+    def _on_mouse_wheel(self, event):
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_to(self._top - 3)
+        else:
+            self.scroll_to(self._top + 3)
+        return "break"
+
+    def _bind_mouse_wheel(self, widget):
+        """Asocia la rueda del mouse al widget y a todos sus widgets internos"""
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            tkinter.Misc.bind(widget, sequence, self._on_mouse_wheel, add="+")
+        for child in widget.winfo_children():
+            self._bind_mouse_wheel(child)
+
+def _sort_key(value):
+    """
+    Clave de orden normalizada: (vacío, tipo, valor). Los números (también en
+    texto) van antes que las fechas y estas antes que los textos, que se comparan
+    sin mayúsculas ni acentos.
+    """
+    if value is None or value == "":
+        return (1, (0, 0))
+    if isinstance(value, bool):
+        return (0, (0, int(value)))
+    if isinstance(value, (int, float)):
+        return (0, (0, value))
+    if isinstance(value, datetime.datetime):
+        return (0, (1, _seconds(value)))
+    if isinstance(value, datetime.date):
+        return (0, (1, _seconds(datetime.datetime.combine(value, datetime.time()))))
+
+    text = str(value).strip()
+    try:
+        number = float(text.replace(",", "."))
+    except ValueError:
+        number = None
+    if number is not None and math.isfinite(number):
+        return (0, (0, number))
+    return (0, (2, normalize(text)))
+
+def _seconds(value):
+    """Segundos desde 1970 (las fechas sin zona se toman como UTC, como las guarda Firestore)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return (value - _EPOCH).total_seconds()
+
+def _item_key(item):
+    """Clave por defecto: el ID del modelo o la clave "id" del diccionario"""
+    if isinstance(item, dict):
+        return item.get("id")
+    return getattr(item, "id", None)
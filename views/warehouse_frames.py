@@ -3,6 +3,10 @@ import customtkinter as ctk
 from datetime import datetime
 from controllers.warehouse_controller import WarehouseController
 from models.warehouse import Warehouse
+from utils.replica_store import get_replica_store
+from utils.task_runner import get_task_runner
+from views.background_action import submit_action
+from views.virtual_table import VirtualTable
 
 class WarehouseManagementFrame(ctk.CTkFrame):
     def __init__(self, master, auth_controller):
@@ -19,6 +23,23 @@ class WarehouseManagementFrame(ctk.CTkFrame):
         
         # Cargar datos
         self.load_warehouses()
+        
+        # Recargar cuando cambien los datos replicados (por ejemplo, ediciones de otros usuarios)
+        self.unsubscribe_changes = get_replica_store().subscribe(["warehouses"], self.on_data_changed)
+    
+    def on_data_changed(self, event):
+        """Recarga la tabla con los datos actualizados de la réplica"""
+        self.load_warehouses()
+    
+    def destroy(self):
+        # Dejar de recibir cambios de la réplica y descartar las cargas pendientes al cerrar la vista
+        self.unsubscribe_changes()
+        get_task_runner().cancel(self)
+        super().destroy()
+    
+    def reload(self):
+        """Vuelve a cargar los almacenes si la carga se canceló al ocultar la vista"""
+        self.load_warehouses()
     
     def create_interface(self):
         # Configurar grid
@@ -56,99 +77,41 @@ class WarehouseManagementFrame(ctk.CTkFrame):
         )
         self.refresh_button.pack(side="left")
         
-        # Frame para la tabla
-        self.table_frame = ctk.CTkFrame(self)
-        self.table_frame.grid(row=2, column=0, padx=20, pady=(0, 20), sticky="nsew")
-        
-        # Configurar grid de la tabla
-        self.table_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
-        self.table_frame.grid_columnconfigure(4, weight=0)
-        
-        # Cabecera de la tabla
-        headers = ["Nombre", "Ubicación", "Capacidad", "Descripción", "Acciones"]
-        for i, header in enumerate(headers):
-            label = ctk.CTkLabel(
-                self.table_frame,
-                text=header,
-                font=ctk.CTkFont(weight="bold")
-            )
-            label.grid(row=0, column=i, padx=10, pady=10, sticky="w")
-        
-        # Separador
-        separator = ctk.CTkFrame(self.table_frame, height=1, fg_color="gray")
-        separator.grid(row=1, column=0, columnspan=5, sticky="ew", padx=5)
+        # Tabla virtualizada: solo se crean las filas visibles
+        columns = [
+            {"header": "Nombre", "text": lambda warehouse: warehouse.name},
+            {"header": "Ubicación", "text": lambda warehouse: warehouse.location},
+            {"header": "Capacidad", "text": lambda warehouse: warehouse.capacity or ""},
+            # Descripción (truncada si es muy larga)
+            {"header": "Descripción", "text": lambda warehouse: warehouse.description, "max_chars": 33}
+        ]
+        actions = [
+            {"text": "Editar", "command": lambda warehouse: self.show_edit_warehouse(warehouse.id)},
+            {"text": "Eliminar", "fg_color": "#FF5252", "command": lambda warehouse: self.confirm_delete(warehouse.id)}
+        ]
+        self.warehouse_table = VirtualTable(self, columns, actions)
+        self.warehouse_table.grid(row=2, column=0, padx=20, pady=(0, 20), sticky="nsew")
     
     def load_warehouses(self):
-        # Limpiar tabla existente (excepto cabecera y separador)
-        for widget in self.table_frame.winfo_children():
-            if widget.grid_info()["row"] > 1:  # Solo eliminar filas de datos
-                widget.destroy()
-        
-        # Obtener almacenes
-        self.warehouses = self.warehouse_controller.get_all()
-        
-        if not self.warehouses:
-            # Mostrar mensaje si no hay almacenes
-            no_data_label = ctk.CTkLabel(
-                self.table_frame,
-                text="No hay almacenes registrados",
-                font=ctk.CTkFont(size=14)
-            )
-            no_data_label.grid(row=2, column=0, columnspan=5, padx=10, pady=20)
-            return
-        
-        # Mostrar almacenes en la tabla
-        for i, warehouse in enumerate(self.warehouses):
-            row = i + 2  # +2 porque la fila 0 es la cabecera y la 1 es el separador
-            
-            # Nombre
-            name_label = ctk.CTkLabel(self.table_frame, text=warehouse.name or "")
-            name_label.grid(row=row, column=0, padx=10, pady=5, sticky="w")
-            
-            # Ubicación
-            location_label = ctk.CTkLabel(self.table_frame, text=warehouse.location or "")
-            location_label.grid(row=row, column=1, padx=10, pady=5, sticky="w")
-            
-            # Capacidad
-            capacity_label = ctk.CTkLabel(self.table_frame, text=str(warehouse.capacity or ""))
-            capacity_label.grid(row=row, column=2, padx=10, pady=5, sticky="w")
-            
-            # Descripción (truncada si es muy larga)
-            description = warehouse.description or ""
-            if len(description) > 30:
-                description = description[:30] + "..."
-            description_label = ctk.CTkLabel(self.table_frame, text=description)
-            description_label.grid(row=row, column=3, padx=10, pady=5, sticky="w")
-            
-            # Frame para botones de acción
-            action_frame = ctk.CTkFrame(self.table_frame, fg_color="transparent")
-            action_frame.grid(row=row, column=4, padx=10, pady=5)
-            
-            # Botón editar
-            edit_button = ctk.CTkButton(
-                action_frame,
-                text="Editar",
-                width=70,
-                height=25,
-                command=lambda wid=warehouse.id: self.show_edit_warehouse(wid)
-            )
-            edit_button.pack(side="left", padx=(0, 5))
-            
-            # Botón eliminar
-            delete_button = ctk.CTkButton(
-                action_frame,
-                text="Eliminar",
-                width=70,
-                height=25,
-                fg_color="#FF5252",
-                command=lambda wid=warehouse.id: self.confirm_delete(wid)
-            )
-            delete_button.pack(side="left")
-            
-            # Agregar un separador después de cada fila
-            if i < len(self.warehouses) - 1:
-                row_separator = ctk.CTkFrame(self.table_frame, height=1, fg_color="gray70")
-                row_separator.grid(row=row+1, column=0, columnspan=5, sticky="ew", padx=20)
+        # Obtener almacenes en segundo plano
+        self.warehouse_table.set_loading(True)
+        get_task_runner().submit(
+            self,
+            self.warehouse_controller.get_all,
+            self.on_warehouses_loaded,
+            self.on_load_error,
+            key="load"
+        )
+    
+    def on_warehouses_loaded(self, warehouses):
+        self.warehouses = warehouses
+        self.warehouse_table.set_loading(False)
+        # Solo se reconfiguran las filas cuyo contenido cambió
+        self.warehouse_table.update_items(self.warehouses, empty_text="No hay almacenes registrados")
+    
+    def on_load_error(self, error):
+        self.warehouse_table.set_loading(False)
+        self.warehouse_table.set_items([], empty_text=f"Error al cargar almacenes: {str(error)}")
     
     def show_add_warehouse(self):
         # Crear ventana de diálogo
@@ -236,14 +199,13 @@ class WarehouseManagementFrame(ctk.CTkFrame):
                 description=field_entries["description"].get("0.0", "end").strip()
             )
 
-            # Guardar en la base de datos
-            result = self.warehouse_controller.create(warehouse)
-
-            if result["success"]:
+            def on_saved(result):
                 dialog.destroy()
                 self.load_warehouses()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al guardar"))
+
+            # Guardar en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.warehouse_controller.create(warehouse), on_saved,
+                          button=save_button, error_label=error_label, error_text="Error al guardar")
 
         # Botón guardar
         save_button = ctk.CTkButton(
@@ -265,8 +227,16 @@ class WarehouseManagementFrame(ctk.CTkFrame):
         cancel_button.pack(side="left", padx=(0, 10))
 
     def show_edit_warehouse(self, warehouse_id):
-        # Obtener datos del almacén
-        warehouse = self.warehouse_controller.get_by_id(warehouse_id)
+        # Obtener datos del almacén en segundo plano
+        get_task_runner().submit(
+            self,
+            lambda: self.warehouse_controller.get_by_id(warehouse_id),
+            lambda warehouse: self.open_edit_warehouse(warehouse_id, warehouse),
+            key="edit"
+        )
+    
+    def open_edit_warehouse(self, warehouse_id, warehouse):
+        """Muestra el formulario para editar el almacén obtenido"""
         if not warehouse:
             return
         
@@ -369,14 +339,13 @@ class WarehouseManagementFrame(ctk.CTkFrame):
                 "description": field_entries["description"].get("0.0", "end").strip()
             }
             
-            # Guardar en la base de datos
-            result = self.warehouse_controller.update(warehouse.id, updated_data)
-            
-            if result["success"]:
+            def on_updated(result):
                 dialog.destroy()
                 self.load_warehouses()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al actualizar"))
+            
+            # Guardar en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.warehouse_controller.update(warehouse.id, updated_data), on_updated,
+                          button=save_button, error_label=error_label, error_text="Error al actualizar")
         
         save_button = ctk.CTkButton(
             button_frame,
@@ -386,8 +355,15 @@ class WarehouseManagementFrame(ctk.CTkFrame):
         save_button.pack(side="right")
     
     def confirm_delete(self, warehouse_id):
-        # Obtener datos del almacén
-        warehouse = self.warehouse_controller.get_by_id(warehouse_id)
+        """Obtiene el almacén en segundo plano y luego pide confirmación para eliminarlo"""
+        get_task_runner().submit(
+            self,
+            lambda: self.warehouse_controller.get_by_id(warehouse_id),
+            lambda warehouse: self.open_confirm_delete(warehouse_id, warehouse),
+            key="delete"
+        )
+    
+    def open_confirm_delete(self, warehouse_id, warehouse):
         if not warehouse:
             return
         
@@ -446,13 +422,13 @@ class WarehouseManagementFrame(ctk.CTkFrame):
         
         # Botón eliminar
         def delete_warehouse():
-            result = self.warehouse_controller.delete(warehouse_id)
-            
-            if result["success"]:
+            def on_deleted(result):
                 dialog.destroy()
                 self.load_warehouses()  # Recargar lista
-            else:
-                error_label.configure(text=result.get("error", "Error al eliminar"))
+            
+            # Eliminar en segundo plano (el botón queda deshabilitado hasta que responda)
+            submit_action(dialog, lambda: self.warehouse_controller.delete(warehouse_id), on_deleted,
+                          button=delete_button, error_label=error_label, error_text="Error al eliminar")
         
         delete_button = ctk.CTkButton(
             button_frame,